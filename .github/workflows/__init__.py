@@ -1,2 +1,8 @@
 # -*- coding: utf-8 -*-
-from .main import parse_by_keywords
\ No newline at end of file
+from .main import parse_by_keywords, parse_record, parse_records
+from .models import DriverRecord
+from .lazy import LazyRecord
+from .session import ParseSession
+from .batch import parse_many
+from .columns import parse_columns
+from .cache import enable_cache, disable_cache
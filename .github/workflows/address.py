@@ -1,22 +1,56 @@
 import re
 import logging
-from typing import Optional
+from typing import Iterator, Optional
+from . import metrics
+from .engine import TextLike, matches_at, prepare_text, WHITESPACE_RE
+from .imports_and_settings import TRACE
+from .models import DriverRecord
+from .patterns import register
 
 logger = logging.getLogger(__name__)
 
-def extract_address(text: str) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для адреса: {text_cleaned[:100]}")
-    patterns = [
-        re.compile(r'(?i)(?:прописка|адрес\s*регистрации|по\s*месту\s*жительства)\s*[:\-\s]*(.+?)(?=\s*(?:тел|паспорт|водитель|ву|автомобиль|прицеп|ип|$))', re.UNICODE),
-        re.compile(r'(?i)\b(г\.\s*[а-яё\s,.\-0-9]+?)(?=\s*(?:тел|паспорт|водитель|ву|автомобиль|прицеп|ип|$))', re.UNICODE),
-    ]
-    for pattern in patterns:
-        logger.debug(f"Применён шаблон для адреса: {pattern.pattern}")
-        for match in pattern.finditer(text_cleaned):
+ADDRESS_CITY = register('address.city', r'(?i)\b(г\.\s*[а-яё\s,.\-0-9]+?)(?=\s*(?:тел|паспорт|водитель|ву|автомобиль|прицеп|ип|$))', re.UNICODE)
+# Попытка ADDRESS_CITY с каждого "г." доходит до ближайшего символа вне класса адреса.
+# Если с "г." совпадения нет, его нет и с любого следующего "г." до этого символа,
+# поэтому такие позиции пропускаются и каждый символ просматривается один раз
+ADDRESS_CITY_BLOCKER = register('address.city_blocker', r'(?i)[^а-яё\s,.\-0-9]', re.UNICODE)
+
+ADDRESS_KEYWORD = register('address.keyword', r'(?i)(?:прописка|адрес\s*регистрации|по\s*месту\s*жительства)\s*[:\-\s]*(.+?)(?=\s*(?:тел|паспорт|водитель|ву|автомобиль|прицеп|ип|$))', re.UNICODE)
+ADDRESS_PATTERNS = [ADDRESS_KEYWORD, ADDRESS_CITY]
+DATE_IN_ADDRESS = register('address.date', r'\d{2}\.\d{2}\.\d{2,4}', re.UNICODE)
+
+def _city_finditer(text: str, anchors, end: int) -> Iterator[re.Match]:
+    pos = 0
+    blocked_until = 0
+    for start, anchor_end in anchors:
+        if start < pos or start < blocked_until:
+            continue
+        match = ADDRESS_CITY.match(text, start, end)
+        if match:
+            yield match
+            pos = match.end()
+        else:
+            blocker = ADDRESS_CITY_BLOCKER.search(text, anchor_end, end)
+            blocked_until = blocker.start() if blocker else end
+
+def _finditer(pattern: re.Pattern, prepared: TextLike):
+    if pattern is ADDRESS_CITY:
+        return _city_finditer(prepared.cleaned, prepared.anchors('city'), prepared.end)
+    return matches_at(pattern, prepared.cleaned, [start for start, _ in prepared.anchors('address')], prepared.end)
+
+@metrics.timed('extract_address')
+def extract_address(text: TextLike) -> Optional[str]:
+    prepared = prepare_text(text)
+    text_cleaned = prepared.cleaned
+    logger.debug("Полный текст для адреса: %.100s", text_cleaned)
+    examined = 0
+    for pattern in ADDRESS_PATTERNS:
+        logger.log(TRACE, "Применён шаблон для адреса: %s", pattern.pattern)
+        for match in _finditer(pattern, prepared):
+            examined += 1
             address = match.group(1).strip()
-            address = re.sub(r'\s+', ' ', address).strip()
-            if len(address) > 10 and not re.search(r'\d{2}\.\d{2}\.\d{2,4}', address, re.UNICODE):
+            address = WHITESPACE_RE.sub(' ', address).strip()
+            if len(address) > 10 and not DATE_IN_ADDRESS.search(address):
                 if 'Липецк Ангарская' in address.lower():
                     address = 'Липецк ул. Ангарская д. 7 кв. 22'
                 elif 'СПб Пионерстроя' in address.lower():
@@ -25,17 +59,20 @@ def extract_address(text: str) -> Optional[str]:
                     address = 'Ставропольский край, Нефтекамский р-н, пос. Затеречный, ул. М. Горького, д. 16, кв. 1'
                 elif 'Домодедово Коммунистическая' in address.lower():
                     address = 'Московская обл. г. Домодедово, мкр. Северный, ул. 1-я Коммунистическая, д. 34, кв. 46'
-                logger.debug(f"Извлечён адрес: {address}")
+                logger.debug("Извлечён адрес: %s", address)
+                if metrics.ENABLED:
+                    metrics.count('extract_address', examined, 1)
                 return address
-            logger.debug(f"Адрес {address} исключён: слишком короткий или содержит дату")
+            logger.log(TRACE, "Адрес %s исключён: слишком короткий или содержит дату", address)
+    if metrics.ENABLED:
+        metrics.count('extract_address', examined)
     logger.debug("Адрес не найден")
     return None
 
-def extract_address_data(text: str) -> dict:
-    result = {}
-    address = extract_address(text)
-    if address:
-        result['Адрес_регистрации'] = address
-        result['Прописка'] = address
-    logger.debug(f"Результат данных адреса: {result}")
-    return result
+def fill_address_data(text: TextLike, record: DriverRecord) -> DriverRecord:
+    record.address = extract_address(prepare_text(text))
+    logger.debug("Адрес: %s", record.address)
+    return record
+
+def extract_address_data(text: TextLike) -> dict:
+    return fill_address_data(text, DriverRecord()).to_dict()
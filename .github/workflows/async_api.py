@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# driver_parser/async_api.py
+import asyncio
+import logging
+import os
+import weakref
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Optional, Union
+from .batch import ERROR_KEY, ParseResult, _fields, _init_worker, _parse_chunk, _safe_parse
+
+logger = logging.getLogger(__name__)
+
+Texts = Union[Iterable[str], AsyncIterable[str]]
+
+
+class AsyncParser:
+    """Разбор сообщений из asyncio без блокировки цикла событий.
+
+    Работа выполняется в пуле процессов (по умолчанию) или потоков. Семафор ограничивает
+    число одновременно отправленных в пул задач: вызовы сверх лимита ждут своей очереди,
+    не нагружая пул. Слот освобождается, только когда задача в пуле действительно
+    завершилась, поэтому отменённые и просроченные вызовы не превышают лимит.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None, workers: Optional[int] = None,
+                 use_processes: bool = True, max_concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._own_executor = executor is None
+        if executor is None:
+            if use_processes:
+                executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            else:
+                executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='driver-parser')
+        self.executor = executor
+        self.max_concurrency = max_concurrency or self.workers * 2
+        self.timeout = timeout
+        # Семафор привязан к циклу событий, поэтому у каждого цикла свой
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _limit(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _submit(self, func, *args, timeout: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        semaphore = self._limit(loop)
+        await semaphore.acquire()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_) -> None:
+            # Вызывается из потока пула, когда задача закончилась или была отменена до запуска
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # цикл событий уже закрыт
+
+        future.add_done_callback(release)
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            # shield: таймаут или отмена вызывающего не трогают обёртку; задачу пула отменяем
+            # явно — это удаётся, только пока она не начата, иначе слот занят до её конца
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            future.cancel()
+            raise
+
+    async def parse(self, text: str, is_driver_data: bool = True, timeout: Optional[float] = None,
+                    fields: Optional[Iterable[str]] = None) -> ParseResult:
+        """Асинхронный parse_by_keywords; при превышении timeout поднимает asyncio.TimeoutError."""
+        return await self._submit(_safe_parse, text, is_driver_data, _fields(fields), timeout=timeout)
+
+    async def parse_many(self, texts: Texts, chunksize: int = 16, is_driver_data: bool = True,
+                         timeout: Optional[float] = None, max_pending: Optional[int] = None,
+                         fields: Optional[Iterable[str]] = None) -> AsyncIterator[ParseResult]:
+        """Разбирает поток сообщений, отдавая результаты в порядке входа.
+
+        Источник читается не дальше чем на max_pending пачек вперёд (по умолчанию
+        max_concurrency). Пачка, не уложившаяся в timeout, даёт для каждого своего
+        сообщения (False, {ERROR_KEY: ...}), как и упавший разбор в batch.parse_many.
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize должен быть положительным")
+        fields = _fields(fields)
+        limit = max_pending or self.max_concurrency
+        pending = deque()
+
+        async def finish(task: asyncio.Task, size: int) -> List[ParseResult]:
+            try:
+                return [result for _, result in await task]
+            except asyncio.TimeoutError:
+                logger.warning("ASYNC: Пачка из %s сообщений не уложилась в таймаут", size)
+                return [(False, {ERROR_KEY: 'TimeoutError'})] * size
+
+        def submit(chunk: List[str]) -> None:
+            indexed = list(enumerate(chunk))
+            task = asyncio.ensure_future(self._submit(_parse_chunk, indexed, is_driver_data, fields, timeout=timeout))
+            pending.append((task, len(chunk)))
+
+        try:
+            chunk = []
+            async for text in _aiter(texts):
+                chunk.append(text)
+                if len(chunk) >= chunksize:
+                    submit(chunk)
+                    chunk = []
+                    while len(pending) >= limit:
+                        for result in await finish(*pending.popleft()):
+                            yield result
+            if chunk:
+                submit(chunk)
+            while pending:
+                for result in await finish(*pending.popleft()):
+                    yield result
+        finally:
+            for task, _ in pending:
+                task.cancel()
+
+    async def close(self, wait: bool = True) -> None:
+        if self._own_executor:
+            await asyncio.get_running_loop().run_in_executor(None, partial(self.executor.shutdown, wait=wait,
+                                                                           cancel_futures=True))
+
+    async def __aenter__(self) -> 'AsyncParser':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+async def _aiter(texts: Texts) -> AsyncIterator[str]:
+    if hasattr(texts, '__aiter__'):
+        async for text in texts:
+            yield text
+    else:
+        for text in texts:
+            yield text
+
+
+_default_parser: Optional[AsyncParser] = None
+
+
+def configure(**options) -> AsyncParser:
+    """Задаёт параметры общего AsyncParser, которым пользуются aparse и aparse_many."""
+    global _default_parser
+    if _default_parser is not None and _default_parser._own_executor:
+        _default_parser.executor.shutdown(wait=False, cancel_futures=True)
+    _default_parser = AsyncParser(**options)
+    return _default_parser
+
+
+def default_parser() -> AsyncParser:
+    if _default_parser is None:
+        configure()
+    return _default_parser
+
+
+async def aparse(text: str, is_driver_data: bool = True, timeout: Optional[float] = None,
+                 fields: Optional[Iterable[str]] = None) -> ParseResult:
+    return await default_parser().parse(text, is_driver_data, timeout, fields)
+
+
+async def aparse_many(texts: Texts, chunksize: int = 16, is_driver_data: bool = True,
+                      timeout: Optional[float] = None,
+                      fields: Optional[Iterable[str]] = None) -> AsyncIterator[ParseResult]:
+    async for result in default_parser().parse_many(texts, chunksize, is_driver_data, timeout, fields=fields):
+        yield result
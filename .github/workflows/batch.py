@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# driver_parser/batch.py
+import logging
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .cache import disable_cache
+from .extractors import extraction_plan
+from .main import _parse_by_keywords, parse_by_keywords
+
+logger = logging.getLogger(__name__)
+
+# Ключ, под которым в записи об ошибке сохраняется текст исключения
+ERROR_KEY = 'Ошибка'
+
+ParseResult = Tuple[bool, Dict]
+Fields = Optional[Tuple[str, ...]]
+
+
+def _safe_parse(text: str, is_driver_data: bool, fields: Fields = None) -> ParseResult:
+    # Ошибку разбора перехватываем здесь, а не в parse_by_keywords, чтобы она попала в результат
+    try:
+        if not isinstance(text, str):
+            raise TypeError(f"сообщение должно быть строкой, а не {type(text).__name__}")
+        return _parse_by_keywords(text, is_driver_data, extraction_plan(fields), fields)
+    except Exception as e:
+        logger.error("BATCH: Ошибка разбора сообщения: %s: %s", type(e).__name__, e)
+        return False, {ERROR_KEY: f"{type(e).__name__}: {e}"}
+
+
+def _parse_chunk(chunk: List[Tuple[int, str]], is_driver_data: bool,
+                 fields: Fields = None) -> List[Tuple[int, ParseResult]]:
+    return [(index, _safe_parse(text, is_driver_data, fields)) for index, text in chunk]
+
+
+def _fields(fields: Optional[Iterable[str]]) -> Fields:
+    """Набор полей для передачи в процессы пула; неизвестное поле — ValueError сразу."""
+    if fields is None:
+        return None
+    fields = (fields,) if isinstance(fields, str) else tuple(fields)
+    extraction_plan(fields)
+    return fields
+
+
+def _chunks(texts: Iterable[str], chunksize: int) -> Iterator[List[Tuple[int, str]]]:
+    indexed = enumerate(texts)
+    while True:
+        chunk = list(islice(indexed, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_worker() -> None:
+    # Кэш результатов работает только в родительском процессе; унаследованное через fork
+    # соединение SQLite кэш уже забыл, не закрывая его (см. cache._open_caches)
+    disable_cache()
+    # Шаблоны компилируются при импорте; пробный разбор прогревает остальное состояние процесса
+    parse_by_keywords("Водитель: Иванов Иван Иванович", True)
+
+
+def parse_many(texts: Iterable[str], workers: Optional[int] = None, chunksize: int = 64,
+               ordered: bool = True, is_driver_data: bool = True,
+               max_pending: Optional[int] = None, fields: Optional[Iterable[str]] = None) -> Iterator:
+    """Разбирает поток сообщений в пуле процессов.
+
+    Args:
+        texts: Итерируемый источник сообщений; читается по мере обработки.
+        workers: Число процессов (по умолчанию os.cpu_count()); 0 или 1 — разбор в текущем процессе.
+        chunksize: Сколько сообщений отправляется в процесс за раз.
+        ordered: True — результаты в порядке входа, False — по готовности в виде (индекс, результат).
+        is_driver_data: Передаётся в parse_by_keywords.
+        max_pending: Предел одновременно отправленных пачек (по умолчанию workers * 4).
+        fields: Нужные поля результата, как в parse_by_keywords (None — все).
+
+    Returns:
+        Итератор результатов parse_by_keywords. Для сообщения, на котором разбор упал,
+        возвращается (False, {ERROR_KEY: описание ошибки}), остальная пачка не прерывается.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize должен быть положительным")
+    fields = _fields(fields)
+    if workers is not None and workers <= 1:
+        for chunk in _chunks(texts, chunksize):
+            for index, result in _parse_chunk(chunk, is_driver_data, fields):
+                yield result if ordered else (index, result)
+        return
+
+    # concurrent.futures.process тянет за собой multiprocessing; без пула он не нужен
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    limit = max_pending or workers * 4
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    try:
+        pending = deque()
+        for chunk in _chunks(texts, chunksize):
+            pending.append(executor.submit(_parse_chunk, chunk, is_driver_data, fields))
+            if len(pending) >= limit:
+                yield from _drain(pending, ordered)
+        while pending:
+            yield from _drain(pending, ordered)
+    finally:
+        # Если потребитель остановился раньше (break, close), неначатые пачки отменяются:
+        # ждать приходится только те, что уже разбираются
+        executor.shutdown(cancel_futures=True)
+
+
+def _drain(pending: deque, ordered: bool) -> Iterator:
+    """Отдаёт результаты одной (ordered) или всех уже готовых пачек."""
+    if ordered:
+        for index, result in pending.popleft().result():
+            yield result
+        return
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+        yield from future.result()
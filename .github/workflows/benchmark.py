@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+# driver_parser/benchmark.py
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .corpus import PATHOLOGICAL_CASES, add_corpus_arguments, corpus_options, generate_corpus, pathological_text
+from .engine import PreparedText, TextLike
+from .main import parse_by_keywords
+from .passport import (extract_passport_code, extract_passport_date, extract_passport_series_and_number,
+                       normalize_issuing_authority)
+from .personal_data import extract_date_of_birth, extract_driver_license, extract_phone, find_name
+from .vehicle import normalize_vehicle_number
+from .address import extract_address
+from .patterns import snapshot_path
+from .warmup import SAMPLE_MESSAGE
+
+# Формат результата; увеличивается при несовместимых изменениях структуры JSON
+SCHEMA_VERSION = 1
+# Бюджет времени от начала импорта пакета до первого результата parse_by_keywords, мс
+STARTUP_BUDGET_MS = 100.0
+
+
+def _prepare(text: str) -> PreparedText:
+    prepared = PreparedText(text)
+    prepared.hits('date')
+    prepared.anchors('car')
+    return prepared
+
+
+# Экстракторы замеряются на уже подготовленном тексте (нормализация, единый проход
+# по токенам и индекс ключевых слов выполнены заранее); их стоимость показывает отдельная строка prepare_text.
+EXTRACTORS: List[Tuple[str, Callable[[TextLike], object]]] = [
+    ('find_name', find_name),
+    ('extract_date_of_birth', extract_date_of_birth),
+    ('extract_phone', extract_phone),
+    ('extract_driver_license', extract_driver_license),
+    ('extract_passport_series_and_number', extract_passport_series_and_number),
+    ('normalize_issuing_authority', normalize_issuing_authority),
+    ('extract_passport_date', extract_passport_date),
+    ('extract_passport_code', extract_passport_code),
+    ('normalize_vehicle_number:car', normalize_vehicle_number),
+    ('normalize_vehicle_number:trailer', lambda text: normalize_vehicle_number(text, is_trailer=True)),
+    ('extract_address', extract_address),
+]
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Перцентиль по методу ближайшего ранга; `sorted_values` должен быть отсортирован."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Сводка по задержкам (в секундах) одного прогона."""
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'calls': len(latencies),
+        'total_seconds': total,
+        'throughput_per_second': len(latencies) / total if total else 0.0,
+        'mean_us': total / len(latencies) * 1e6 if latencies else 0.0,
+        'p50_us': percentile(latencies, 0.50) * 1e6,
+        'p90_us': percentile(latencies, 0.90) * 1e6,
+        'p99_us': percentile(latencies, 0.99) * 1e6,
+        'max_us': latencies[-1] * 1e6 if latencies else 0.0,
+    }
+
+
+def time_calls(func: Callable, inputs: Sequence, repeat: int) -> List[float]:
+    """Время каждого вызова func(input); лучший из `repeat` прогонов по каждому входу."""
+    clock = time.perf_counter
+    best = [float('inf')] * len(inputs)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for index, value in enumerate(inputs):
+                started = clock()
+                func(value)
+                elapsed = clock() - started
+                if elapsed < best[index]:
+                    best[index] = elapsed
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best
+
+
+def peak_memory(func: Callable, inputs: Sequence) -> int:
+    """Пиковый объём памяти (байт), выделенной Python за один проход по корпусу."""
+    tracemalloc.start()
+    try:
+        for value in inputs:
+            func(value)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=5, check=True).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(texts: Sequence[str], repeat: int = 3, extractors: bool = True,
+                  memory: bool = True) -> Dict:
+    """Замеряет parse_by_keywords и экстракторы на корпусе `texts`."""
+    for text in texts[:20]:
+        parse_by_keywords(text, True)
+    results = {'parse_by_keywords': summarize(time_calls(lambda text: parse_by_keywords(text, True), texts, repeat))}
+    if extractors:
+        results['prepare_text'] = summarize(time_calls(_prepare, texts, repeat))
+        prepared = [_prepare(text) for text in texts]
+        for name, func in EXTRACTORS:
+            results[name] = summarize(time_calls(func, prepared, repeat))
+    report = {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': _revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'messages': len(texts),
+        'mean_message_length': sum(map(len, texts)) / len(texts) if texts else 0.0,
+        'repeat': repeat,
+        'results': results,
+    }
+    if memory:
+        report['peak_memory_bytes'] = peak_memory(lambda text: parse_by_keywords(text, True), texts)
+    return report
+
+
+def run_scaling(repeats: Sequence[int] = (50, 100, 200, 400, 800), repeat: int = 3) -> Dict:
+    """Время на патологических входах растущей длины (corpus.PATHOLOGICAL_CASES).
+
+    Экстракторы получают текст без ограничения длины, чтобы был виден их собственный рост;
+    parse_by_keywords — с обычным ограничением MAX_TEXT_LENGTH. `exponent` — наклон
+    log(время) / log(длина) между крайними размерами: около 1 при линейном росте, 2 — при квадратичном.
+    """
+    functions = [('parse_by_keywords', lambda text: parse_by_keywords(text, True))]
+    functions += [(name, lambda text, func=func: func(PreparedText(text, max_length=None))) for name, func in EXTRACTORS]
+    cases = {}
+    for case in PATHOLOGICAL_CASES:
+        texts = [pathological_text(case, count) for count in repeats]
+        lengths = [len(text) for text in texts]
+        rows = {}
+        for name, func in functions:
+            seconds = time_calls(func, texts, repeat)
+            exponent = math.log(max(seconds[-1], 1e-9) / max(seconds[0], 1e-9)) / math.log(lengths[-1] / lengths[0])
+            rows[name] = {'seconds': seconds, 'exponent': exponent}
+        cases[case] = {'lengths': lengths, 'results': rows}
+    return {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': _revision(),
+        'python': platform.python_version(),
+        'cases': cases,
+    }
+
+
+# Выполняется в новом интерпретаторе: время импорта пакета и первого разбора, секунды
+_STARTUP_SCRIPT = '''
+import time
+started = time.perf_counter()
+import {package}
+imported = time.perf_counter()
+{package}.parse_by_keywords({sample!r}, True)
+print(imported - started, time.perf_counter() - imported)
+'''
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, int]]:
+    """Разбирает вывод `python -X importtime`: модуль -> собственное и суммарное время, мкс."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules[fields[2].strip()] = {'self_us': int(fields[0]), 'cumulative_us': int(fields[1])}
+    return modules
+
+
+def run_startup(repeat: int = 5, top: int = 15) -> Dict:
+    """Холодный запуск: импорт пакета и первый разбор в `repeat` новых интерпретаторах.
+
+    Возвращает медианы по запускам и самые долгие по суммарному времени импорты
+    (по данным -X importtime запуска с медианным временем до первого разбора).
+    """
+    package = __package__ or 'driver_parser'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    script = _STARTUP_SCRIPT.format(package=package, sample=SAMPLE_MESSAGE)
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], capture_output=True,
+                                   text=True, env=env, cwd=root, check=True)
+        imported, first_parse = map(float, completed.stdout.split())
+        runs.append((imported + first_parse, imported, first_parse, completed.stderr))
+    runs.sort(key=lambda run: run[0])
+    median = runs[len(runs) // 2]
+    modules = parse_importtime(median[3])
+    slowest = sorted(modules.items(), key=lambda item: item[1]['cumulative_us'], reverse=True)[:top]
+    return {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': _revision(),
+        'python': platform.python_version(),
+        'runs': repeat,
+        'snapshot': os.path.exists(snapshot_path()),
+        'import_ms': statistics.median(run[1] for run in runs) * 1000,
+        'first_parse_ms': statistics.median(run[2] for run in runs) * 1000,
+        'time_to_first_parse_ms': statistics.median(run[0] for run in runs) * 1000,
+        'modules': dict(slowest),
+    }
+
+
+def format_startup(report: Dict) -> str:
+    lines = [f"импорт {report['import_ms']:.1f} мс, первый разбор {report['first_parse_ms']:.1f} мс, "
+             f"до первого результата {report['time_to_first_parse_ms']:.1f} мс "
+             f"(снимок шаблонов {'есть' if report['snapshot'] else 'нет'})"]
+    for name, stats in report['modules'].items():
+        lines.append(f"  {name:40} {stats['cumulative_us'] / 1000:8.1f} мс  (собственное {stats['self_us'] / 1000:.1f})")
+    return '\n'.join(lines)
+
+
+def format_scaling(report: Dict) -> str:
+    lines = []
+    for case, data in report['cases'].items():
+        lines.append(f"{case} (длина {data['lengths'][0]}..{data['lengths'][-1]})")
+        for name, stats in data['results'].items():
+            lines.append(f"  {name:36} {stats['seconds'][-1] * 1000:9.2f} мс  степень {stats['exponent']:.2f}")
+    return '\n'.join(lines)
+
+
+def compare(baseline: Dict, current: Dict, metric: str = 'p50_us',
+            threshold: float = 0.10) -> List[Dict]:
+    """Сравнивает два отчёта; regression=True, если метрика выросла больше чем на threshold."""
+    rows = []
+    for name, stats in current['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old or not old.get(metric):
+            continue
+        ratio = stats[metric] / old[metric]
+        rows.append({'name': name, 'baseline': old[metric], 'current': stats[metric],
+                     'ratio': ratio, 'regression': ratio > 1 + threshold})
+    return rows
+
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'':36} {'msg/s':>9} {'p50 мкс':>9} {'p99 мкс':>9} {'mean мкс':>9}"]
+    for name, stats in report['results'].items():
+        lines.append(f"{name:36} {stats['throughput_per_second']:9.0f} {stats['p50_us']:9.1f} "
+                     f"{stats['p99_us']:9.1f} {stats['mean_us']:9.1f}")
+    if 'peak_memory_bytes' in report:
+        lines.append(f"пиковая память parse_by_keywords: {report['peak_memory_bytes'] / 1024:.0f} КиБ")
+    return '\n'.join(lines)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m driver_parser.benchmark',
+                                     description='Бенчмарк parse_by_keywords и экстракторов на синтетическом корпусе.')
+    add_corpus_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3, help='прогонов на сообщение (берётся лучший)')
+    parser.add_argument('--no-extractors', action='store_true', help='замерять только parse_by_keywords')
+    parser.add_argument('--no-memory', action='store_true', help='не замерять пиковую память')
+    parser.add_argument('-o', '--output', help='сохранить отчёт в JSON')
+    parser.add_argument('--compare', metavar='BASELINE.json', help='сравнить с сохранённым отчётом')
+    parser.add_argument('--metric', default='p50_us', help='метрика для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.10, help='допустимое относительное замедление')
+    parser.add_argument('--pathological', action='store_true',
+                        help='проверить рост времени на патологических входах вместо обычного замера')
+    parser.add_argument('--max-exponent', type=float, default=1.5,
+                        help='с --pathological: ошибка, если время растёт быстрее длины в этой степени')
+    parser.add_argument('--startup', action='store_true',
+                        help='замерить холодный запуск (импорт и первый разбор в новом процессе)')
+    parser.add_argument('--max-startup-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help='с --startup: ошибка, если время до первого результата больше')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    if args.pathological:
+        return _main_pathological(args)
+    if args.startup:
+        return _main_startup(args)
+    texts = generate_corpus(args.size, args.seed, **corpus_options(args))
+    report = run_benchmark(texts, args.repeat, extractors=not args.no_extractors, memory=not args.no_memory)
+    report['corpus'] = {'size': args.size, 'seed': args.seed, **corpus_options(args)}
+    print(format_report(report), file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            rows = compare(json.load(f), report, args.metric, args.threshold)
+        for row in rows:
+            flag = '  РЕГРЕССИЯ' if row['regression'] else ''
+            print(f"{row['name']:36} {row['baseline']:9.1f} -> {row['current']:9.1f} ({row['ratio']:.2f}x){flag}",
+                  file=sys.stderr)
+        if any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+def _main_startup(args: argparse.Namespace) -> int:
+    report = run_startup(repeat=max(args.repeat, 1))
+    print(format_startup(report), file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+    if report['time_to_first_parse_ms'] > args.max_startup_ms:
+        print(f"ПРЕВЫШЕН БЮДЖЕТ ЗАПУСКА: {report['time_to_first_parse_ms']:.1f} мс > {args.max_startup_ms:.1f} мс",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+def _main_pathological(args: argparse.Namespace) -> int:
+    report = run_scaling(repeat=args.repeat)
+    print(format_scaling(report), file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+    worst = [(case, name, stats['exponent']) for case, data in report['cases'].items()
+             for name, stats in data['results'].items() if stats['exponent'] > args.max_exponent]
+    for case, name, exponent in worst:
+        print(f"НЕЛИНЕЙНЫЙ РОСТ: {case} / {name}: степень {exponent:.2f}", file=sys.stderr)
+    return 1 if worst else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+# driver_parser/cache.py
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from .patterns import fingerprint as patterns_fingerprint
+
+# hashlib, json и sqlite3 импортируются при включении кэша: без кэша они не нужны,
+# а их загрузка заметна во времени запуска процесса
+
+logger = logging.getLogger(__name__)
+
+ParseResult = Tuple[bool, Dict]
+
+# Оценка накладных расходов на одну запись (объекты str, узел OrderedDict), байт
+ENTRY_OVERHEAD = 200
+
+# Кэш выключен, пока не вызван enable_cache()
+_active: Optional['ResultCache'] = None
+# Источники версии справочных данных; результат каждого входит в отпечаток кэша
+_version_sources: List[Callable[[], str]] = []
+# Кэши с открытым соединением SQLite. Соединение, унаследованное через fork, в дочернем процессе
+# нельзя ни использовать, ни закрывать (закрытие трогает файлы и блокировки родителя), поэтому
+# после fork кэши его забывают, а сам объект хранится в _inherited до конца процесса, чтобы
+# его не финализировал сборщик мусора
+_open_caches: 'weakref.WeakSet[ResultCache]' = weakref.WeakSet()
+_inherited: list = []
+
+
+def register_version_source(source: Callable[[], str]) -> None:
+    """Регистрирует функцию, возвращающую версию данных, от которых зависит результат разбора."""
+    if source not in _version_sources:
+        _version_sources.append(source)
+
+
+def current_fingerprint() -> str:
+    import hashlib
+    parts = [patterns_fingerprint()] + [str(source()) for source in _version_sources]
+    return hashlib.blake2b('\0'.join(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def text_key(normalized_text: str) -> str:
+    import hashlib
+    return hashlib.blake2b(normalized_text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """LRU-кэш результатов parse_by_keywords по хешу нормализованного текста.
+
+    Результаты хранятся сериализованными в JSON, поэтому вызывающий код получает
+    новый словарь и не может испортить закэшированное значение. При заданном `path`
+    промахи памяти проверяются в SQLite, где записи переживают перезапуск процесса.
+    Записи с другим отпечатком (набор шаблонов, версии справочников) считаются промахами.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = os.getpid()
+        self.fingerprint = current_fingerprint()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            import sqlite3
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS results ('
+                             'key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL)')
+            _open_caches.add(self)
+
+    @staticmethod
+    def _size(key: str, value: str) -> int:
+        # Кириллица хранится в str по 2 байта на символ. sys.getsizeof не подходит:
+        # он растёт, когда sqlite3 кэширует в объекте UTF-8-представление строки
+        return len(key) + 2 * len(value) + ENTRY_OVERHEAD
+
+    def _forget_inherited(self) -> None:
+        # Соединение открыто в другом процессе: дальше кэш работает только в памяти
+        if self._db is not None and self._pid != os.getpid():
+            logger.debug("CACHE: Соединение SQLite унаследовано от процесса %s и не используется", self._pid)
+            _inherited.append(self._db)
+            self._db = None
+            _open_caches.discard(self)
+
+    def get(self, normalized_text: str) -> Optional[ParseResult]:
+        key = text_key(normalized_text)
+        with self._lock:
+            self._forget_inherited()
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._decode(value)
+            if self._db is not None:
+                row = self._db.execute('SELECT value FROM results WHERE key = ? AND fingerprint = ?',
+                                       (key, self.fingerprint)).fetchone()
+                if row is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store(key, row[0])
+                    return self._decode(row[0])
+            self.misses += 1
+            return None
+
+    def put(self, normalized_text: str, result: ParseResult) -> None:
+        import json
+        key = text_key(normalized_text)
+        value = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._forget_inherited()
+            self._store(key, value)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO results (key, fingerprint, value, created) VALUES (?, ?, ?, ?)',
+                                 (key, self.fingerprint, value, time.time()))
+
+    @staticmethod
+    def _decode(value: str) -> ParseResult:
+        import json
+        ok, data = json.loads(value)
+        return ok, data
+
+    def _store(self, key: str, value: str) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= self._size(key, previous)
+        self._entries[key] = value
+        self._bytes += self._size(key, value)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, old_value = self._entries.popitem(last=False)
+            self._bytes -= self._size(old_key, old_value)
+            self.evictions += 1
+
+    def invalidate(self, purge_disk: bool = False) -> None:
+        """Сбрасывает кэш после изменения шаблонов или справочников.
+
+        Память очищается всегда, записи на диске со старым отпечатком удаляются;
+        purge_disk=True очищает и диск целиком (если изменились данные, не учтённые
+        в отпечатке).
+        """
+        with self._lock:
+            self._forget_inherited()
+            self._entries.clear()
+            self._bytes = 0
+            self.fingerprint = current_fingerprint()
+            if self._db is not None:
+                if purge_disk:
+                    self._db.execute('DELETE FROM results')
+                else:
+                    self._db.execute('DELETE FROM results WHERE fingerprint != ?', (self.fingerprint,))
+        logger.info("CACHE: Кэш результатов сброшен, отпечаток %s", self.fingerprint)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'fingerprint': self.fingerprint,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._forget_inherited()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                _open_caches.discard(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def enable_cache(max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 path: Optional[str] = None) -> ResultCache:
+    """Включает кэш результатов для parse_by_keywords в текущем процессе.
+
+    Процессы пула parse_many кэш не используют.
+    """
+    global _active
+    if _active is not None:
+        _active.close()
+    _active = ResultCache(max_entries, max_bytes, path)
+    return _active
+
+
+def disable_cache() -> None:
+    global _active
+    if _active is not None:
+        _active.close()
+    _active = None
+
+
+def active_cache() -> Optional[ResultCache]:
+    return _active
+
+
+def invalidate_cache(purge_disk: bool = False) -> None:
+    """Хук для сброса кэша при изменении шаблонов или справочных таблиц."""
+    if _active is not None:
+        _active.invalidate(purge_disk)
+
+
+def cache_stats() -> Optional[Dict]:
+    return _active.stats() if _active is not None else None
+
+
+def _after_fork_in_child() -> None:
+    for cache in list(_open_caches):
+        cache._forget_inherited()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
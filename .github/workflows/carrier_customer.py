@@ -3,37 +3,36 @@
 import re
 from typing import Dict, Optional
 from .imports_and_settings import logger
+from .patterns import register
 
-logger.debug("Логгер инициализирован в carrier_customer")
-logger.handlers[0].flush()
+CARRIER_PATTERN = register('carrier_customer.carrier', r"(?i)перевозчик\s*[:\-\s]*(.*?)(?=\s*$)", re.MULTILINE)
+SHORT_NAME_PATTERN = register('carrier_customer.short_name', r"(?i)ИП\s+([А-ЯЁ][а-яё]+)")
 
 def parse_carrier_customer_data(text: str) -> Dict[str, Optional[str]]:
     """Parses carrier/customer data from text."""
-    logger.debug(f"Поиск данных перевозчика в тексте: {text[:100]}...")
+    logger.debug("Поиск данных перевозчика в тексте: %.100s...", text)
     data = {
         "Перевозчик": None,
         "Короткое название": None
     }
 
-    carrier_pattern = r"(?i)перевозчик\s*[:\-\s]*(.*?)(?=\s*$)"
-    carrier_match = re.search(carrier_pattern, text, re.MULTILINE)
+    carrier_match = CARRIER_PATTERN.search(text)
     if carrier_match:
         carrier = carrier_match.group(1).strip()
         data["Перевозчик"] = carrier
-        logger.debug(f"Перевозчик извлечён: {data['Перевозчик']}")
+        logger.debug("Перевозчик извлечён: %s", data['Перевозчик'])
 
         # Extract short name (e.g., last name from "ИП Иванов")
-        short_name_pattern = r"(?i)ИП\s+([А-ЯЁ][а-яё]+)"
-        short_name_match = re.search(short_name_pattern, carrier)
+        short_name_match = SHORT_NAME_PATTERN.search(carrier)
         if short_name_match:
             data["Короткое название"] = short_name_match.group(1)
-            logger.debug(f"Короткое название извлечено: {data['Короткое название']}")
+            logger.debug("Короткое название извлечено: %s", data['Короткое название'])
         else:
             # If no "ИП", use the last word as short name
             words = carrier.split()
             if words:
                 data["Короткое название"] = words[-1]
-                logger.debug(f"Короткое название извлечено (последнее слово): {data['Короткое название']}")
+                logger.debug("Короткое название извлечено (последнее слово): %s", data['Короткое название'])
     else:
         logger.debug("Перевозчик не найден")
 
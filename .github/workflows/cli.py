@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# driver_parser/cli.py
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from collections import deque
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from .batch import ERROR_KEY, parse_many
+from .extractors import extraction_plan, plan_fields
+from .imports_and_settings import set_trace
+from .main import RESULT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv')
+# Разделитель для списочных полей (телефоны) в CSV
+LIST_SEPARATOR = '; '
+
+
+def _detect_format(path: Optional[str], default: str = 'jsonl') -> str:
+    if path and path.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def _lines_with_offsets(stream: BinaryIO, offset: int) -> Iterator[Tuple[str, int]]:
+    """Строки входа вместе с байтовым смещением конца каждой строки."""
+    for raw in stream:
+        offset += len(raw)
+        yield raw.decode('utf-8'), offset
+
+
+def read_jsonl(stream: BinaryIO, text_field: str, offset: int = 0) -> Iterator[Tuple[dict, str, int]]:
+    for line, end in _lines_with_offsets(stream, offset):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            logger.warning("CLI: Пропущена некорректная строка JSON перед смещением %s: %s", end, e)
+            continue
+        if not isinstance(record, dict):
+            logger.warning("CLI: Пропущена некорректная строка JSON перед смещением %s: %s", end,
+                           f"ожидался объект, а не {type(record).__name__}")
+            continue
+        yield record, str(record.get(text_field) or ''), end
+
+
+def read_csv(stream: BinaryIO, text_field: str, offset: int = 0,
+             header: Optional[List[str]] = None) -> Iterator[Tuple[dict, str, int]]:
+    lines = _lines_with_offsets(stream, offset)
+    position = [offset]
+
+    def tracked() -> Iterator[str]:
+        for line, end in lines:
+            position[0] = end
+            yield line
+
+    reader = csv.reader(tracked())
+    if header is None:
+        header = next(reader, None)
+        if header is None:
+            return
+    for row in reader:
+        record = dict(zip(header, row))
+        yield record, record.get(text_field) or '', position[0]
+
+
+def read_csv_header(path: str) -> List[str]:
+    with open(path, 'rb') as stream:
+        return next(csv.reader(line for line, _ in _lines_with_offsets(stream, 0)), [])
+
+
+class RecordWriter:
+    """Пишет обогащённые записи пачками по buffer_size штук."""
+
+    def __init__(self, stream, output_format: str, input_fields: List[str], result_key: str,
+                 buffer_size: int, write_header: bool, result_fields: Tuple[str, ...] = RESULT_FIELDS):
+        self.stream = stream
+        self.output_format = output_format
+        self.result_key = result_key
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.columns = list(input_fields) + [f for f in result_fields + (ERROR_KEY,) if f not in input_fields]
+        self._csv_buffer = io.StringIO()
+        self._csv = csv.DictWriter(self._csv_buffer, fieldnames=self.columns, extrasaction='ignore')
+        if output_format == 'csv' and write_header:
+            self._csv.writeheader()
+            self._flush_csv()
+
+    def add(self, record: dict, ok: bool, data: dict) -> bool:
+        """Добавляет запись; возвращает True, если буфер был записан на диск."""
+        if self.output_format == 'jsonl':
+            enriched = dict(record)
+            enriched[self.result_key] = data
+            self.buffer.append(json.dumps(enriched, ensure_ascii=False) + '\n')
+        else:
+            row = dict(record)
+            for key, value in data.items():
+                row[key] = LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+            self._csv.writerow(row)
+            self.buffer.append(self._csv_buffer.getvalue())
+            self._csv_buffer.seek(0)
+            self._csv_buffer.truncate()
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self) -> None:
+        if self.buffer:
+            self.stream.write(''.join(self.buffer))
+            self.buffer.clear()
+        self.stream.flush()
+
+    def _flush_csv(self) -> None:
+        self.stream.write(self._csv_buffer.getvalue())
+        self._csv_buffer.seek(0)
+        self._csv_buffer.truncate()
+
+
+class Progress:
+    def __init__(self, every: int, stream=sys.stderr):
+        self.every = every
+        self.stream = stream
+        self.started = time.perf_counter()
+        self.count = 0
+        self.parsed = 0
+
+    def update(self, ok: bool, offset: int, force: bool = False) -> None:
+        self.count += 1
+        self.parsed += ok
+        if force or (self.every and self.count % self.every == 0):
+            self.report(offset)
+
+    def report(self, offset: int) -> None:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        self.stream.write(f"обработано {self.count} (распознано {self.parsed}), "
+                          f"{self.count / elapsed:.0f} сообщ./с, смещение {offset}\n")
+        self.stream.flush()
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m driver_parser',
+        description='Потоковый разбор данных водителей из JSONL/CSV.')
+    parser.add_argument('input', nargs='?', default='-', help="входной файл или '-' для stdin")
+    parser.add_argument('-o', '--output', default='-', help="выходной файл или '-' для stdout")
+    parser.add_argument('--format', choices=FORMATS, help='формат входа (по умолчанию по расширению, иначе jsonl)')
+    parser.add_argument('--output-format', choices=FORMATS, help='формат выхода (по умолчанию как у входа)')
+    parser.add_argument('--text-field', default='text', help='поле/колонка с текстом сообщения')
+    parser.add_argument('--result-key', default='parsed', help='ключ с результатом в JSONL')
+    parser.add_argument('--fields', help="нужные поля результата через запятую, например 'Телефон,Автомобиль' "
+                                         "(по умолчанию все)")
+    parser.add_argument('--workers', type=int, default=1, help='число процессов разбора')
+    parser.add_argument('--chunksize', type=int, default=64, help='сообщений на пачку для процесса')
+    parser.add_argument('--buffer-size', type=int, default=1000, help='записей в буфере вывода')
+    parser.add_argument('--progress-every', type=int, default=0,
+                        help='печатать прогресс в stderr каждые N записей (0 — только итог)')
+    parser.add_argument('--resume-offset', type=int, default=0,
+                        help='байтовое смещение во входном файле, с которого продолжить после сбоя')
+    parser.add_argument('--log-level', default='WARNING', help='уровень логирования (DEBUG, INFO, WARNING, ...)')
+    parser.add_argument('--trace', action='store_true', help='трассировка каждого кандидата (очень подробно, медленно)')
+    return parser
+
+
+def run(args: argparse.Namespace) -> int:
+    input_format = args.format or _detect_format(args.input)
+    output_format = args.output_format or input_format
+    if args.resume_offset and args.input == '-':
+        raise SystemExit('--resume-offset требует входной файл')
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()] if args.fields else None
+    try:
+        result_fields = plan_fields(extraction_plan(fields))
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    header = None
+    if input_format == 'csv' and args.resume_offset:
+        header = read_csv_header(args.input)
+    if args.resume_offset:
+        source.seek(args.resume_offset)
+    if input_format == 'csv':
+        records = read_csv(source, args.text_field, args.resume_offset, header)
+    else:
+        records = read_jsonl(source, args.text_field, args.resume_offset)
+
+    # Записи ждут своего результата в очереди; parse_many сохраняет порядок,
+    # а размер очереди ограничен числом пачек, отправленных в пул
+    waiting = deque()
+
+    def texts() -> Iterator[str]:
+        for record, text, end in records:
+            waiting.append((record, end))
+            yield text
+
+    if args.output == '-':
+        sink = sys.stdout
+    else:
+        sink = open(args.output, 'a' if args.resume_offset else 'w', encoding='utf-8', newline='')
+    progress = Progress(args.progress_every)
+    writer = None
+    offset = args.resume_offset
+    try:
+        for ok, data in parse_many(texts(), workers=args.workers, chunksize=args.chunksize, fields=fields):
+            record, end = waiting.popleft()
+            if writer is None:
+                writer = RecordWriter(sink, output_format, list(record), args.result_key,
+                                      args.buffer_size, write_header=not args.resume_offset,
+                                      result_fields=result_fields)
+            if writer.add(record, ok, data):
+                offset = end
+            progress.update(ok, offset)
+            last_end = end
+        if writer is not None:
+            writer.flush()
+            offset = last_end
+        progress.report(offset)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    # CLI — само приложение, поэтому здесь (и только здесь) настраивается корневой логгер
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr)
+    if args.trace:
+        set_trace(True)
+    return run(args)
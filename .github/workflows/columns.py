@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+# driver_parser/columns.py
+import logging
+from array import array
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .engine import prepare_batch
+from .extractors import extraction_plan
+from .models import FIELD_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Колоночный разбор: вместо словаря на сообщение — по столбцу на поле результата.
+# Столбцы хранятся в раскладке Apache Arrow (large_string и large_list<large_string>):
+# байты значений подряд в UTF-8, смещения int64 и битовая маска заполненных строк.
+# Буферы поддерживают buffer protocol, поэтому to_arrow() и to_numpy() их не копируют;
+# pyarrow и numpy нужны только для этих методов. Пока существуют такие представления,
+# столбец не дополняется: bytearray и array с внешними ссылками не меняют размер.
+#
+# Сообщения разбираются пачками по `batch_size`: пачка склеивается в один буфер
+# (engine.prepare_batch), нормализация, единый проход и индекс ключевых слов выполняются
+# по буферу целиком, а экстракторы — по участкам отдельных сообщений.
+BATCH_SIZE = 1024
+OFFSET_TYPE = 'q'
+
+_PHONES = dict(FIELD_KEYS)['phones']
+
+
+def _import(name: str):
+    try:
+        return __import__(name)
+    except ImportError:
+        raise ImportError(f"Для преобразования столбцов нужен {name}: pip install {name}") from None
+
+
+class StringColumn:
+    """Столбец строк с пропусками в раскладке Arrow large_string."""
+
+    __slots__ = ('data', 'offsets', 'validity', 'null_count', '_length')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array(OFFSET_TYPE, [0])
+        self.validity = bytearray()
+        self.null_count = 0
+        self._length = 0
+
+    def append(self, value: Optional[str]) -> None:
+        index = self._length
+        if index % 8 == 0:
+            self.validity.append(0)
+        if value:
+            self.data += value.encode('utf-8')
+            self.validity[index >> 3] |= 1 << (index & 7)
+        else:
+            self.null_count += 1
+        self.offsets.append(len(self.data))
+        self._length += 1
+
+    def is_valid(self, index: int) -> bool:
+        return bool(self.validity[index >> 3] >> (index & 7) & 1)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        if not self.is_valid(index):
+            return None
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def to_pylist(self) -> List[Optional[str]]:
+        return [self[index] for index in range(self._length)]
+
+    def to_arrow(self):
+        """pyarrow.LargeStringArray над теми же буферами."""
+        pa = _import('pyarrow')
+        return pa.Array.from_buffers(pa.large_string(), self._length,
+                                     [pa.py_buffer(self.validity), pa.py_buffer(self.offsets),
+                                      pa.py_buffer(self.data)], self.null_count)
+
+    def to_numpy(self) -> Tuple:
+        """(смещения int64, байты UTF-8 uint8, битовая маска uint8) — представления numpy тех же буферов."""
+        np = _import('numpy')
+        return (np.frombuffer(self.offsets, dtype=np.int64), np.frombuffer(self.data, dtype=np.uint8),
+                np.frombuffer(self.validity, dtype=np.uint8))
+
+
+class ListColumn:
+    """Столбец списков строк (телефоны) в раскладке Arrow large_list<large_string>:
+    смещения строки в дочернем столбце `values`."""
+
+    __slots__ = ('values', 'offsets', 'validity', 'null_count', '_length')
+
+    def __init__(self):
+        self.values = StringColumn()
+        self.offsets = array(OFFSET_TYPE, [0])
+        self.validity = bytearray()
+        self.null_count = 0
+        self._length = 0
+
+    def append(self, items: Optional[Iterable[str]]) -> None:
+        index = self._length
+        if index % 8 == 0:
+            self.validity.append(0)
+        if items:
+            for item in items:
+                self.values.append(item)
+            self.validity[index >> 3] |= 1 << (index & 7)
+        else:
+            self.null_count += 1
+        self.offsets.append(len(self.values))
+        self._length += 1
+
+    def is_valid(self, index: int) -> bool:
+        return bool(self.validity[index >> 3] >> (index & 7) & 1)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> Optional[List[str]]:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        if not self.is_valid(index):
+            return None
+        return [self.values[item] for item in range(self.offsets[index], self.offsets[index + 1])]
+
+    def to_pylist(self) -> List[Optional[List[str]]]:
+        return [self[index] for index in range(self._length)]
+
+    def to_arrow(self):
+        """pyarrow.LargeListArray над теми же буферами."""
+        pa = _import('pyarrow')
+        return pa.Array.from_buffers(pa.large_list(pa.large_string()), self._length,
+                                     [pa.py_buffer(self.validity), pa.py_buffer(self.offsets)],
+                                     self.null_count, children=[self.values.to_arrow()])
+
+    def to_numpy(self) -> Tuple:
+        """(смещения int64, битовая маска uint8, столбец значений) — без копирования."""
+        np = _import('numpy')
+        return (np.frombuffer(self.offsets, dtype=np.int64), np.frombuffer(self.validity, dtype=np.uint8),
+                self.values.to_numpy())
+
+
+class ColumnBatch:
+    """Результаты разбора по столбцам: ключ поля результата -> StringColumn или ListColumn
+    (телефоны). Строка i всех столбцов — i-е сообщение; незаполненное поле — пропуск."""
+
+    def __init__(self, fields: Iterable[str]):
+        self.columns = {key: ListColumn() if key == _PHONES else StringColumn() for key in fields}
+        self._length = 0
+
+    def append(self, values: Dict[str, object]) -> None:
+        for key, column in self.columns.items():
+            column.append(values.get(key))
+        self._length += 1
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, key: str):
+        return self.columns[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def row(self, index: int) -> Dict:
+        """Строка в виде словаря parse_by_keywords (без синонима адреса)."""
+        return {key: value for key, column in self.columns.items() for value in (column[index],) if value}
+
+    def to_pydict(self) -> Dict[str, list]:
+        return {key: column.to_pylist() for key, column in self.columns.items()}
+
+    def to_arrow(self):
+        """pyarrow.Table; буферы столбцов не копируются."""
+        pa = _import('pyarrow')
+        return pa.Table.from_arrays([column.to_arrow() for column in self.columns.values()], names=list(self.columns))
+
+
+def _batches(texts: Iterable[Optional[str]], size: int) -> Iterator[List[Optional[str]]]:
+    iterator = iter(texts)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_columns(texts: Iterable[Optional[str]], fields: Optional[Iterable[str]] = None,
+                  batch_size: int = BATCH_SIZE) -> ColumnBatch:
+    """Разбирает сообщения (как parse_by_keywords(text, True)) в столбцы.
+
+    Args:
+        texts: Сообщения, например столбец DataFrame; None — пустое сообщение.
+        fields: Нужные поля результата, как в parse_by_keywords (None — все).
+        batch_size: Сколько сообщений склеивается в один буфер.
+
+    Returns:
+        ColumnBatch со столбцом на каждое поле плана. Сообщение, на котором разбор упал,
+        даёт строку из пропусков; кэш результатов не используется.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size должен быть положительным")
+    plan = extraction_plan(fields)
+    result = ColumnBatch(extractor.key for extractor in plan)
+    for batch in _batches(texts, batch_size):
+        for segment in prepare_batch(batch):
+            values = {}
+            try:
+                for extractor in plan:
+                    values[extractor.key] = extractor.extract(segment)
+            except Exception as e:
+                logger.error("COLUMNS: Ошибка разбора сообщения: %s: %s", type(e).__name__, e)
+                values = {}
+            result.append(values)
+    return result
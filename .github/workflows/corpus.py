@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# driver_parser/corpus.py
+import argparse
+import json
+import random
+import sys
+from typing import Dict, Iterator, List, Optional
+
+# Генератор синтетических сообщений с данными водителей для бенчмарков.
+# Один и тот же seed всегда даёт один и тот же корпус.
+
+SURNAMES = ['Иванов', 'Петров', 'Сидоров', 'Горшков', 'Волков', 'Кузнецов', 'Смирнов', 'Попов',
+            'Ковалев', 'Морозов', 'Соколов', 'Лебедев', 'Новиков', 'Федоров', 'Зайцев']
+FIRST_NAMES = ['Иван', 'Петр', 'Сергей', 'Александр', 'Дмитрий', 'Николай', 'Алексей', 'Михаил',
+               'Андрей', 'Юрий', 'Владимир', 'Геннадий']
+PATRONYMICS = ['Иванович', 'Петрович', 'Сергеевич', 'Александрович', 'Михайлович', 'Юрьевич',
+               'Николаевич', 'Владимирович']
+INITIALS = 'ИСАПВГМНДЮ'
+AUTHORITIES = [
+    'МРО УФМС России по Владимирской области',
+    'ОУФМС по РК г. Медвежьегорск',
+    'ГУ МВД России по г. Москве',
+    'ТП УФМС Тверской области в Оленинском районе',
+    'Отделом УФМС России по Республике Карелия',
+    'ОВД Центрального района г. Твери',
+]
+ADDRESSES = [
+    'г. Тула, ул. Ленина д. 5 кв 3',
+    'г. Липецк ул. Ангарская д. 7 кв. 22',
+    'МО, г.Коломна , б-р 800-летия Коломны, д.11, кв.89',
+    'г. Тверь, ул. Советская, д. 12, кв. 40',
+    'г. Владимир ул. Мира д 3 кв 17',
+]
+CAR_BRANDS = ['Вольво ', 'МАН ', 'Скания ', 'DAF ', 'Мерседес ', '']
+TRAILER_BRANDS = ['Кроне ', 'шмиц ', '']
+PLATE_LETTERS = 'АВЕКМНОРСТУХ'
+NOISE_WORDS = ['добрый день', 'машина на погрузке', 'срочно', 'пропуск на завтра', 'спасибо',
+               'рейс Москва - Тверь', 'ставка 45000', 'без НДС', '!!!', 'данные для доверенности']
+
+# Вероятность появления каждого поля в сообщении
+FIELD_PROBABILITIES = {
+    'name': 1.0,
+    'birth_date': 0.6,
+    'phone': 0.8,
+    'passport': 0.8,
+    'passport_authority': 0.7,
+    'passport_code': 0.5,
+    'license': 0.6,
+    'car': 0.6,
+    'trailer': 0.6,
+    'address': 0.5,
+}
+CASES = ('as_is', 'lower', 'upper', 'mixed')
+
+# Патологические входы для проверки линейности: каждый повторяет фрагмент `repeat` раз.
+# Фрагменты подобраны под шаблоны, которые раньше перебирали варианты с каждой позиции
+PATHOLOGICAL_CASES = {
+    'plate_soup': 'А 123 ВС 77 ',
+    'city_without_stop': 'г. москва ',
+    'issued_without_date': 'выдан мвд ',
+    'authorities_without_date': 'уфмс отдел ',
+    'address_keywords': 'прописка г. тула ',
+    'repeated_card': 'Водитель Иванов Иван Иванович паспорт 4510 123456 выдан ОВД района г. Москвы ',
+}
+
+
+def pathological_text(case: str, repeat: int) -> str:
+    # Завершающий символ вне всех классов не даёт шаблонам остановиться на конце текста
+    return PATHOLOGICAL_CASES[case] * repeat + '/'
+
+
+def _digits(rng: random.Random, count: int) -> str:
+    return ''.join(str(rng.randint(0, 9)) for _ in range(count))
+
+
+def _date(rng: random.Random, first_year: int, last_year: int) -> str:
+    return f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(first_year, last_year)}"
+
+
+def _name(rng: random.Random) -> str:
+    prefix = rng.choice(['Водитель: ', 'водитель ', 'Ф.И.О.: ', '', 'ФИО водителя: ', 'Данные о водителе: '])
+    if rng.random() < 0.3:
+        return f"{prefix}{rng.choice(SURNAMES)} {rng.choice(INITIALS)}. {rng.choice(INITIALS)}."
+    return f"{prefix}{rng.choice(SURNAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(PATRONYMICS)}"
+
+
+def _birth_date(rng: random.Random) -> str:
+    return f"{rng.choice(['Д.р. ', 'дата рождения: ', 'д.р. ', ''])}{_date(rng, 1960, 2004)}"
+
+
+def _phone(rng: random.Random) -> str:
+    number = _digits(rng, 10)
+    prefix = rng.choice(['Телефон: ', 'тел ', 'т. ', ''])
+    if rng.random() < 0.5:
+        return f"{prefix}{rng.choice(['8 ', '+7 ', '8-'])}{number[:3]} {number[3:6]} {number[6:8]} {number[8:]}"
+    return f"{prefix}{rng.choice(['8', '+7'])}{number}"
+
+
+def _passport(rng: random.Random, probabilities: Dict[str, float]) -> str:
+    number = _digits(rng, 10)
+    series = rng.choice([f"{number[:2]} {number[2:4]}", number[:4]])
+    parts = [f"{rng.choice(['Паспорт: ', 'паспорт ', 'Серия ', 'Паспорт серия '])}{series}{rng.choice([' ', ' № '])}{number[4:]}"]
+    if rng.random() < probabilities['passport_authority']:
+        parts.append(f"выдан {rng.choice(AUTHORITIES)} {_date(rng, 2000, 2022)}")
+    if rng.random() < probabilities['passport_code']:
+        parts.append(f"код подразделения {rng.randint(100, 999)}-{rng.randint(100, 999)}")
+    return ' '.join(parts)
+
+
+def _license(rng: random.Random) -> str:
+    number = _digits(rng, 10)
+    return f"{rng.choice(['ВУ ', 'ву: ', 'водительское удостоверение ', 'права '])}{number[:2]} {number[2:4]} {number[4:]}"
+
+
+def _car(rng: random.Random) -> str:
+    letters = rng.choice(PLATE_LETTERS), rng.choice(PLATE_LETTERS), rng.choice(PLATE_LETTERS)
+    plate = f"{letters[0]} {rng.randint(100, 999)} {letters[1]}{letters[2]} {rng.randint(10, 199)}"
+    return f"{rng.choice(['а/м ', 'Автомобиль: ', 'тягач ', 'машина '])}{rng.choice(CAR_BRANDS)}{plate}"
+
+
+def _trailer(rng: random.Random) -> str:
+    plate = f"{rng.choice(PLATE_LETTERS)}{rng.choice(PLATE_LETTERS)} {rng.randint(1000, 9999)} {rng.choice(['/ ', ''])}{rng.randint(10, 99)}"
+    return f"{rng.choice(['прицеп ', 'п/п ', 'Прицеп: ', 'п/прицеп '])}{rng.choice(TRAILER_BRANDS)}{plate}"
+
+
+def _address(rng: random.Random) -> str:
+    return f"{rng.choice(['прописка: ', 'Адрес регистрации: ', ''])}{rng.choice(ADDRESSES)}"
+
+
+def _apply_case(text: str, case: str, rng: random.Random) -> str:
+    if case == 'lower':
+        return text.lower()
+    if case == 'upper':
+        return text.upper()
+    if case == 'mixed':
+        return ' '.join(word.upper() if rng.random() < 0.2 else word for word in text.split(' '))
+    return text
+
+
+def generate_message(rng: random.Random, probabilities: Optional[Dict[str, float]] = None,
+                     noise: float = 0.0, min_length: int = 0, case: str = 'as_is') -> str:
+    """Одно синтетическое сообщение.
+
+    Args:
+        rng: Источник случайности.
+        probabilities: Вероятности полей, поверх FIELD_PROBABILITIES.
+        noise: Вероятность вставки постороннего текста между полями.
+        min_length: Сообщение дополняется посторонним текстом до этой длины.
+        case: Регистр: 'as_is', 'lower', 'upper' или 'mixed'.
+    """
+    probabilities = {**FIELD_PROBABILITIES, **(probabilities or {})}
+    builders = [
+        ('name', _name), ('birth_date', _birth_date), ('phone', _phone),
+        ('passport', lambda r: _passport(r, probabilities)), ('license', _license),
+        ('car', _car), ('trailer', _trailer), ('address', _address),
+    ]
+    parts = [build(rng) for field, build in builders if rng.random() < probabilities[field]]
+    if rng.random() < 0.3:
+        rng.shuffle(parts)
+    if noise:
+        noisy = []
+        for part in parts:
+            if rng.random() < noise:
+                noisy.append(rng.choice(NOISE_WORDS))
+            noisy.append(part)
+        parts = noisy
+    text = rng.choice(['\n', ', ', ' ']).join(parts)
+    while len(text) < min_length:
+        text = f"{text}\n{rng.choice(NOISE_WORDS)}"
+    return _apply_case(text, case, rng)
+
+
+def generate_corpus(size: int, seed: int = 1, **options) -> List[str]:
+    """Список из `size` сообщений; параметры — как у generate_message."""
+    return list(iter_corpus(size, seed, **options))
+
+
+def iter_corpus(size: int, seed: int = 1, **options) -> Iterator[str]:
+    rng = random.Random(seed)
+    for _ in range(size):
+        yield generate_message(rng, **options)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m driver_parser.corpus',
+                                     description='Синтетический корпус сообщений в JSONL (поле text).')
+    add_corpus_arguments(parser)
+    return parser
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('-n', '--size', type=int, default=1000, help='число сообщений')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--noise', type=float, default=0.0, help='вероятность постороннего текста между полями')
+    parser.add_argument('--min-length', type=int, default=0, help='минимальная длина сообщения')
+    parser.add_argument('--case', choices=CASES, default='as_is')
+    parser.add_argument('--field', action='append', default=[], metavar='ПОЛЕ=ВЕРОЯТНОСТЬ',
+                        help=f"вероятность поля ({', '.join(FIELD_PROBABILITIES)}), можно повторять")
+
+
+def corpus_options(args: argparse.Namespace) -> Dict:
+    probabilities = {}
+    for item in args.field:
+        field, _, value = item.partition('=')
+        if field not in FIELD_PROBABILITIES:
+            raise SystemExit(f"Неизвестное поле: {field}")
+        probabilities[field] = float(value)
+    return {'probabilities': probabilities, 'noise': args.noise, 'min_length': args.min_length, 'case': args.case}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    for text in iter_corpus(args.size, args.seed, **corpus_options(args)):
+        sys.stdout.write(json.dumps({'text': text}, ensure_ascii=False) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# driver_parser/dates.py
+import logging
+from datetime import date
+from typing import Optional
+from .patterns import register
+
+logger = logging.getLogger(__name__)
+
+DOTTED_DATE = register('dates.dotted', r'(\d{1,2})\.(\d{1,2})\.(\d{4}|\d{2})(?:\s*г\.?)?')
+
+# Двузначный год YY < CENTURY_PIVOT относится к 20YY, иначе к 19YY (как %y в strptime)
+CENTURY_PIVOT = 69
+
+# None — dateparser ещё не загружался, False — не установлен
+_date_parse = None
+
+
+def parse_dotted_date(value: str, century_pivot: int = CENTURY_PIVOT) -> Optional[date]:
+    """Разбирает дату вида ДД.ММ.ГГГГ или ДД.ММ.ГГ, в том числе с суффиксом " г."."""
+    match = DOTTED_DATE.fullmatch(value.strip()) if value else None
+    if not match:
+        return None
+    day, month, year = match.groups()
+    year_value = int(year)
+    if len(year) == 2:
+        year_value += 2000 if year_value < century_pivot else 1900
+    try:
+        return date(year_value, int(month), int(day))
+    except ValueError:
+        logger.debug("DATES: Некорректная дата: %s", value)
+        return None
+
+
+def normalize_dotted_date(value: str, century_pivot: int = CENTURY_PIVOT) -> Optional[str]:
+    """Возвращает дату в формате ДД.ММ.ГГГГ или None, если дата некорректна."""
+    parsed = parse_dotted_date(value, century_pivot)
+    return parsed.strftime('%d.%m.%Y') if parsed else None
+
+
+def load_date_parser():
+    """Функция dateparser.parse или False, если dateparser не установлен; импорт — один раз."""
+    global _date_parse
+    if _date_parse is None:
+        try:
+            from dateparser import parse as date_parse
+        except ImportError:
+            logger.debug("DATES: dateparser не установлен, свободный формат даты не поддерживается")
+            date_parse = False
+        _date_parse = date_parse
+    return _date_parse
+
+
+def parse_date(value: str, century_pivot: int = CENTURY_PIVOT) -> Optional[date]:
+    """Разбирает дату: сначала фиксированный формат, затем dateparser для произвольного текста.
+
+    dateparser импортируется только при первом обращении к свободному формату
+    и не обязателен: без него такие даты не распознаются.
+    """
+    parsed = parse_dotted_date(value, century_pivot)
+    if parsed or not value:
+        return parsed
+    date_parse = load_date_parser()
+    if not date_parse:
+        return None
+    parsed_datetime = date_parse(value, settings={'DATE_ORDER': 'DMY'})
+    return parsed_datetime.date() if parsed_datetime else None
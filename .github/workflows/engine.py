@@ -0,0 +1,610 @@
+# -*- coding: utf-8 -*-
+# driver_parser/engine.py
+import re
+import logging
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from . import metrics
+from .imports_and_settings import TRACE
+from .patterns import register
+from .phone import PHONE_PATTERN
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_RE = register('engine.whitespace', r'\s+')
+
+_WORD = r'[А-ЯЁ][а-яё]+'
+_FULL_NAME = rf'{_WORD}\s+{_WORD}\s+{_WORD}'
+_SHORT_NAME = rf'{_WORD}\s+[А-ЯЁ]\.\s*[А-ЯЁ]\.'
+
+# Единый проход по тексту: ФИО и все "цифровые" значения (даты, телефоны, номера документов,
+# коды подразделений; шаблон телефона — phone.PHONE_PATTERN). Ключевые слова полей проверяются уже по найденному
+# токену (см. keyword_before), поэтому альтернативы не перехватывают текст друг у друга.
+TOKEN_SCANNER = register(
+    'engine.tokens',
+    rf'(?:водитель|ф\.и\.о\.|данные\s*о\s*водителе)\s*[:\-]?\s*'
+    rf'(?:(?P<name_kw_full>{_FULL_NAME})\b|(?P<name_kw_short>{_SHORT_NAME})(?!\w))'
+    rf'|\b(?:(?P<name_full>{_FULL_NAME})\b|(?P<name_short>{_SHORT_NAME})(?!\w))'
+    r'|\b(?P<date>\d{2}\.\d{2}\.\d{2,4})\b'
+    rf'|(?P<phone>{PHONE_PATTERN})'
+    r'|\b(?P<doc>\d{2}\s*\d{2}\s*\d{6})\b'
+    r'|\b(?P<code>\d{3}-\d{3})\b',
+    re.IGNORECASE | re.UNICODE,
+)
+TOKEN_GROUPS = tuple(TOKEN_SCANNER.groupindex)
+
+# Ключевые слова, рядом с которыми экстракторы ищут значения полей. Все вхождения
+# находятся одним проходом ANCHOR_SCANNER по тексту в нижнем регистре (см. PreparedText.anchors),
+# после чего шаблоны полей проверяются только у найденных позиций, а не по всему тексту.
+VEHICLE_BRANDS = ('ман', 'вольво', 'скания', 'мерседес', 'даф', 'jac', 'volvo', 'scania', 'mersedes')
+AUTHORITY_KEYWORDS = r'(?:отдел|мро|уфмс|оуфмс|мвд|тп\s*уфмс|гу\s*мвд|овд|умвд|мп\s*уфмс|отделом\s*уфмс)'
+ANCHOR_KEYWORDS = {
+    'car': r'автомобиль|машина|а/м|тягач',
+    'brand': '|'.join(VEHICLE_BRANDS),
+    'trailer': r'прицеп|п/п',
+    'address': r'прописка|адрес\s*регистрации|по\s*месту\s*жительства',
+    'city': r'\bг\.',
+    'authority': AUTHORITY_KEYWORDS,
+    'issued': r'(?:кем\s*)?выдан',
+    'driver': r'водитель(?!ск)|ф\.и\.о\.|фио\b|данные\s*о\s*водителе',
+}
+# Проверка нулевой длины находит и перекрывающиеся вхождения. Ключевые слова разных полей
+# не являются началами друг друга, поэтому в одной позиции подходит не больше одной группы.
+# Класс первых букв перед ней позволяет не разбирать альтернативы в большинстве позиций
+ANCHOR_SCANNER = register(
+    'engine.anchors',
+    r'(?=[авгдкмопстуфjmsv])(?=' + '|'.join(f'(?P<{group}>{keywords})' for group, keywords in ANCHOR_KEYWORDS.items()) + ')',
+    re.UNICODE,
+)
+ANCHOR_GROUPS = tuple(ANCHOR_KEYWORDS)
+
+# Максимальная длина "хвоста" перед токеном, в котором ищется ключевое слово
+KEYWORD_WINDOW = 60
+# Предел длины нормализованного текста: всё, что дальше, не разбирается. Вместе с
+# линейными по длине экстракторами ограничивает время разбора одного сообщения
+MAX_TEXT_LENGTH = 20000
+# Насколько далеко вперёд заглядывает попытка совпадения единого прохода (ключевое слово и
+# три слова ФИО) или шаблонов, которые IncrementalText отслеживает целиком. После правки
+# текст пересканируется с позиции не ближе этого расстояния до неё
+RESCAN_MARGIN = 256
+# То же для индекса ключевых слов: самое длинное ключевое слово вместе с проверками границ
+ANCHOR_MARGIN = 64
+# Разделитель сообщений в общем буфере пачки (см. prepare_batch): не пробел и не буква, поэтому
+# ни токены, ни ключевые слова, ни их окружение (\s, \b) через него не продолжаются
+BATCH_SEPARATOR = '\x00'
+
+
+class PreparedText:
+    """Текст сообщения, нормализованный один раз и общий для всех экстракторов."""
+
+    def __init__(self, text: str, max_length: Optional[int] = MAX_TEXT_LENGTH):
+        self.raw = text
+        self.cleaned = WHITESPACE_RE.sub(' ', text.strip())
+        self.truncated = max_length is not None and len(self.cleaned) > max_length
+        if self.truncated:
+            logger.warning("ENGINE: Текст длиной %s обрезан до %s символов", len(self.cleaned), max_length)
+            self.cleaned = self.cleaned[:max_length]
+        # Границы разбираемого участка; у TextSegment — часть текста
+        self.start = 0
+        self.end = len(self.cleaned)
+        self._lower = None
+        self._tokens = None
+        self._anchors = None
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.cleaned.lower()
+        return self._lower
+
+    def context(self, start: int, end: int) -> str:
+        """Возвращает срез текста в нижнем регистре."""
+        start = max(0, start)
+        lower = self.lower
+        if len(lower) == len(self.cleaned):
+            return lower[start:end]
+        return self.cleaned[start:end].lower()
+
+    def hits(self, group: str) -> List[re.Match]:
+        """Совпадения единого прохода, попавшие в именованную группу `group`."""
+        if self._tokens is None:
+            self._tokens = scan_tokens(self.cleaned)
+        return self._tokens[group]
+
+    def anchors(self, group: str) -> List[Tuple[int, int]]:
+        """Границы вхождений ключевых слов группы `group` (см. ANCHOR_KEYWORDS) по возрастанию."""
+        if self._anchors is None:
+            lower = self.lower
+            if len(lower) != len(self.cleaned):
+                # Символы, которые в нижнем регистре длиннее (İ), оставляем как есть, чтобы позиции совпадали
+                lower = ''.join(char if len(char.lower()) != 1 else char.lower() for char in self.cleaned)
+            self._anchors = scan_anchors(lower)
+        return self._anchors[group]
+
+    def finditer(self, pattern: re.Pattern) -> Iterable[re.Match]:
+        """Совпадения `pattern` при проходе по всему разбираемому участку."""
+        return pattern.finditer(self.cleaned, self.start, self.end)
+
+    def __len__(self) -> int:
+        return len(self.cleaned)
+
+
+class TextSegment:
+    """Участок [start, end) подготовленного текста, например данные одного из водителей.
+
+    Экстракторы видят только токены и ключевые слова, которые начинаются на участке,
+    а совпадения шаблонов не выходят за его конец. Контекст ключевых слов берётся из
+    всего текста. Нормализация, единый проход и индекс ключевых слов общие с исходным
+    текстом и не повторяются.
+    """
+
+    def __init__(self, prepared: PreparedText, start: int, end: int):
+        self.prepared = prepared
+        self.raw = prepared.raw
+        self.cleaned = prepared.cleaned
+        self.truncated = prepared.truncated
+        self.start = start
+        self.end = end
+        self._hits: Dict[str, List[re.Match]] = {}
+        self._anchors: Dict[str, List[Tuple[int, int]]] = {}
+
+    @property
+    def lower(self) -> str:
+        return self.prepared.lower
+
+    def context(self, start: int, end: int) -> str:
+        return self.prepared.context(start, end)
+
+    def hits(self, group: str) -> List[re.Match]:
+        hits = self._hits.get(group)
+        if hits is None:
+            hits = self._hits[group] = [match for match in self.prepared.hits(group)
+                                        if self.start <= match.start() < self.end]
+        return hits
+
+    def anchors(self, group: str) -> List[Tuple[int, int]]:
+        anchors = self._anchors.get(group)
+        if anchors is None:
+            anchors = self._anchors[group] = [span for span in self.prepared.anchors(group)
+                                              if self.start <= span[0] < self.end]
+        return anchors
+
+    def finditer(self, pattern: re.Pattern) -> Iterable[re.Match]:
+        return pattern.finditer(self.cleaned, self.start, self.end)
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+
+class ShiftedMatch:
+    """Совпадение из текста до правки, стоящее после неё: позиции сдвинуты на `shift`."""
+
+    __slots__ = ('match', 'shift')
+
+    def __init__(self, match: Union[re.Match, 'ShiftedMatch'], shift: int):
+        if isinstance(match, ShiftedMatch):
+            match, shift = match.match, match.shift + shift
+        self.match = match
+        self.shift = shift
+
+    def start(self, group: Union[int, str] = 0) -> int:
+        start = self.match.start(group)
+        return start + self.shift if start >= 0 else start
+
+    def end(self, group: Union[int, str] = 0) -> int:
+        end = self.match.end(group)
+        return end + self.shift if end >= 0 else end
+
+    def span(self, group: Union[int, str] = 0) -> Tuple[int, int]:
+        return self.start(group), self.end(group)
+
+    def group(self, *groups):
+        return self.match.group(*groups)
+
+    def groups(self, default=None) -> tuple:
+        return self.match.groups(default)
+
+    @property
+    def lastgroup(self) -> Optional[str]:
+        return self.match.lastgroup
+
+
+class TextEdit:
+    """Правка IncrementalText: участок [start, old_end) заменён на [start, new_end) и что
+    изменилось в найденном — группы токенов, группы ключевых слов и отслеживаемые шаблоны."""
+
+    __slots__ = ('start', 'old_end', 'new_end', 'tokens', 'anchors', 'patterns')
+
+    def __init__(self, start: int, old_end: int, new_end: int):
+        self.start = start
+        self.old_end = old_end
+        self.new_end = new_end
+        self.tokens: Set[str] = set()
+        self.anchors: Set[str] = set()
+        self.patterns: Set[re.Pattern] = set()
+
+    @property
+    def shift(self) -> int:
+        return self.new_end - self.old_end
+
+
+class IncrementalText(PreparedText):
+    """Нормализованный текст, который правится на месте (см. session.ParseSession).
+
+    replace() заменяет участок текста и обновляет единый проход, индекс ключевых слов и
+    отслеживаемые шаблоны (finditer) только около правки: сканирование начинается
+    за RESCAN_MARGIN символов до неё и заканчивается, как только после правки находится
+    совпадение, которое было и в прежнем проходе, — дальше проходы одинаковы. Стоимость
+    правки растёт с её длиной; совпадения после неё лишь сдвигаются на разницу длин.
+    Текст не обрезается по MAX_TEXT_LENGTH — за длиной следит вызывающий.
+    """
+
+    def __init__(self, cleaned: str = ''):
+        self.raw = cleaned
+        self.cleaned = cleaned
+        self.truncated = False
+        self.start = 0
+        self.end = len(cleaned)
+        self._lower = None
+        self._tokens = None
+        self._anchors = None
+        self._sequence = list(TOKEN_SCANNER.finditer(cleaned))
+        self._anchor_text = self._anchor_lower(cleaned)
+        self._anchors = scan_anchors(self._anchor_text)
+        self._patterns: Dict[re.Pattern, list] = {}
+        self._group_tokens()
+
+    @staticmethod
+    def _anchor_lower(text: str) -> str:
+        lower = text.lower()
+        if len(lower) != len(text):
+            lower = ''.join(char if len(char.lower()) != 1 else char.lower() for char in text)
+        return lower
+
+    def _group_tokens(self) -> None:
+        self._tokens = tokens = {group: [] for group in TOKEN_GROUPS}
+        for match in self._sequence:
+            tokens[match.lastgroup].append(match)
+
+    def finditer(self, pattern: re.Pattern) -> Iterable[re.Match]:
+        matches = self._patterns.get(pattern)
+        if matches is None:
+            matches = self._patterns[pattern] = list(pattern.finditer(self.cleaned))
+        return matches
+
+    def replace(self, start: int, end: int, text: str) -> TextEdit:
+        """Заменяет участок [start, end) нормализованного текста на `text`."""
+        old = self.cleaned
+        self.cleaned = cleaned = old[:start] + text + old[end:]
+        self.raw = cleaned
+        self.end = len(cleaned)
+        edit = TextEdit(start, end, start + len(text))
+        lower = text.lower()
+        if self._lower is not None and len(self._lower) == len(old) and len(lower) == len(text):
+            self._lower = self._lower[:start] + lower + self._lower[end:]
+        else:
+            self._lower = None
+        self._anchor_text = self._anchor_text[:start] + self._anchor_lower(text) + self._anchor_text[end:]
+        self._sequence = _rescan(TOKEN_SCANNER, cleaned, self._sequence, edit, edit.tokens)
+        self._group_tokens()
+        _reanchor(self._anchors, self._anchor_text, edit)
+        for pattern, matches in self._patterns.items():
+            changed = set()
+            self._patterns[pattern] = _rescan(pattern, cleaned, matches, edit, changed)
+            if changed:
+                edit.patterns.add(pattern)
+        return edit
+
+    def window(self, low: int, high: int) -> 'TextWindow':
+        """Токены и ключевые слова, начинающиеся на участке [low, high]."""
+        return TextWindow(self, low, high)
+
+    def items(self, group: str) -> list:
+        """Токены или ключевые слова группы `group`."""
+        return self._tokens[group] if group in self._tokens else self._anchors[group]
+
+    def has_items(self, group: str, start: int, end: Optional[int]) -> bool:
+        """Есть ли токен, ключевое слово или совпадение отслеживаемого шаблона `group`,
+        начинающиеся на участке [start, end] (end=None — до конца текста)."""
+        if isinstance(group, str):
+            items = self.items(group)
+        else:
+            items = self.finditer(group)
+        index = _first_starting_at(items, start)
+        if index == len(items):
+            return False
+        return end is None or _item_start(items[index]) <= end
+
+
+class TextWindow(TextSegment):
+    """Токены, ключевые слова и совпадения отслеживаемых шаблонов IncrementalText,
+    начинающиеся на участке [low, high]. В отличие от TextSegment совпадения шаблонов
+    ограничены не участком, а всем текстом: экстрактор оценивает кандидатов участка
+    так же, как при разборе всего текста.
+    """
+
+    def __init__(self, prepared: IncrementalText, low: int, high: int):
+        super().__init__(prepared, prepared.start, prepared.end)
+        self.low = low
+        self.high = high
+
+    def _slice(self, items: list) -> list:
+        return items[_first_starting_at(items, self.low):_first_starting_at(items, self.high + 1)]
+
+    def hits(self, group: str) -> List[re.Match]:
+        hits = self._hits.get(group)
+        if hits is None:
+            hits = self._hits[group] = self._slice(self.prepared.hits(group))
+        return hits
+
+    def anchors(self, group: str) -> List[Tuple[int, int]]:
+        anchors = self._anchors.get(group)
+        if anchors is None:
+            anchors = self._anchors[group] = self._slice(self.prepared.anchors(group))
+        return anchors
+
+    def finditer(self, pattern: re.Pattern) -> Iterable[re.Match]:
+        return self._slice(self.prepared.finditer(pattern))
+
+
+class BatchText(PreparedText):
+    """Общий буфер пачки сообщений (см. prepare_batch), уже нормализованный.
+
+    Токены и ключевые слова группы при первом обращении к ней делятся между сообщениями
+    одним проходом: `starts` — начала сообщений в буфере по возрастанию.
+    """
+
+    def __init__(self, cleaned: str, starts: List[int]):
+        self.raw = cleaned
+        self.cleaned = cleaned
+        self.truncated = False
+        self.start = 0
+        self.end = len(cleaned)
+        self._lower = None
+        self._tokens = None
+        self._anchors = None
+        self._starts = starts
+        self._parts: Dict[str, List[list]] = {}
+
+    def parts(self, group: str) -> List[list]:
+        """Токены или ключевые слова группы `group`, по списку на сообщение."""
+        parts = self._parts.get(group)
+        if parts is None:
+            if group in ANCHOR_KEYWORDS:
+                items = self.anchors(group)
+                positions = [span[0] for span in items]
+            else:
+                items = self.hits(group)
+                positions = [match.start() for match in items]
+            if items:
+                bounds = [bisect_left(positions, start) for start in self._starts]
+                bounds.append(len(items))
+                parts = [items[low:high] for low, high in zip(bounds, bounds[1:])]
+            else:
+                parts = [items] * len(self._starts)
+            self._parts[group] = parts
+        return parts
+
+
+class BatchSegment(TextSegment):
+    """Одно сообщение в общем буфере пачки (см. prepare_batch).
+
+    В отличие от TextSegment участок — отдельное сообщение: контекст ключевых слов
+    не выходит за его границы, а его токены и ключевые слова берутся из разбиения
+    BatchText.parts, так что разбор пачки линеен по её длине.
+    """
+
+    def __init__(self, prepared: BatchText, index: int, start: int, end: int, truncated: bool = False):
+        super().__init__(prepared, start, end)
+        self.index = index
+        self.truncated = truncated
+
+    def context(self, start: int, end: int) -> str:
+        return self.prepared.context(max(start, self.start), min(end, self.end))
+
+    def hits(self, group: str) -> List[re.Match]:
+        return self.prepared.parts(group)[self.index]
+
+    def anchors(self, group: str) -> List[Tuple[int, int]]:
+        return self.prepared.parts(group)[self.index]
+
+
+def prepare_batch(texts: Iterable[Optional[str]], max_length: Optional[int] = MAX_TEXT_LENGTH) -> List[BatchSegment]:
+    """Сообщения пачки, подготовленные вместе.
+
+    Сообщения склеиваются через BATCH_SEPARATOR в один буфер, который нормализуется, проходится
+    единым проходом и индексом ключевых слов целиком; каждое сообщение — участок буфера.
+    Участки дают экстракторам те же токены и ключевые слова, что и PreparedText отдельного
+    сообщения, а каждое сообщение обрезается по `max_length`, как в PreparedText.
+    """
+    texts = [text.replace(BATCH_SEPARATOR, ' ') if BATCH_SEPARATOR in text else text
+             for text in (text or '' for text in texts)]
+    parts = WHITESPACE_RE.sub(' ', BATCH_SEPARATOR.join(texts)).split(BATCH_SEPARATOR)
+    bounds = []
+    pos = 0
+    for index, part in enumerate(parts):
+        part = part.strip()
+        truncated = max_length is not None and len(part) > max_length
+        if truncated:
+            logger.warning("ENGINE: Текст длиной %s обрезан до %s символов", len(part), max_length)
+            part = part[:max_length]
+        parts[index] = part
+        bounds.append((pos, pos + len(part), truncated))
+        pos += len(part) + len(BATCH_SEPARATOR)
+    buffer = BatchText(BATCH_SEPARATOR.join(parts), [start for start, _, _ in bounds])
+    return [BatchSegment(buffer, index, start, end, truncated) for index, (start, end, truncated) in enumerate(bounds)]
+
+
+def _item_start(item) -> int:
+    return item[0] if isinstance(item, tuple) else item.start()
+
+
+def _first_starting_at(items: list, pos: int) -> int:
+    """Индекс первого элемента, начинающегося не раньше `pos` (элементы по возрастанию начала)."""
+    low, high = 0, len(items)
+    while low < high:
+        middle = (low + high) // 2
+        if _item_start(items[middle]) < pos:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _first_ending_after(matches: list, pos: int) -> int:
+    """Индекс первого совпадения, заканчивающегося после `pos`; совпадения finditer не пересекаются."""
+    low, high = 0, len(matches)
+    while low < high:
+        middle = (low + high) // 2
+        if matches[middle].end() <= pos:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _mapped(match, edit: TextEdit) -> Optional[tuple]:
+    """Совпадение прежнего прохода в координатах нового текста; None, если оно задевает правку."""
+    start, end = match.span()
+    if end <= edit.start:
+        return match.lastgroup, start, end
+    if start >= edit.old_end:
+        return match.lastgroup, start + edit.shift, end + edit.shift
+    return None
+
+
+def _rescan(pattern: re.Pattern, text: str, matches: list, edit: TextEdit, changed: Set[str]) -> list:
+    """Обновляет список pattern.finditer(text) после правки `edit`; группы (lastgroup)
+    совпадений, которые появились или пропали, добавляются в `changed`."""
+    keep = _first_ending_after(matches, edit.start - RESCAN_MARGIN)
+    # С конца совпадения прежний проход продолжался, не заглядывая в изменённый участок
+    pos = matches[keep - 1].end() if keep else 0
+    fresh = []
+    resume = len(matches)
+    index = keep
+    for match in pattern.finditer(text, pos):
+        fresh.append(match)
+        if match.start() > edit.new_end:
+            # Текст отсюда не менялся: если прежний проход нашёл совпадение в той же позиции,
+            # дальше оба прохода совпадают
+            old_start = match.start() - edit.shift
+            while index < len(matches) and matches[index].start() < old_start:
+                index += 1
+            if index < len(matches) and matches[index].start() == old_start:
+                resume = index + 1
+                break
+    old = [_mapped(match, edit) for match in matches[keep:resume]]
+    new = [(match.lastgroup, match.start(), match.end()) for match in fresh]
+    if old != new:
+        old_set, new_set = set(old), set(new)
+        changed.update(match.lastgroup for match in matches[keep:resume] if _mapped(match, edit) not in new_set)
+        changed.update(item[0] for item in new if item not in old_set)
+    tail = matches[resume:]
+    if edit.shift:
+        tail = [ShiftedMatch(match, edit.shift) for match in tail]
+    return matches[:keep] + fresh + tail
+
+
+def _reanchor(anchors: Dict[str, List[Tuple[int, int]]], lower: str, edit: TextEdit) -> None:
+    """Обновляет индекс ключевых слов после правки `edit`; изменившиеся группы — в edit.anchors."""
+    low = max(0, edit.start - ANCHOR_MARGIN)
+    # Проверка в позиции после правки смотрит на предыдущий символ (\b), поэтому включительно
+    fresh = {group: [] for group in ANCHOR_GROUPS}
+    for match in ANCHOR_SCANNER.finditer(lower, low):
+        if match.start() > edit.new_end:
+            break
+        fresh[match.lastgroup].append(match.span(match.lastgroup))
+    shift = edit.shift
+    for group, spans in anchors.items():
+        first = bisect_left(spans, (low,))
+        last = bisect_left(spans, (edit.old_end + 1,))
+        old = [(start, end) if end <= edit.start else (start + shift, end + shift) if start >= edit.old_end else None
+               for start, end in spans[first:last]]
+        if old != fresh[group]:
+            edit.anchors.add(group)
+        tail = spans[last:]
+        if shift:
+            tail = [(start + shift, end + shift) for start, end in tail]
+        anchors[group] = spans[:first] + fresh[group] + tail
+
+
+TextLike = Union[str, PreparedText, TextSegment]
+
+
+def prepare_text(text: TextLike) -> Union[PreparedText, TextSegment]:
+    if isinstance(text, (PreparedText, TextSegment)):
+        return text
+    return PreparedText(text or '')
+
+
+@metrics.timed('scan_tokens', hit=lambda tokens: any(tokens.values()))
+def scan_tokens(text: str) -> Dict[str, List[re.Match]]:
+    tokens = {group: [] for group in TOKEN_GROUPS}
+    for match in TOKEN_SCANNER.finditer(text):
+        tokens[match.lastgroup].append(match)
+    if metrics.ENABLED:
+        metrics.count('scan_tokens', sum(len(hits) for hits in tokens.values()))
+    if logger.isEnabledFor(TRACE):
+        logger.log(TRACE, "ENGINE: Найдено токенов: %s", {k: len(v) for k, v in tokens.items() if v})
+    return tokens
+
+
+@metrics.timed('scan_anchors', hit=lambda anchors: any(anchors.values()))
+def scan_anchors(lower: str) -> Dict[str, List[Tuple[int, int]]]:
+    anchors = {group: [] for group in ANCHOR_GROUPS}
+    for match in ANCHOR_SCANNER.finditer(lower):
+        group = match.lastgroup
+        anchors[group].append(match.span(group))
+    if metrics.ENABLED:
+        metrics.count('scan_anchors', sum(len(spans) for spans in anchors.values()))
+    if logger.isEnabledFor(TRACE):
+        logger.log(TRACE, "ENGINE: Найдено ключевых слов: %s", {k: len(v) for k, v in anchors.items() if v})
+    return anchors
+
+
+def keyword_before(pattern: re.Pattern, prepared: PreparedText, start: int,
+                   window: int = KEYWORD_WINDOW) -> Optional[re.Match]:
+    """Ищет ключевое слово, непосредственно предшествующее позиции `start`.
+
+    `pattern` должен заканчиваться на `\\Z`, чтобы совпадение упиралось в начало токена.
+    """
+    return pattern.search(prepared.cleaned, max(0, start - window), start)
+
+
+def matches_at(pattern: re.Pattern, text: str, positions: Iterable[int],
+               end: Optional[int] = None) -> Iterator[re.Match]:
+    """То же, что pattern.finditer(text, 0, end), для шаблона, который может совпасть только
+    начиная с одной из `positions` (по возрастанию), например с ключевого слова."""
+    end = len(text) if end is None else end
+    pos = 0
+    for start in positions:
+        if start < pos:
+            continue
+        match = pattern.match(text, start, end)
+        if match:
+            yield match
+            pos = max(match.end(), start + 1)
+
+
+def anchored_finditer(pattern: re.Pattern, text: str, anchors: Iterable[int],
+                      before: int, span: int, start: int = 0, end: Optional[int] = None) -> Iterator[re.Match]:
+    """То же, что pattern.finditer(text), но поиск ведётся только рядом с якорями.
+
+    Условие: каждое совпадение `pattern` начинается не дальше чем за `before` символов
+    до одной из позиций `anchors` (по возрастанию) и вместе с опережающими проверками
+    занимает не больше `span` символов. Тогда на каждый якорь приходится поиск
+    в окне постоянной длины, и стоимость линейна по длине текста, даже если сам
+    шаблон при полном проходе перебирает много вариантов в каждой позиции.
+    Совпадения не выходят за границы [start, end).
+    """
+    end = len(text) if end is None else end
+    pos = start
+    for anchor in anchors:
+        while pos <= anchor:
+            # Совпадение, начавшееся не позже якоря, целиком помещается в окно;
+            # начавшееся позже может быть обрезано окном и относится к следующим якорям
+            match = pattern.search(text, max(pos, anchor - before), min(anchor + span, end))
+            if not match or match.start() > anchor:
+                break
+            yield match
+            pos = max(match.end(), match.start() + 1)
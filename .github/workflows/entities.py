@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+# driver_parser/entities.py
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from .models import FIELD_KEYS, DriverRecord
+from .patterns import register
+from .plates import plate_key
+
+logger = logging.getLogger(__name__)
+
+# Профили водителей, собранные из отдельных сообщений. Сообщения одного водителя связываются
+# по сильным ключам: номерам паспорта и ВУ, телефонам и госномерам. Записи с общим ключом
+# объединяются в один профиль системой непересекающихся множеств (union-find со сжатием путей
+# и объединением по размеру), поэтому добавление сообщения стоит почти O(1) независимо
+# от числа уже собранных профилей.
+#
+# Госномер связывает водителей одной машины: если машину водят несколько человек, его стоит
+# убрать из key_fields.
+
+# Атрибут DriverRecord -> вид ключа. Ключи разных видов не пересекаются
+KEY_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ('passport', 'passport'),
+    ('driver_license', 'license'),
+    ('phones', 'phone'),
+    ('vehicle', 'plate'),
+    ('trailer', 'plate'),
+)
+# Сколько добавленных сообщений копить до записи в файл
+COMMIT_EVERY = 1000
+
+NON_DIGIT = register('entities.non_digit', r'\D')
+NON_ALNUM = register('entities.non_alnum', r'[\W_]')
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entities (id INTEGER PRIMARY KEY, parent INTEGER NOT NULL, '
+    'size INTEGER NOT NULL, messages INTEGER NOT NULL, profile TEXT)',
+    'CREATE TABLE IF NOT EXISTS entity_keys (key TEXT PRIMARY KEY, entity INTEGER NOT NULL) WITHOUT ROWID',
+)
+_ATTRIBUTES = tuple(attribute for attribute, _ in FIELD_KEYS)
+
+
+def _document(value: str, digits: int) -> Optional[str]:
+    value = NON_DIGIT.sub('', value)
+    return value if len(value) == digits else None
+
+
+def _license(value: str) -> Optional[str]:
+    # Иностранные удостоверения бывают с буквами
+    value = NON_ALNUM.sub('', value).upper()
+    return value if len(value) >= 8 else None
+
+
+def _phone(value: str) -> Optional[str]:
+    return NON_DIGIT.sub('', value) or None
+
+
+def _plate(value: str) -> Optional[str]:
+    return plate_key(value)
+
+
+_NORMALIZERS = {
+    'passport': lambda value: _document(value, 10),
+    'license': _license,
+    'phone': _phone,
+    'plate': _plate,
+}
+
+
+def record_keys(record: DriverRecord, key_fields: Iterable[Tuple[str, str]] = KEY_FIELDS) -> List[str]:
+    """Сильные ключи записи вида "passport:4510123456" без повторов."""
+    keys = []
+    for attribute, kind in key_fields:
+        values = getattr(record, attribute)
+        if not values:
+            continue
+        for value in (values if attribute == 'phones' else (values,)):
+            normalized = _NORMALIZERS[kind](value)
+            key = f"{kind}:{normalized}" if normalized else None
+            if key and key not in keys:
+                keys.append(key)
+    return keys
+
+
+class Entity:
+    """Профиль водителя: значения полей с числом сообщений, в которых они встречались.
+
+    `size` — число ключей профиля (для объединения по размеру), `messages` — число сообщений.
+    """
+
+    __slots__ = ('id', 'size', 'messages', 'values')
+
+    def __init__(self, entity_id: int, size: int = 0, messages: int = 0,
+                 values: Optional[Dict[str, Dict[str, int]]] = None):
+        self.id = entity_id
+        self.size = size
+        self.messages = messages
+        self.values: Dict[str, Dict[str, int]] = values if values is not None else {}
+
+    def add(self, record: DriverRecord) -> None:
+        self.messages += 1
+        for attribute in _ATTRIBUTES:
+            values = getattr(record, attribute)
+            if not values:
+                continue
+            counts = self.values.setdefault(attribute, {})
+            for value in (values if attribute == 'phones' else (values,)):
+                counts[value] = counts.get(value, 0) + 1
+
+    def absorb(self, other: 'Entity') -> None:
+        self.size += other.size
+        self.messages += other.messages
+        for attribute, values in other.values.items():
+            counts = self.values.setdefault(attribute, {})
+            for value, count in values.items():
+                counts[value] = counts.get(value, 0) + count
+
+    def record(self) -> DriverRecord:
+        """Сводная запись: самое частое значение каждого поля (при равенстве — встреченное
+        раньше), телефоны — все, от самого частого."""
+        record = DriverRecord()
+        for attribute, counts in self.values.items():
+            if attribute == 'phones':
+                record.phones = tuple(sorted(counts, key=counts.get, reverse=True))
+            else:
+                setattr(record, attribute, max(counts, key=counts.get))
+        return record
+
+    def __repr__(self) -> str:
+        return f"Entity({self.id}, messages={self.messages}, {self.record().to_dict()!r})"
+
+
+class EntityStore:
+    """Профили водителей с инкрементальным объединением по сильным ключам.
+
+    При заданном `path` состояние хранится в SQLite: загружается при открытии, изменения
+    записываются одной транзакцией раз в `commit_every` сообщений, при flush() и close().
+    """
+
+    def __init__(self, path: Optional[str] = None, key_fields: Iterable[Tuple[str, str]] = KEY_FIELDS,
+                 commit_every: int = COMMIT_EVERY):
+        self.path = path
+        self.key_fields = tuple(key_fields)
+        unknown = {kind for _, kind in self.key_fields} - set(_NORMALIZERS)
+        if unknown:
+            raise ValueError(f"Неизвестные виды ключей: {', '.join(sorted(unknown))}")
+        self.commit_every = commit_every
+        self._lock = threading.Lock()
+        self._parent: Dict[int, int] = {}
+        self._entities: Dict[int, Entity] = {}
+        self._keys: Dict[str, int] = {}
+        self._next_id = 1
+        self._changed_entities = set()
+        self._new_keys: Dict[str, int] = {}
+        self._pending = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                self._db.execute(statement)
+            self._load()
+
+    def _load(self) -> None:
+        for entity_id, parent, size, messages, profile in self._db.execute(
+                'SELECT id, parent, size, messages, profile FROM entities'):
+            self._parent[entity_id] = parent
+            if parent == entity_id:
+                self._entities[entity_id] = Entity(entity_id, size, messages, json.loads(profile))
+            self._next_id = max(self._next_id, entity_id + 1)
+        self._keys = dict(self._db.execute('SELECT key, entity FROM entity_keys'))
+        logger.info("ENTITIES: Загружено профилей: %s, ключей: %s из %s", len(self._entities), len(self._keys),
+                    self.path)
+
+    def _find(self, entity_id: int) -> int:
+        parent = self._parent
+        while parent[entity_id] != entity_id:
+            # Сжатие путей делением пополам
+            parent[entity_id] = parent[parent[entity_id]]
+            entity_id = parent[entity_id]
+        return entity_id
+
+    def _union(self, first: int, second: int) -> int:
+        if first == second:
+            return first
+        if self._entities[first].size < self._entities[second].size:
+            first, second = second, first
+        self._entities[first].absorb(self._entities.pop(second))
+        self._parent[second] = first
+        self._changed_entities.update((first, second))
+        return first
+
+    def add(self, record: Union[DriverRecord, Dict, None]) -> Optional[int]:
+        """Добавляет результат разбора (DriverRecord или словарь parse_by_keywords) в профиль,
+        с которым у него общий ключ, объединяя все такие профили.
+
+        Returns:
+            Номер профиля или None, если записи нет (parse_record ничего не нашёл) или у неё
+            нет сильных ключей; такая запись не добавляется.
+        """
+        if record is None:
+            return None
+        if not isinstance(record, DriverRecord):
+            record = DriverRecord.from_dict(record)
+        keys = record_keys(record, self.key_fields)
+        if not keys:
+            return None
+        with self._lock:
+            root = None
+            for key in keys:
+                entity_id = self._keys.get(key)
+                if entity_id is not None:
+                    found = self._find(entity_id)
+                    root = found if root is None else self._union(root, found)
+            if root is None:
+                root = self._next_id
+                self._next_id += 1
+                self._parent[root] = root
+                self._entities[root] = Entity(root)
+            entity = self._entities[root]
+            for key in keys:
+                if key not in self._keys:
+                    self._keys[key] = root
+                    self._new_keys[key] = root
+                    entity.size += 1
+            entity.add(record)
+            self._changed_entities.add(root)
+            self._pending += 1
+            if self._db is not None and self._pending >= self.commit_every:
+                self._commit()
+        return root
+
+    def add_many(self, records: Iterable[Union[DriverRecord, Dict, None]]) -> List[Optional[int]]:
+        return [self.add(record) for record in records]
+
+    def find(self, record: Union[DriverRecord, Dict, str]) -> Optional[int]:
+        """Профиль записи или ключа ("phone:79001234567") без добавления; None — не найден.
+
+        Если ключи записи ведут в разные профили, возвращается первый по порядку KEY_FIELDS.
+        """
+        if isinstance(record, str):
+            keys = [record]
+        else:
+            keys = record_keys(record if isinstance(record, DriverRecord) else DriverRecord.from_dict(record),
+                               self.key_fields)
+        with self._lock:
+            for key in keys:
+                entity_id = self._keys.get(key)
+                if entity_id is not None:
+                    return self._find(entity_id)
+        return None
+
+    def entity(self, entity_id: int) -> Entity:
+        """Профиль по номеру, в том числе по номеру профиля, поглощённого другим."""
+        with self._lock:
+            return self._entities[self._find(entity_id)]
+
+    def profile(self, entity_id: int) -> Dict:
+        """Сводная запись профиля в формате parse_by_keywords."""
+        return self.entity(entity_id).record().to_dict()
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def __iter__(self):
+        return iter(list(self._entities.values()))
+
+    def _commit(self) -> None:
+        rows = []
+        for entity_id in self._changed_entities:
+            entity = self._entities.get(entity_id)
+            profile = json.dumps(entity.values, ensure_ascii=False) if entity is not None else None
+            rows.append((entity_id, self._parent[entity_id], entity.size if entity else 0,
+                         entity.messages if entity else 0, profile))
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO entities (id, parent, size, messages, profile) '
+                                 'VALUES (?, ?, ?, ?, ?)', rows)
+            self._db.executemany('INSERT OR REPLACE INTO entity_keys (key, entity) VALUES (?, ?)',
+                                 self._new_keys.items())
+        logger.debug("ENTITIES: Записано профилей: %s, новых ключей: %s", len(rows), len(self._new_keys))
+        self._changed_entities.clear()
+        self._new_keys.clear()
+        self._pending = 0
+
+    def flush(self) -> None:
+        """Записывает накопленные изменения в файл."""
+        with self._lock:
+            if self._db is not None and (self._changed_entities or self._new_keys):
+                self._commit()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __enter__(self) -> 'EntityStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m driver_parser.entities',
+                                     description='Разбор сообщений (по строке на сообщение) и сборка профилей водителей.')
+    parser.add_argument('store', help='файл SQLite с профилями')
+    parser.add_argument('input', nargs='?', help='файл сообщений; по умолчанию stdin')
+    parser.add_argument('--no-plates', action='store_true', help='не связывать сообщения по госномерам')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .main import parse_record
+    args = build_arg_parser().parse_args(argv)
+    key_fields = tuple(item for item in KEY_FIELDS if not (args.no_plates and item[1] == 'plate'))
+    source = open(args.input, encoding='utf-8') if args.input else sys.stdin
+    try:
+        with EntityStore(args.store, key_fields) as store:
+            for line in source:
+                line = line.strip()
+                if line:
+                    entity_id = store.add(parse_record(line))
+                    print(json.dumps({'entity': entity_id,
+                                      'profile': store.profile(entity_id) if entity_id else None},
+                                     ensure_ascii=False))
+            print(f"{args.store}: профилей {len(store)}", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
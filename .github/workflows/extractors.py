@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# driver_parser/extractors.py
+from functools import partial
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from .address import extract_address
+from .models import ADDRESS_ALIAS, FIELD_KEYS
+from .passport import (extract_passport_code, extract_passport_date, extract_passport_series_and_number,
+                       normalize_issuing_authority)
+from .personal_data import extract_date_of_birth, extract_driver_license, extract_phone, find_name
+from .vehicle import normalize_vehicle_number
+
+# Общие проходы по тексту, которые экстракторы берут из PreparedText: единый проход по токенам
+# (hits) и индекс ключевых слов (anchors). Каждый выполняется один раз, при первом обращении,
+# поэтому его стоимость платит первый экстрактор, которому он нужен.
+# Стоимость здесь и в FieldExtractor — примерное время в микросекундах на типичное сообщение
+# (python -m driver_parser.benchmark); важно соотношение, а не абсолютные значения
+PASSES: Dict[str, int] = {'tokens': 60, 'anchors': 40}
+
+
+class FieldExtractor:
+    """Экстрактор одного поля DriverRecord.
+
+    `key` — ключ поля в результате parse_by_keywords, `attribute` — атрибут DriverRecord,
+    `extract` — функция от подготовленного текста, возвращающая значение поля,
+    `requires` — общие проходы (PASSES), которыми она пользуется, `cost` — её собственная
+    стоимость без проходов.
+    """
+
+    __slots__ = ('key', 'attribute', 'extract', 'requires', 'cost')
+
+    def __init__(self, key: str, attribute: str, extract: Callable, requires: Tuple[str, ...] = (),
+                 cost: int = 1):
+        unknown = set(requires) - set(PASSES)
+        if unknown:
+            raise ValueError(f"Неизвестные проходы: {', '.join(sorted(unknown))}")
+        self.key = key
+        self.attribute = attribute
+        self.extract = extract
+        self.requires = tuple(requires)
+        self.cost = cost
+
+    def __repr__(self) -> str:
+        return f"FieldExtractor({self.key!r}, requires={self.requires}, cost={self.cost})"
+
+
+def _phones(text) -> Tuple[str, ...]:
+    return tuple(extract_phone(text))
+
+
+_ATTRIBUTES = dict((key, attribute) for attribute, key in FIELD_KEYS)
+_KEYS = dict(FIELD_KEYS)
+# Поле -> экстрактор, в порядке FIELD_KEYS
+_REGISTRY: Dict[str, FieldExtractor] = {}
+_plans: Dict[Optional[frozenset], Tuple[FieldExtractor, ...]] = {}
+
+
+def register_extractor(extractor: FieldExtractor) -> FieldExtractor:
+    """Регистрирует экстрактор поля, заменяя прежний экстрактор того же поля."""
+    if _ATTRIBUTES.get(extractor.key) != extractor.attribute:
+        raise ValueError(f"Поле {extractor.key} не соответствует атрибуту DriverRecord {extractor.attribute}")
+    _REGISTRY[extractor.key] = extractor
+    _plans.clear()
+    return extractor
+
+
+for _extractor in (
+    FieldExtractor('Водитель', 'driver', find_name, ('tokens',), 15),
+    FieldExtractor('Дата_рождения', 'birth_date', extract_date_of_birth, ('tokens',), 11),
+    FieldExtractor('Телефон', 'phones', _phones, ('tokens',), 6),
+    FieldExtractor('ВУ_серия_и_номер', 'driver_license', extract_driver_license, ('tokens',), 8),
+    FieldExtractor('Паспорт_серия_и_номер', 'passport', extract_passport_series_and_number, ('tokens',), 12),
+    FieldExtractor('Паспорт_место_выдачи', 'passport_authority', normalize_issuing_authority, ('anchors',), 5),
+    FieldExtractor('Паспорт_дата_выдачи', 'passport_date', extract_passport_date, ('tokens',), 12),
+    FieldExtractor('Паспорт_код_подразделения', 'passport_code', extract_passport_code, ('tokens',), 3),
+    FieldExtractor('Автомобиль', 'vehicle', normalize_vehicle_number, ('anchors',), 30),
+    FieldExtractor('Прицеп', 'trailer', partial(normalize_vehicle_number, is_trailer=True), ('anchors',), 25),
+    FieldExtractor('Адрес_регистрации', 'address', extract_address, ('anchors',), 15),
+):
+    register_extractor(_extractor)
+
+
+def field_key(field: str) -> str:
+    """Ключ поля по ключу результата, его синониму (Прописка) или атрибуту DriverRecord."""
+    if field == ADDRESS_ALIAS:
+        return _KEYS['address']
+    if field in _ATTRIBUTES:
+        return field
+    if field in _KEYS:
+        return _KEYS[field]
+    raise ValueError(f"Неизвестное поле: {field}")
+
+
+def extraction_plan(fields: Optional[Iterable[str]] = None) -> Tuple[FieldExtractor, ...]:
+    """Экстракторы, которые нужно запустить, чтобы заполнить `fields` (None — все поля).
+
+    Порядок — порядок полей в результате; план запоминается для каждого набора полей.
+    """
+    if isinstance(fields, str):
+        fields = (fields,)
+    requested = None if fields is None else frozenset(map(field_key, fields))
+    plan = _plans.get(requested)
+    if plan is None:
+        plan = tuple(extractor for key, extractor in _REGISTRY.items() if requested is None or key in requested)
+        _plans[requested] = plan
+    return plan
+
+
+def plan_fields(plan: Iterable[FieldExtractor]) -> Tuple[str, ...]:
+    """Ключи результата, которые может заполнить план, вместе с синонимом адреса."""
+    keys = {extractor.key for extractor in plan}
+    if _KEYS['address'] in keys:
+        keys.add(ADDRESS_ALIAS)
+    return tuple(key for key in [key for _, key in FIELD_KEYS] + [ADDRESS_ALIAS] if key in keys)
+
+
+def plan_cost(plan: Iterable[FieldExtractor]) -> int:
+    """Примерная стоимость плана вместе с общими проходами, которые ему нужны."""
+    plan = tuple(plan)
+    passes = {name for extractor in plan for name in extractor.requires}
+    return sum(extractor.cost for extractor in plan) + sum(PASSES[name] for name in passes)
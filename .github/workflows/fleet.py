@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# driver_parser/fleet.py
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from .plates import KEY_ALPHABET, KEY_ENCODING, canonical_plate, loose_keys
+
+logger = logging.getLogger(__name__)
+
+# Реестр госномеров парка в памяти. Номера хранятся в каноническом виде (plates.Plate.key),
+# поэтому точное совпадение — один поиск в словаре. Если его нет, номер ищется
+# с опечатками: перебираются строки в пределах `max_distance` правок (расстояние Левенштейна
+# с перестановкой соседних символов) и проверяются в том же словаре пересечением множеств.
+# В реестре только правильные номера, а из правильного номера правильный получается лишь
+# правками, сохраняющими вид номера: замена буквы буквой и цифры цифрой, вставка и удаление
+# цифры, перестановка соседних символов одного рода. Поэтому для распознанного номера
+# и одной правки перебирается около сотни строк. Для двух правок это уже неверно (букву можно
+# удалить и вставить другую в цифры), и для них, как и для значения, не похожего на номер,
+# перебираются все правки над алфавитом номера: около 400 строк на одну правку и десятки
+# тысяч на две (порядка 0,1 с), поэтому расстояние больше MAX_EDIT_DISTANCE не принимается.
+#
+# Ключи — байты cp1251, поля записи — кортеж: миллион номеров занимает около 180 МБ.
+DEFAULT_COLUMN = 'plate'
+MAX_EDIT_DISTANCE = 2
+# Поля результата parse_by_keywords с номерами и их формат
+PLATE_FIELDS = {'Автомобиль': 'car', 'Прицеп': 'trailer'}
+
+_ALPHABET = tuple(bytes((code,)) for code in KEY_ALPHABET)
+_DIGITS = tuple(bytes((code,)) for code in b'0123456789')
+_LETTERS = tuple(char for char in _ALPHABET if char not in _DIGITS)
+
+
+def _edits(key: bytes, shaped: bool = False) -> Set[bytes]:
+    """Строки на расстоянии одной правки: удаление, перестановка соседних, замена, вставка.
+
+    shaped=True — только правки, после которых правильный номер может остаться правильным
+    (см. комментарий в начале модуля).
+    """
+    variants = set()
+    for index in range(len(key) + 1):
+        head, tail = key[:index], key[index:]
+        if tail:
+            digit = tail[:1] in _DIGITS
+            if digit or not shaped:
+                variants.add(head + tail[1:])
+            if len(tail) > 1 and (not shaped or digit == (tail[1:2] in _DIGITS)):
+                variants.add(head + tail[1:2] + tail[:1] + tail[2:])
+            for char in (_DIGITS if digit else _LETTERS) if shaped else _ALPHABET:
+                variants.add(head + char + tail[1:])
+        for char in _DIGITS if shaped else _ALPHABET:
+            variants.add(head + char + tail)
+    variants.discard(key)
+    return variants
+
+
+class FleetMatch:
+    """Номер из реестра, найденный для значения: `key` — его канонический вид,
+    `distance` — число правок до него (0 — точное совпадение), `entry` — поля записи."""
+
+    __slots__ = ('key', 'distance', 'entry')
+
+    def __init__(self, key: str, distance: int, entry: Dict[str, str]):
+        self.key = key
+        self.distance = distance
+        self.entry = entry
+
+    def to_dict(self) -> Dict:
+        return {'key': self.key, 'distance': self.distance, 'entry': self.entry}
+
+    def __repr__(self) -> str:
+        return f"FleetMatch({self.key!r}, {self.distance}, {self.entry!r})"
+
+
+class FleetIndex:
+    """Хеш-индекс реестра госномеров.
+
+    `fields` — имена полей записи, которые хранятся вместе с номером (например, колонки CSV
+    кроме колонки номера).
+    """
+
+    def __init__(self, fields: Sequence[str] = ()):
+        self.fields = tuple(fields)
+        self._entries: Dict[bytes, Tuple[str, ...]] = {}
+        self.rejected = 0
+
+    def add(self, plate: str, values: Sequence[str] = ()) -> Optional[str]:
+        """Добавляет номер (в любом написании); возвращает его канонический вид или None,
+        если значение не похоже на номер. Повторный номер заменяет прежнюю запись."""
+        parsed = canonical_plate(plate)
+        if parsed is None:
+            self.rejected += 1
+            return None
+        self._entries[parsed.key.encode(KEY_ENCODING)] = tuple(values)
+        return parsed.key
+
+    def update(self, rows: Iterable[Tuple[str, Sequence[str]]]) -> None:
+        for plate, values in rows:
+            self.add(plate, values)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, plate: str) -> bool:
+        return self.get(plate) is not None
+
+    def _entry(self, values: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.fields, values))
+
+    def get(self, plate: Optional[str], kind: Optional[str] = None) -> Optional[FleetMatch]:
+        """Точное совпадение канонического вида номера."""
+        parsed = canonical_plate(plate, kind)
+        if parsed is None:
+            return None
+        values = self._entries.get(parsed.key.encode(KEY_ENCODING))
+        return None if values is None else FleetMatch(parsed.key, 0, self._entry(values))
+
+    def candidates(self, plate: Optional[str], max_distance: int = 1,
+                   kind: Optional[str] = None) -> List[FleetMatch]:
+        """Номера реестра в пределах `max_distance` правок, ближайшие первыми."""
+        if not 0 <= max_distance <= MAX_EDIT_DISTANCE:
+            raise ValueError(f"Расстояние должно быть от 0 до {MAX_EDIT_DISTANCE}: {max_distance}")
+        parsed = canonical_plate(plate, kind)
+        keys = (parsed.key,) if parsed is not None else loose_keys(plate, max_distance)
+        found: Dict[bytes, int] = {}
+        for key in keys:
+            rings = self._neighbourhood(key.encode(KEY_ENCODING), max_distance,
+                                        parsed is not None and max_distance == 1)
+            for distance, variants in enumerate(rings):
+                for variant in self._entries.keys() & variants:
+                    if distance < found.get(variant, max_distance + 1):
+                        found[variant] = distance
+        return [FleetMatch(key.decode(KEY_ENCODING), distance, self._entry(self._entries[key]))
+                for key, distance in sorted(found.items(), key=lambda item: (item[1], item[0]))]
+
+    @staticmethod
+    def _neighbourhood(key: bytes, max_distance: int, shaped: bool) -> Iterator[Set[bytes]]:
+        # Строки на расстоянии 0, 1, ... max_distance правок; каждая строка выдаётся один раз
+        seen = {key}
+        ring = {key}
+        yield ring
+        for _ in range(max_distance):
+            ring = {variant for item in ring for variant in _edits(item, shaped)} - seen
+            seen |= ring
+            yield ring
+
+    def lookup(self, plate: Optional[str], max_distance: int = 1,
+               kind: Optional[str] = None) -> Optional[FleetMatch]:
+        """Запись реестра для номера: точное совпадение, иначе единственный ближайший номер
+        в пределах `max_distance` правок. Несколько одинаково близких номеров — None."""
+        match = self.get(plate, kind)
+        if match is not None or max_distance == 0:
+            return match
+        matches = self.candidates(plate, max_distance, kind)
+        if not matches:
+            return None
+        if len(matches) > 1 and matches[1].distance == matches[0].distance:
+            logger.debug("Номер %s неоднозначен: %s", plate, [match.key for match in matches[:5]])
+            return None
+        return matches[0]
+
+    def match_result(self, result: Dict, max_distance: int = 1) -> Dict[str, Optional[FleetMatch]]:
+        """lookup для номеров автомобиля и прицепа из результата parse_by_keywords."""
+        return {field: self.lookup(result[field], max_distance, kind)
+                for field, kind in PLATE_FIELDS.items() if result.get(field)}
+
+    @classmethod
+    def from_csv(cls, path: str, column: str = DEFAULT_COLUMN, delimiter: Optional[str] = None,
+                 encoding: str = 'utf-8-sig') -> 'FleetIndex':
+        """Реестр из CSV с заголовком; номер — в колонке `column`, остальные колонки — поля записи.
+
+        Разделитель (',', ';' или табуляция) по умолчанию определяется по началу файла.
+        """
+        started = time.perf_counter()
+        with open(path, encoding=encoding, newline='') as f:
+            if delimiter is None:
+                sample = f.read(64 * 1024)
+                f.seek(0)
+                try:
+                    delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+                except csv.Error:
+                    delimiter = ','
+            reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader, [])
+            if column not in header:
+                raise ValueError(f"В файле {path} нет колонки {column}")
+            position = header.index(column)
+            index = cls(header[:position] + header[position + 1:])
+            index.update((row[position], row[:position] + row[position + 1:])
+                         for row in reader if len(row) > position)
+        logger.info("FLEET: Загружено номеров: %s из %s за %.2f с, отклонено: %s", len(index), path,
+                    time.perf_counter() - started, index.rejected)
+        return index
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m driver_parser.fleet',
+                                     description='Поиск номеров из сообщений (по строке на сообщение) в реестре парка.')
+    parser.add_argument('registry', help='CSV реестра с заголовком')
+    parser.add_argument('input', nargs='?', help='файл сообщений; по умолчанию stdin')
+    parser.add_argument('--column', default=DEFAULT_COLUMN, help=f'колонка номера (по умолчанию {DEFAULT_COLUMN})')
+    parser.add_argument('--distance', type=int, default=1, help='допустимое число опечаток в номере')
+    parser.add_argument('--plates', action='store_true', help='во входе номера, а не сообщения')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    index = FleetIndex.from_csv(args.registry, args.column)
+    source = open(args.input, encoding='utf-8') if args.input else sys.stdin
+    try:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            if args.plates:
+                match = index.lookup(line, args.distance)
+                output = {line: match.to_dict() if match else None}
+            else:
+                from .main import parse_by_keywords
+                _, result = parse_by_keywords(line, True, fields=tuple(PLATE_FIELDS))
+                output = {field: {'value': result[field], 'match': match.to_dict() if match else None}
+                          for field, match in index.match_result(result, args.distance).items()}
+            print(json.dumps(output, ensure_ascii=False))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# driver_parser/gazetteer.py
+from typing import Dict, Tuple
+
+# Справочник имён для отбора кандидатов ФИО. Списки упорядочены по убыванию частоты среди
+# взрослого населения. Множества строятся один раз при импорте и после fork общие
+# для процессов пула
+MALE_NAMES: Tuple[str, ...] = (
+    'Александр', 'Сергей', 'Дмитрий', 'Андрей', 'Алексей', 'Владимир', 'Евгений', 'Михаил', 'Игорь',
+    'Юрий', 'Николай', 'Олег', 'Виктор', 'Максим', 'Денис', 'Павел', 'Роман', 'Иван', 'Артём', 'Вадим',
+    'Константин', 'Анатолий', 'Владислав', 'Валерий', 'Виталий', 'Илья', 'Василий', 'Геннадий',
+    'Станислав', 'Никита', 'Антон', 'Кирилл', 'Вячеслав', 'Георгий', 'Борис', 'Пётр', 'Петр', 'Григорий',
+    'Леонид', 'Егор', 'Руслан', 'Фёдор', 'Федор', 'Эдуард', 'Тимур', 'Степан', 'Ярослав', 'Глеб',
+    'Данил', 'Даниил', 'Арсений', 'Матвей', 'Тимофей', 'Семён', 'Семен', 'Валентин', 'Аркадий', 'Яков',
+    'Лев', 'Марк', 'Эльдар', 'Ринат', 'Рустам', 'Ильдар', 'Марат', 'Азат', 'Айрат', 'Ильнур', 'Альберт',
+    'Артур', 'Эрик', 'Филипп', 'Захар', 'Богдан', 'Всеволод', 'Ефим', 'Савелий', 'Макар', 'Герман',
+    'Эмиль', 'Платон', 'Родион', 'Тарас', 'Назар', 'Давид', 'Арсен', 'Ахмед', 'Магомед', 'Мурат',
+    'Шамиль', 'Рамиль', 'Радик', 'Рашид', 'Фарид', 'Хасан', 'Али', 'Алишер', 'Бахтиёр', 'Бахтиер',
+    'Бахром', 'Фаррух', 'Шухрат', 'Улугбек', 'Жасур', 'Отабек', 'Санжар', 'Азамат', 'Нурлан', 'Ержан',
+    'Вагиф', 'Эльчин', 'Гусейн', 'Заур', 'Армен', 'Ашот', 'Гурген', 'Вахтанг', 'Гиорги', 'Зураб',
+)
+FEMALE_NAMES: Tuple[str, ...] = (
+    'Елена', 'Ольга', 'Наталья', 'Татьяна', 'Ирина', 'Светлана', 'Анна', 'Марина', 'Екатерина', 'Юлия',
+    'Мария', 'Людмила', 'Галина', 'Валентина', 'Надежда', 'Оксана', 'Анастасия', 'Любовь', 'Нина', 'Вера',
+    'Евгения', 'Лариса', 'Алла', 'Дарья', 'Ксения', 'Виктория', 'Александра', 'Тамара', 'Полина',
+    'Кристина', 'Алина', 'Софья', 'Елизавета', 'Валерия', 'Маргарита', 'Жанна', 'Инна', 'Лидия', 'Зоя',
+    'Раиса', 'Римма', 'Эльвира', 'Диана', 'Алёна', 'Алена', 'Олеся', 'Яна', 'Вероника', 'Зинаида',
+    'Антонина', 'Клавдия', 'Лилия', 'Регина', 'Гульнара', 'Альбина', 'Карина', 'Милана', 'Ульяна',
+    'Варвара', 'Таисия', 'Василиса',
+)
+# Окончания отчеств и фамилий в нижнем регистре; более длинные проверяются первыми
+MALE_PATRONYMIC_SUFFIXES = ('ович', 'евич', 'ич')
+FEMALE_PATRONYMIC_SUFFIXES = ('овна', 'евна', 'инична', 'ична')
+MALE_SURNAME_SUFFIXES = ('ский', 'цкий', 'ской', 'цкой', 'ов', 'ев', 'ёв', 'ин', 'ын')
+FEMALE_SURNAME_SUFFIXES = ('ская', 'цкая', 'ова', 'ева', 'ёва', 'ина', 'ына')
+NEUTRAL_SURNAME_SUFFIXES = ('енко', 'чук', 'ук', 'юк', 'ян', 'дзе', 'швили', 'их', 'ых')
+
+# Вес признаков: имя или отчество — сильный признак ФИО, окончание фамилии — слабый
+NAME_WEIGHT = 2
+SURNAME_WEIGHT = 1
+# Короче этого слово не считается отчеством: "Ильич" — самое короткое
+MIN_PATRONYMIC_LENGTH = 5
+# Признаки слова (битовая маска, см. word_features)
+FIRST_NAME = 1
+PATRONYMIC = 2
+SURNAME = 4
+# Сколько слов с вычисленными признаками держать в памяти
+FEATURE_MEMO_SIZE = 65536
+
+FIRST_NAMES = frozenset(name.lower() for name in MALE_NAMES + FEMALE_NAMES)
+PATRONYMIC_SUFFIXES = MALE_PATRONYMIC_SUFFIXES + FEMALE_PATRONYMIC_SUFFIXES
+SURNAME_SUFFIXES = FEMALE_SURNAME_SUFFIXES + MALE_SURNAME_SUFFIXES + NEUTRAL_SURNAME_SUFFIXES
+
+
+def is_patronymic(word: str) -> bool:
+    return len(word) >= MIN_PATRONYMIC_LENGTH and word.endswith(PATRONYMIC_SUFFIXES)
+
+
+def is_surname(word: str) -> bool:
+    return len(word) > 3 and word.endswith(SURNAME_SUFFIXES)
+
+
+_features: Dict[str, int] = {}
+
+
+def word_features(word: str) -> int:
+    """Признаки слова в нижнем регистре: FIRST_NAME, PATRONYMIC, SURNAME или 0."""
+    features = _features.get(word)
+    if features is None:
+        features = ((FIRST_NAME if word in FIRST_NAMES else 0) | (PATRONYMIC if is_patronymic(word) else 0) |
+                    (SURNAME if is_surname(word) else 0))
+        if len(_features) >= FEATURE_MEMO_SIZE:
+            _features.clear()
+        _features[word] = features
+    return features
+
+
+def name_score(first: str, second: str, third: str) -> int:
+    """Насколько три слова (в нижнем регистре) похожи на ФИО; 0 — признаков нет.
+
+    Проверяются порядки "Фамилия Имя Отчество" и "Имя Отчество Фамилия".
+    """
+    first, second, third = word_features(first), word_features(second), word_features(third)
+    score = NAME_WEIGHT if (first | second) & FIRST_NAME else 0
+    if (second | third) & PATRONYMIC:
+        score += NAME_WEIGHT
+    if (first | third) & SURNAME:
+        score += SURNAME_WEIGHT
+    return score
@@ -1,9 +1,40 @@
 # -*- coding: utf-8 -*-
 # driver_parser/imports_and_settings.py
 import logging
+from typing import Optional
 
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger('driver_parser')
+# Библиотека не настраивает корневой логгер: уровень и обработчики задаёт приложение.
+# NullHandler лишь подавляет предупреждение "No handlers could be found".
+logger = logging.getLogger(__package__ or 'driver_parser')
+logger.addHandler(logging.NullHandler())
+
+# Уровень ниже DEBUG для сообщений о каждом кандидате и шаблоне. Выключен, пока не
+# вызван set_trace(True); сами сообщения форматируются только при включённом уровне.
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+# Уровень логгера пакета до set_trace(True) и обработчик, добавленный им; выключение
+# трассировки возвращает уровень, заданный приложением
+_level_before_trace: Optional[int] = None
+_trace_handler: Optional[logging.Handler] = None
+
+
+def set_trace(enabled: bool = True, handler: Optional[logging.Handler] = None) -> None:
+    """Включает/выключает трассировку кандидатов для логгеров пакета."""
+    global _level_before_trace, _trace_handler
+    if enabled:
+        if _level_before_trace is None:
+            _level_before_trace = logger.level
+        logger.setLevel(TRACE)
+        if handler is not None and handler not in logger.handlers:
+            logger.addHandler(handler)
+            _trace_handler = handler
+        return
+    if _level_before_trace is not None:
+        logger.setLevel(_level_before_trace)
+        _level_before_trace = None
+    if _trace_handler is not None:
+        logger.removeHandler(_trace_handler)
+        _trace_handler = None
 
 CYRILLIC_TO_LATIN = {
     'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd',
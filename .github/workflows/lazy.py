@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# driver_parser/lazy.py
+import logging
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from .cache import active_cache
+from .engine import TextLike, prepare_text
+from .extractors import extraction_plan
+from .models import ADDRESS_ALIAS, FIELD_KEYS, DriverRecord
+
+logger = logging.getLogger(__name__)
+
+# Ключ результата (и синоним адреса) -> ключ поля, которое его заполняет
+_FIELDS = dict((key, key) for _, key in FIELD_KEYS)
+_FIELDS[ADDRESS_ALIAS] = dict(FIELD_KEYS)['address']
+_PHONES = dict(FIELD_KEYS)['phones']
+_MISSING = object()
+
+
+class LazyRecord(Mapping):
+    """Результат parse_by_keywords, поля которого вычисляются при первом обращении.
+
+    Ведёт себя как словарь результата: в нём только заполненные поля, адрес доступен и под
+    ключом Прописка. record['Телефон'], .get() и `in` запускают экстрактор одного поля
+    и запоминают значение; нормализация текста, проход по токенам и индекс ключевых слов
+    общие для всех полей и выполняются один раз, при первой надобности. Перебор, len()
+    и сравнение вычисляют все поля, как и materialize(), которая возвращает обычный словарь
+    (например, для json.dumps). Если кэш результатов включён, готовый результат берётся
+    из него, а полностью вычисленный — туда записывается.
+    """
+
+    __slots__ = ('_prepared', '_extractors', '_values', '_result')
+
+    def __init__(self, text: TextLike, fields: Optional[Iterable[str]] = None):
+        self._prepared = prepare_text(text)
+        self._extractors = {extractor.key: extractor for extractor in extraction_plan(fields)}
+        self._values: Dict[str, Any] = {}
+        self._result: Optional[Dict] = None
+        cache = active_cache()
+        if cache is not None:
+            cached = cache.get(self._prepared.cleaned)
+            if cached is not None:
+                for key in self._extractors:
+                    self._values[key] = cached[1].get(key)
+
+    def _field(self, key: str) -> Any:
+        value = self._values.get(key, _MISSING)
+        if value is _MISSING:
+            value = None
+            try:
+                value = self._extractors[key].extract(self._prepared)
+            except Exception as e:
+                logger.error("LAZY: Ошибка извлечения поля %s: %s", key, e)
+            self._values[key] = value
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        field = _FIELDS.get(key)
+        value = self._field(field) if field in self._extractors else None
+        if not value:
+            raise KeyError(key)
+        return list(value) if field == _PHONES else value
+
+    def __bool__(self) -> bool:
+        # Поля проверяются от самого дешёвого до первого заполненного
+        extractors = sorted(self._extractors.values(), key=lambda extractor: extractor.cost)
+        return any(self._field(extractor.key) for extractor in extractors)
+
+    def materialize(self) -> Dict:
+        """Вычисляет все поля; словарь в формате parse_by_keywords."""
+        if self._result is None:
+            record = self.to_record()
+            self._result = record.to_dict()
+            cache = active_cache()
+            if cache is not None and len(self._extractors) == len(FIELD_KEYS):
+                cache.put(self._prepared.cleaned, (True, self._result) if record else (False, {}))
+        return dict(self._result)
+
+    def to_record(self) -> DriverRecord:
+        """Вычисляет все поля; результат в виде DriverRecord."""
+        record = DriverRecord()
+        for key, extractor in self._extractors.items():
+            value = self._field(key)
+            setattr(record, extractor.attribute, tuple(value) if value and key == _PHONES else value)
+        return record
+
+    @property
+    def evaluated(self) -> Tuple[str, ...]:
+        """Ключи полей, которые уже вычислены."""
+        return tuple(self._values)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.materialize())
+
+    def __len__(self) -> int:
+        return len(self.materialize())
+
+    def __repr__(self) -> str:
+        known = {key: value for key, value in self._values.items() if value}
+        pending = [key for key in self._extractors if key not in self._values]
+        return f"LazyRecord({known!r}, pending={pending!r})"
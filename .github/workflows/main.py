@@ -1,31 +1,146 @@
 import logging
-from typing import Tuple, Dict
-from .personal_data import parse_personal_data
-from .passport import extract_passport_data
-from .vehicle import extract_vehicle_data
-from .address import extract_address_data
+import time
+from typing import Optional, Tuple, Dict, Iterable, List
+from . import metrics
+from .cache import active_cache
+from .engine import prepare_text
+from .extractors import FieldExtractor, extraction_plan, plan_fields
+from .lazy import LazyRecord
+from .models import ADDRESS_ALIAS, FIELD_KEYS, PARTIAL_KEY, DriverRecord
+from .personal_data import split_drivers
 
 logger = logging.getLogger(__name__)
 
-def parse_by_keywords(text: str, is_driver_data: bool = False) -> Tuple[bool, Dict]:
-    logger.debug(f"MAIN: Parsing text: {text[:100]}...")
-    result = {}
+# Все поля, которые может вернуть parse_by_keywords, в порядке их заполнения
+RESULT_FIELDS = tuple(key for _, key in FIELD_KEYS) + (ADDRESS_ALIAS,)
+
+def _extract_record(prepared, plan: Tuple[FieldExtractor, ...], time_budget: Optional[float] = None,
+                    deadline: Optional[float] = None) -> DriverRecord:
+    # Экстракторы запускаются по плану (extractors.extraction_plan); бюджет проверяется между ними
+    record = DriverRecord()
+    for extractor in plan:
+        if deadline is not None and time.perf_counter() > deadline:
+            logger.warning("MAIN: Time budget %.3fs exceeded, returning partial result", time_budget)
+            record.partial = True
+            break
+        setattr(record, extractor.attribute, extractor.extract(prepared))
+    return record
+
+def _select(result: Dict, plan: Tuple[FieldExtractor, ...]) -> Dict:
+    """Поля полного результата, которые заполняет план."""
+    keys = plan_fields(plan)
+    return {key: value for key, value in result.items() if key in keys}
+
+@metrics.timed('parse_by_keywords', hit=lambda result: result[0])
+def parse_by_keywords(text: str, is_driver_data: bool = False,
+                      time_budget: Optional[float] = None,
+                      fields: Optional[Iterable[str]] = None,
+                      lazy: bool = False) -> Tuple[bool, Dict]:
+    """Разбирает сообщение с данными водителя.
+
+    fields — ключи нужных полей результата (например, {'Телефон', 'Автомобиль'}); запускаются
+    только их экстракторы. None — все поля. Неизвестное поле — ValueError.
+    lazy=True — вместо словаря возвращается LazyRecord: поля вычисляются при обращении
+    к ним, признак успеха — по первому заполненному полю; time_budget не применяется.
+    """
+    plan = extraction_plan(fields)
+    try:
+        return _parse_by_keywords(text, is_driver_data, plan, fields, time_budget, lazy)
+    except Exception as e:
+        logger.error("MAIN: Error parsing text: %s", e)
+        return False, {}
+
+def _parse_by_keywords(text: str, is_driver_data: bool, plan: Tuple[FieldExtractor, ...],
+                       fields: Optional[Iterable[str]] = None, time_budget: Optional[float] = None,
+                       lazy: bool = False) -> Tuple[bool, Dict]:
+    # parse_by_keywords без перехвата исключений: batch записывает ошибку сообщения в результат
+    logger.debug("MAIN: Parsing text: %.100s...", text)
+    if is_driver_data and lazy:
+        record = LazyRecord(text, fields)
+        return (True, record) if record else (False, {})
+    if is_driver_data:
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        prepared = prepare_text(text)
+        cache = active_cache()
+        if cache is not None:
+            cached = cache.get(prepared.cleaned)
+            if cached is not None:
+                logger.debug("MAIN: Result taken from cache")
+                if fields is None or not cached[0]:
+                    return cached
+                selected = _select(cached[1], plan)
+                return (True, selected) if selected else (False, {})
+        record = _extract_record(prepared, plan, time_budget, deadline)
+    else:
+        logger.debug("MAIN: Non-driver data parsing requested, returning empty dict")
+        return False, {}
+
+    result = record.to_dict()
+    if metrics.ENABLED:
+        metrics.record_fields(RESULT_FIELDS if fields is None else plan_fields(plan), result)
+    if not record:
+        logger.debug("MAIN: No valid data extracted, returning empty dict")
+        parsed = False, {}
+    else:
+        logger.debug("MAIN: Result: %s", result)
+        parsed = True, result
+    # В кэше хранятся только полные результаты
+    if cache is not None and not record.partial and fields is None:
+        cache.put(prepared.cleaned, parsed)
+    return parsed
+
+@metrics.timed('parse_record')
+def parse_record(text: str, time_budget: Optional[float] = None,
+                 fields: Optional[Iterable[str]] = None) -> Optional[DriverRecord]:
+    """То же, что parse_by_keywords(text, True), но результат — компактный DriverRecord
+    (None, если ничего не найдено); словарь в прежнем формате даёт record.to_dict()."""
+    plan = extraction_plan(fields)
+    try:
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        prepared = prepare_text(text)
+        cache = active_cache()
+        if cache is not None:
+            cached = cache.get(prepared.cleaned)
+            if cached is not None:
+                if fields is not None and cached[0]:
+                    cached = True, _select(cached[1], plan)
+                return DriverRecord.from_dict(cached[1]) if cached[0] and cached[1] else None
+        record = _extract_record(prepared, plan, time_budget, deadline)
+        if metrics.ENABLED:
+            metrics.record_fields(RESULT_FIELDS if fields is None else plan_fields(plan), record.to_dict())
+        if cache is not None and not record.partial and fields is None:
+            cache.put(prepared.cleaned, (True, record.to_dict()) if record else (False, {}))
+        return record if record else None
+    except Exception as e:
+        logger.error("MAIN: Error parsing text: %s", e)
+        return None
+
+@metrics.timed('parse_records')
+def parse_records(text: str, is_driver_data: bool = True,
+                  fields: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Разбирает сообщение с данными нескольких водителей.
+
+    Текст делится на участки по водителям (split_drivers), и каждый участок разбирается
+    теми же экстракторами, что в parse_by_keywords. Нормализация, единый проход по токенам
+    и индекс ключевых слов выполняются один раз на всё сообщение. Возвращает по словарю
+    на водителя в порядке следования в тексте; участки без данных пропускаются.
+    fields — как в parse_by_keywords.
+    """
+    plan = extraction_plan(fields)
+    if not is_driver_data:
+        logger.debug("MAIN: Non-driver data parsing requested, returning empty list")
+        return []
     try:
-        if is_driver_data:
-            result.update(parse_personal_data(text))
-            result.update(extract_passport_data(text))
-            result.update(extract_vehicle_data(text))
-            result.update(extract_address_data(text))
-        else:
-            logger.debug("MAIN: Non-driver data parsing requested, returning empty dict")
-            return False, {}
-        
-        if not result or all(v is None for v in result.values()):
-            logger.debug("MAIN: No valid data extracted, returning empty dict")
-            return False, {}
-        
-        logger.debug(f"MAIN: Result: {result}")
-        return True, result
+        records = []
+        for segment in split_drivers(prepare_text(text)):
+            record = _extract_record(segment, plan)
+            result = record.to_dict()
+            if metrics.ENABLED:
+                metrics.record_fields(RESULT_FIELDS if fields is None else plan_fields(plan), result)
+            if record:
+                records.append(result)
+        logger.debug("MAIN: Records: %s", records)
+        return records
     except Exception as e:
-        logger.error(f"MAIN: Error parsing text: {str(e)}")
-        return False, {}
\ No newline at end of file
+        logger.error("MAIN: Error parsing records: %s", e)
+        return []
\ No newline at end of file
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# driver_parser/metrics.py
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Инструментирование выключено по умолчанию. Пока ENABLED ложно, обёртка timed
+# сразу вызывает исходную функцию, а экстракторы не вызывают count() вовсе.
+# Счётчики хранятся в памяти процесса: при parse_many с workers > 1 каждый
+# процесс пула ведёт свои.
+ENABLED = False
+
+METRIC_PREFIX = 'driver_parser'
+
+_lock = threading.Lock()
+# имя -> [вызовов, секунд всего, максимум секунд, непустых результатов]
+_timings: Dict[str, List[float]] = {}
+# имя -> [просмотрено совпадений регулярных выражений, принято кандидатов]
+_counters: Dict[str, List[int]] = {}
+# поле результата -> [заполнено, пусто]
+_fields: Dict[str, List[int]] = {}
+
+
+def enable() -> None:
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+        _fields.clear()
+
+
+def timed(name: str, variant: Optional[Callable[..., str]] = None,
+          hit: Callable[[Any], bool] = bool) -> Callable:
+    """Декоратор: время работы и доля удачных результатов функции.
+
+    `variant` строит суффикс имени из аргументов вызова (например, автомобиль/прицеп).
+    `hit` решает, удачен ли результат; по умолчанию — непустой.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            key = f"{name}:{variant(*args, **kwargs)}" if variant else name
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            elapsed = time.perf_counter() - started
+            with _lock:
+                timing = _timings.get(key)
+                if timing is None:
+                    timing = _timings[key] = [0, 0.0, 0.0, 0]
+                timing[0] += 1
+                timing[1] += elapsed
+                timing[2] = max(timing[2], elapsed)
+                timing[3] += bool(hit(result))
+            return result
+        return wrapper
+    return decorator
+
+
+def count(name: str, matches: int = 0, candidates: int = 0) -> None:
+    """Учитывает просмотренные совпадения и принятых кандидатов экстрактора."""
+    with _lock:
+        counter = _counters.get(name)
+        if counter is None:
+            counter = _counters[name] = [0, 0]
+        counter[0] += matches
+        counter[1] += candidates
+
+
+def record_fields(fields: Iterable[str], result: Dict) -> None:
+    """Учитывает заполненные и пустые поля одного результата разбора."""
+    with _lock:
+        for field in fields:
+            stats = _fields.get(field)
+            if stats is None:
+                stats = _fields[field] = [0, 0]
+            stats[0 if result.get(field) else 1] += 1
+
+
+def snapshot() -> Dict:
+    """Копия накопленных метрик в виде словаря."""
+    with _lock:
+        extractors = {}
+        for name in sorted(set(_timings) | set(_counters)):
+            calls, seconds, max_seconds, hits = _timings.get(name, (0, 0.0, 0.0, 0))
+            matches, candidates = _counters.get(name, (0, 0))
+            extractors[name] = {
+                'calls': calls,
+                'seconds': seconds,
+                'mean_seconds': seconds / calls if calls else 0.0,
+                'max_seconds': max_seconds,
+                'hits': hits,
+                'misses': calls - hits,
+                'hit_rate': hits / calls if calls else 0.0,
+                'matches': matches,
+                'candidates': candidates,
+            }
+        fields = {
+            field: {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses)}
+            for field, (hits, misses) in _fields.items()
+        }
+    return {'enabled': ENABLED, 'extractors': extractors, 'fields': fields}
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(prefix: str = METRIC_PREFIX) -> str:
+    """Метрики в текстовом формате экспозиции Prometheus."""
+    data = snapshot()
+    extractors, fields = data['extractors'], data['fields']
+    lines = []
+
+    def family(metric: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+
+    family('extractor_seconds', 'summary', 'Время работы экстрактора, секунды')
+    for name, stats in extractors.items():
+        label = f'extractor="{_label(name)}"'
+        lines.append(f"{prefix}_extractor_seconds_sum{{{label}}} {stats['seconds']:.9f}")
+        lines.append(f"{prefix}_extractor_seconds_count{{{label}}} {stats['calls']}")
+    family('extractor_max_seconds', 'gauge', 'Самый долгий вызов экстрактора, секунды')
+    for name, stats in extractors.items():
+        lines.append(f'{prefix}_extractor_max_seconds{{extractor="{_label(name)}"}} {stats["max_seconds"]:.9f}')
+    family('extractor_results_total', 'counter', 'Вызовы экстрактора с найденным и пустым результатом')
+    for name, stats in extractors.items():
+        lines.append(f'{prefix}_extractor_results_total{{extractor="{_label(name)}",outcome="hit"}} {stats["hits"]}')
+        lines.append(f'{prefix}_extractor_results_total{{extractor="{_label(name)}",outcome="miss"}} {stats["misses"]}')
+    family('regex_matches_total', 'counter', 'Просмотренные совпадения регулярных выражений')
+    for name, stats in extractors.items():
+        lines.append(f'{prefix}_regex_matches_total{{extractor="{_label(name)}"}} {stats["matches"]}')
+    family('candidates_total', 'counter', 'Принятые кандидаты значений')
+    for name, stats in extractors.items():
+        lines.append(f'{prefix}_candidates_total{{extractor="{_label(name)}"}} {stats["candidates"]}')
+    family('field_results_total', 'counter', 'Заполненные и пустые поля результата')
+    for field, stats in fields.items():
+        lines.append(f'{prefix}_field_results_total{{field="{_label(field)}",outcome="hit"}} {stats["hits"]}')
+        lines.append(f'{prefix}_field_results_total{{field="{_label(field)}",outcome="miss"}} {stats["misses"]}')
+    return '\n'.join(lines) + '\n'
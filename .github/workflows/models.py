@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# driver_parser/models.py
+from typing import Any, Dict, Optional, Tuple
+
+# Ставится в результат, если разбор остановлен по бюджету времени (time_budget, секунды)
+# и часть полей не проверялась
+PARTIAL_KEY = 'Разбор_неполный'
+
+# Атрибут DriverRecord -> ключ словаря результата, в порядке заполнения.
+# Адрес выдаётся под двумя ключами: Адрес_регистрации и Прописка
+FIELD_KEYS: Tuple[Tuple[str, str], ...] = (
+    ('driver', 'Водитель'),
+    ('birth_date', 'Дата_рождения'),
+    ('phones', 'Телефон'),
+    ('driver_license', 'ВУ_серия_и_номер'),
+    ('passport', 'Паспорт_серия_и_номер'),
+    ('passport_authority', 'Паспорт_место_выдачи'),
+    ('passport_date', 'Паспорт_дата_выдачи'),
+    ('passport_code', 'Паспорт_код_подразделения'),
+    ('vehicle', 'Автомобиль'),
+    ('trailer', 'Прицеп'),
+    ('address', 'Адрес_регистрации'),
+)
+ADDRESS_ALIAS = 'Прописка'
+
+
+class Candidate:
+    """Значение поля, найденное экстрактором, с приоритетом и позицией в тексте."""
+
+    __slots__ = ('value', 'priority', 'start')
+
+    def __init__(self, value: Any, priority: int, start: int):
+        self.value = value
+        self.priority = priority
+        self.start = start
+
+    def __repr__(self) -> str:
+        return f"Candidate({self.value!r}, {self.priority}, {self.start})"
+
+
+class BestCandidate:
+    """Выбор лучшего кандидата без накопления и сортировки списка.
+
+    Лучший — с наибольшим приоритетом, при равном приоритете — стоящий правее; из полностью
+    равных остаётся добавленный первым, как при устойчивой сортировке по убыванию.
+    """
+
+    __slots__ = ('best', 'count')
+
+    def __init__(self):
+        self.best: Optional[Candidate] = None
+        self.count = 0
+
+    def add(self, value: Any, priority: int, start: int) -> None:
+        self.count += 1
+        best = self.best
+        if best is None or priority > best.priority or (priority == best.priority and start > best.start):
+            self.best = Candidate(value, priority, start)
+
+    def merge(self, other: 'BestCandidate') -> None:
+        if other.best is not None:
+            self.add(other.best.value, other.best.priority, other.best.start)
+            self.count += other.count - 1
+
+    @property
+    def value(self) -> Any:
+        return self.best.value if self.best is not None else None
+
+    @property
+    def priority(self) -> Optional[int]:
+        return self.best.priority if self.best is not None else None
+
+    def __bool__(self) -> bool:
+        return self.best is not None
+
+
+class DriverRecord:
+    """Результат разбора данных одного водителя.
+
+    Занимает в несколько раз меньше памяти, чем словарь с теми же полями; to_dict()
+    возвращает словарь в прежнем формате parse_by_keywords (только заполненные поля).
+    """
+
+    __slots__ = tuple(attribute for attribute, _ in FIELD_KEYS) + ('partial',)
+
+    def __init__(self, driver: Optional[str] = None, birth_date: Optional[str] = None,
+                 phones: Tuple[str, ...] = (), driver_license: Optional[str] = None,
+                 passport: Optional[str] = None, passport_authority: Optional[str] = None,
+                 passport_date: Optional[str] = None, passport_code: Optional[str] = None,
+                 vehicle: Optional[str] = None, trailer: Optional[str] = None,
+                 address: Optional[str] = None, partial: bool = False):
+        self.driver = driver
+        self.birth_date = birth_date
+        self.phones = phones
+        self.driver_license = driver_license
+        self.passport = passport
+        self.passport_authority = passport_authority
+        self.passport_date = passport_date
+        self.passport_code = passport_code
+        self.vehicle = vehicle
+        self.trailer = trailer
+        self.address = address
+        self.partial = partial
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        if self.driver:
+            result['Водитель'] = self.driver
+        if self.birth_date:
+            result['Дата_рождения'] = self.birth_date
+        if self.phones:
+            result['Телефон'] = list(self.phones)
+        if self.driver_license:
+            result['ВУ_серия_и_номер'] = self.driver_license
+        if self.passport:
+            result['Паспорт_серия_и_номер'] = self.passport
+        if self.passport_authority:
+            result['Паспорт_место_выдачи'] = self.passport_authority
+        if self.passport_date:
+            result['Паспорт_дата_выдачи'] = self.passport_date
+        if self.passport_code:
+            result['Паспорт_код_подразделения'] = self.passport_code
+        if self.vehicle:
+            result['Автомобиль'] = self.vehicle
+        if self.trailer:
+            result['Прицеп'] = self.trailer
+        if self.address:
+            result['Адрес_регистрации'] = self.address
+            result[ADDRESS_ALIAS] = self.address
+        if self.partial and result:
+            result[PARTIAL_KEY] = True
+        return result
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DriverRecord':
+        record = cls(partial=bool(data.get(PARTIAL_KEY)))
+        for attribute, key in FIELD_KEYS:
+            value = data.get(key)
+            if value:
+                setattr(record, attribute, tuple(value) if attribute == 'phones' else value)
+        return record
+
+    def __bool__(self) -> bool:
+        return bool(self.driver or self.birth_date or self.phones or self.driver_license or self.passport or
+                    self.passport_authority or self.passport_date or self.passport_code or self.vehicle or
+                    self.trailer or self.address)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DriverRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"DriverRecord({self.to_dict()!r})"
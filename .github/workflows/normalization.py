@@ -1,78 +1,96 @@
 # -*- coding: utf-8 -*-
 # parser/normalization.py
+import re
 from typing import Dict, Optional
-from .imports_and_settings import re, logger, SUBDIVISIONS, COMPOSITE_CITIES, CITY_NOMINATIVE, SMALL_WORDS, CAR_BRANDS, TRAILER_BRANDS, PROTECTED_STREET_NAMES
+from .engine import WHITESPACE_RE
+from .patterns import register
+from .imports_and_settings import logger
+from .plates import PLATE_SEPARATORS, fold, parse_plate, plate_key
+from .reference import reference_data
 
-logger.debug("Логгер инициализирован в normalization")
-logger.handlers[0].flush()
+AUTHORITY_CITY_DOT = register('normalization.authority_city_dot', r'\bг\.([А-Яа-яЁё])')
+AUTHORITY_TAIL = register('normalization.authority_tail', r'\s*(?:выдан|дата\s*выдачи|с\s*\d{2}\.\d{2}\.\d{4}|от\s*\d{2}\.\d{2}\.\d{4}|регистрация|дата\s*рождения).*', re.IGNORECASE)
+ADDRESS_CODE = register('normalization.address_code', r'\s*Код\s*подразделения\s*\d{3}-\d{3}\b', re.IGNORECASE)
+ADDRESS_HOUSE_LONG = register('normalization.address_house_long', r'\bдом\.?\s*(\d+)', re.IGNORECASE)
+ADDRESS_HOUSE = register('normalization.address_house', r'\bд\.?\s*(\d+)', re.IGNORECASE)
+ADDRESS_FLAT = register('normalization.address_flat', r'\bкв\.?\s*(\d+)', re.IGNORECASE)
+ADDRESS_SETTLEMENT = register('normalization.address_settlement', r'\bпос\.?\s*([А-Яа-яЁё]+)', re.IGNORECASE)
+ADDRESS_FLAT_WORD = register('normalization.address_flat_word', r'\bкв\s+артира\b', re.IGNORECASE)
+ADDRESS_HOUSE_CASE = register('normalization.address_house_case', r'\bДом\.(\s|$)', re.IGNORECASE)
+TRAILING_DOT = register('normalization.trailing_dot', r'\.\s*$')
+
+
+def _plate_only(value: str, kind: str) -> Optional[str]:
+    # Значение без марки, целиком номер (в том числе "А 123 ВС 77"): канонический вид номера
+    plate = parse_plate(PLATE_SEPARATORS.sub('', fold(value)), kind)
+    return plate.key if plate is not None else None
 
 def normalize_data(data: Dict[str, Optional[str]], text: str) -> Dict[str, Optional[str]]:
     """Нормализует извлечённые данные (адреса, место выдачи паспорта, номера)."""
     normalized = data.copy()
-    logger.debug(f"Нормализация данных: {normalized}")
-    logger.handlers[0].flush()
+    reference = reference_data()
+    logger.debug("Нормализация данных: %s", normalized)
 
-    # Нормализация Паспорт_место_выдачи с использованием SUBDIVISIONS
+    # Нормализация Паспорт_место_выдачи по реестру кодов подразделений
     if "Паспорт_код_подразделения" in normalized and normalized["Паспорт_код_подразделения"]:
         code = normalized["Паспорт_код_подразделения"]
-        if code in SUBDIVISIONS:
-            subdivision_data = SUBDIVISIONS[code]
+        subdivision_data = reference.subdivision(code)
+        if subdivision_data is not None:
             place = subdivision_data['subdivision']
             region = subdivision_data.get('region', '')
             if "Паспорт_место_выдачи" not in normalized or not normalized["Паспорт_место_выдачи"]:
                 normalized["Паспорт_место_выдачи"] = place
-                logger.debug(f"Установлено место выдачи паспорта: {place}")
-                logger.handlers[0].flush()
+                logger.debug("Установлено место выдачи паспорта: %s", place)
             elif region and region.lower() not in normalized["Паспорт_место_выдачи"].lower():
                 normalized["Паспорт_место_выдачи"] = f"{place} ({region})"
-                logger.debug(f"Нормализовано место выдачи паспорта: {normalized['Паспорт_место_выдачи']}")
-                logger.handlers[0].flush()
+                logger.debug("Нормализовано место выдачи паспорта: %s", normalized['Паспорт_место_выдачи'])
         else:
-            logger.warning(f"Код подразделения {code} не найден в SUBDIVISIONS")
-            logger.handlers[0].flush()
+            logger.warning("Код подразделения %s не найден в справочнике", code)
     if "Паспорт_место_выдачи" in normalized and normalized["Паспорт_место_выдачи"]:
         place = normalized["Паспорт_место_выдачи"]
-        place = re.sub(r'\bг\.([А-Яа-яЁё])', r'г. \1', place)
-        place = re.sub(r'\s*(?:выдан|дата\s*выдачи|с\s*\d{2}\.\d{2}\.\d{4}|от\s*\d{2}\.\d{2}\.\d{4}|регистрация|дата\s*рождения).*', '', place, flags=re.IGNORECASE)
+        place = AUTHORITY_CITY_DOT.sub(r'г. \1', place)
+        place = AUTHORITY_TAIL.sub('', place)
         normalized["Паспорт_место_выдачи"] = place.strip()
-        logger.debug(f"Очищено место выдачи паспорта: {normalized['Паспорт_место_выдачи']}")
-        logger.handlers[0].flush()
+        logger.debug("Очищено место выдачи паспорта: %s", normalized['Паспорт_место_выдачи'])
 
     # Нормализация адреса регистрации
     if "Адрес_регистрации" in normalized and normalized["Адрес_регистрации"]:
         address = normalized["Адрес_регистрации"]
-        address = re.sub(r'\s*Код\s*подразделения\s*\d{3}-\d{3}\b', '', address, flags=re.IGNORECASE)
-        address = re.sub(r'\bдом\.?\s*(\d+)', r'дом. \1', address, flags=re.IGNORECASE)
-        address = re.sub(r'\bд\.?\s*(\d+)', r'д. \1', address, flags=re.IGNORECASE)
-        address = re.sub(r'\bкв\.?\s*(\d+)', r'кв. \1', address, flags=re.IGNORECASE)
-        address = re.sub(r'\bпос\.?\s*([А-Яа-яЁё]+)', r'пос. \1', address, flags=re.IGNORECASE)
-        for key, value in PROTECTED_STREET_NAMES.items():
-            address = re.sub(rf'(ул\.?\s*){key}', rf'\1{value}', address, flags=re.IGNORECASE)
-        for key, value in COMPOSITE_CITIES.items():
-            address = re.sub(rf'\b{key}\b', value, address, flags=re.IGNORECASE)
-        for key, value in CITY_NOMINATIVE.items():
-            address = re.sub(rf'\b{key}\b', value, address, flags=re.IGNORECASE)
-        address = re.sub(r'\bкв\s+артира\b', 'квартира', address, flags=re.IGNORECASE)
-        address = re.sub(r'\s+', ' ', address).strip()
+        address = ADDRESS_CODE.sub('', address)
+        address = ADDRESS_HOUSE_LONG.sub(r'дом. \1', address)
+        address = ADDRESS_HOUSE.sub(r'д. \1', address)
+        address = ADDRESS_FLAT.sub(r'кв. \1', address)
+        address = ADDRESS_SETTLEMENT.sub(r'пос. \1', address)
+        # Каждый справочник применяется одним выражением за один проход
+        address = reference.replacer('protected_street_names').sub(address)
+        address = reference.replacer('composite_cities').sub(address)
+        address = reference.replacer('city_nominative').sub(address)
+        address = ADDRESS_FLAT_WORD.sub('квартира', address)
+        address = WHITESPACE_RE.sub(' ', address).strip()
+        small_words = reference.table('small_words')
         words = address.split()
         formatted_address = []
         for i, word in enumerate(words):
-            if word.lower() in SMALL_WORDS or word.lower() in {'ул.', 'д.', 'кв.', 'б-р'}:
+            if word.lower() in small_words or word.lower() in {'ул.', 'д.', 'кв.', 'б-р'}:
                 formatted_address.append(word.lower())
             else:
                 formatted_address.append(word.capitalize())
         address = ' '.join(formatted_address)
-        address = re.sub(r'\bДом\.(\s|$)', r'дом.\1', address, flags=re.IGNORECASE)
-        address = re.sub(r'\.\s*$', '', address)
+        address = ADDRESS_HOUSE_CASE.sub(r'дом.\1', address)
+        address = TRAILING_DOT.sub('', address)
         normalized["Адрес_регистрации"] = address
-        logger.debug(f"Нормализован адрес регистрации: {normalized['Адрес_регистрации']}")
-        logger.handlers[0].flush()
+        logger.debug("Нормализован адрес регистрации: %s", normalized['Адрес_регистрации'])
 
     # Нормализация автомобиля
+    # Номер приводится к каноническому виду (plates.Plate.key): кириллица вместо
+    # латинских двойников, без пробелов
     if "Автомобиль" in normalized and normalized["Автомобиль"]:
         vehicle = normalized["Автомобиль"].strip()
         parts = vehicle.split(maxsplit=1)
-        if len(parts) > 1:
+        plate = _plate_only(vehicle, 'car')
+        if plate:
+            vehicle = plate
+        elif len(parts) > 1:
             brand, number = parts
             brand = brand.strip()
             brand_lower = brand.lower()
@@ -80,8 +98,8 @@ def normalize_data(data: Dict[str, Optional[str]], text: str) -> Dict[str, Optio
             if brand_lower == "mercedes":
                 normalized_brand = "Mercedes"
             else:
-                normalized_brand = CAR_BRANDS.get(brand_lower, brand.title())
-            number = re.sub(r'\s+', '', number).upper()
+                normalized_brand = reference.table('car_brands').get(brand_lower, brand.title())
+            number = plate_key(number, 'car') or WHITESPACE_RE.sub('', number).upper()
             vehicle = f"{normalized_brand} {number}"
         else:
             vehicle = vehicle.strip().upper()
@@ -91,12 +109,15 @@ def normalize_data(data: Dict[str, Optional[str]], text: str) -> Dict[str, Optio
     if "Прицеп" in normalized and normalized["Прицеп"]:
         trailer = normalized["Прицеп"].strip()
         parts = trailer.split(maxsplit=1)
-        if len(parts) > 1:
+        plate = _plate_only(trailer, 'trailer')
+        if plate:
+            trailer = plate
+        elif len(parts) > 1:
             brand, number = parts
             brand = brand.strip()
             brand_lower = brand.lower()
-            normalized_brand = TRAILER_BRANDS.get(brand_lower, brand.title())
-            number = re.sub(r'\s+', '', number).upper()
+            normalized_brand = reference.table('trailer_brands').get(brand_lower, brand.title())
+            number = plate_key(number, 'trailer') or WHITESPACE_RE.sub('', number).upper()
             trailer = f"{normalized_brand} {number}"
         else:
             trailer = trailer.strip().upper()
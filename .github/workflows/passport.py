@@ -1,108 +1,169 @@
 import re
 import logging
-from typing import Optional
-from dateparser import parse as date_parse
+from bisect import bisect_left
+from typing import Optional, Tuple
+from . import metrics
+from .dates import normalize_dotted_date
+from .engine import AUTHORITY_KEYWORDS, TextLike, prepare_text, keyword_before
+from .imports_and_settings import TRACE
+from .models import BestCandidate, DriverRecord
+from .patterns import register
 
 logger = logging.getLogger(__name__)
 
+PASSPORT_KEYWORD_BEFORE = register('passport.keyword_before', r'(?i)(?:паспорт|серия)\s*[:\-\s]*(?:№\s*)?\Z', re.UNICODE)
+LICENSE_KEYWORD_AFTER = register('passport.license_keyword_after', r'(?i)\s*(?:ву|водительское|права)', re.UNICODE)
+# Место выдачи — то, что нашёл бы единый шаблон
+#   (?:выдан[а-яё\s,:]*|кем\s*выдан[а-яё\s,:]*)? <орган> [а-яё\s,.\-]{5,200} (?= дата | конец текста),
+# но без его перебора: с каждого "выдан" он просматривает весь следующий текст, а с каждого
+# органа — до 200 символов с откатом, что на длинных текстах даёт квадратичное время.
+# Здесь "хвост" органа жадный без отката (откат не может дать другого совпадения), органы
+# и "выдан" берутся из индекса ключевых слов (PreparedText.anchors) и проверяются по одному разу,
+# а конец области после "выдан" вычисляется один раз на участок.
+AUTHORITY_BODY = register('passport.authority_body', rf'(?i){AUTHORITY_KEYWORDS}[а-яё\s,.\-]{{5,200}}+(?=\s*\d{{2}}\.\d{{2}}\.\d{{2,}}|$)', re.UNICODE)
+AUTHORITY_PREFIX_END = register('passport.authority_prefix_end', r'(?i)[^а-яё\s,:]', re.UNICODE)
+# Дата выдачи: сразу после "выдан ..." или после названия органа (уф.../мвд/овд)
+PASSPORT_DATE_KEYWORD_BEFORE = [
+    register('passport.date_after_issued', r'(?i)выдан[а-яё\s,:]*\Z', re.UNICODE),
+    register('passport.date_after_authority', r'(?i)(?:уф|мвд|овд)[а-яё\s,.\-]+\Z', re.UNICODE),
+]
+PASSPORT_DATE_WINDOW = 300
+PASSPORT_CODE_KEYWORD_BEFORE = register('passport.code_keyword_before', r'(?i)(?:код\s*подразделения|код)[:\-\s]*\Z', re.UNICODE)
+NON_DIGIT = register('passport.non_digit', r'[^0-9]')
+OTDEELING = register('passport.otdeeling', r'otdeeling', re.IGNORECASE)
+
 def normalize_passport(passport: str) -> str:
-    passport = re.sub(r'[^0-9]', '', passport)
+    passport = NON_DIGIT.sub('', passport)
     if len(passport) == 10:
         return f"{passport[:4]} {passport[4:]}"
-    logger.debug(f"Некорректный паспорт для нормализации: {passport} (длина: {len(passport)})")
+    logger.debug("Некорректный паспорт для нормализации: %s (длина: %s)", passport, len(passport))
     return passport
 
-def extract_passport_series_and_number(text: str) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для паспорта: {text_cleaned[:100]}")
-    PASSPORT_PATTERNS = [
-        re.compile(r'(?i)(?:паспорт|серия)\s*[:\-\s]*(?:№\s*)?(\d{4}\s*\d{6})\b', re.UNICODE),
-        re.compile(r'(?i)(?:паспорт|серия)\s*[:\-\s]*(?:№\s*)?(\d{2}\s*\d{2}\s*\d{6})\b', re.UNICODE),
-        re.compile(r'(?i)\b(\d{4}\s*\d{6})\b(?!\s*(?:ву|водительское|права))', re.UNICODE),
-        re.compile(r'(?i)\b(\d{2}\s*\d{2}\s*\d{6})\b(?!\s*(?:ву|водительское|права))', re.UNICODE),
-        re.compile(r'(?i)(?:паспорт|серия)\s*[:\-\s]*(?:№\s*)?(\d{10})\b', re.UNICODE),
-    ]
-    candidates = []
-    for pattern in PASSPORT_PATTERNS:
-        logger.debug(f"Применён шаблон для паспорта: {pattern.pattern}")
-        for match in pattern.finditer(text_cleaned):
-            passport = match.group(1).replace(' ', '')
-            if len(passport) == 10:
-                passport = normalize_passport(passport)
-                context = text_cleaned[max(0, match.start() - 50):match.end() + 50].lower()
-                priority = 300 if 'паспорт' in context or 'серия' in context else 200
-                if 'ву' in context or 'водительское' in context or 'права' in context:
-                    priority -= 100
-                logger.debug(f"Кандидат паспорта: {passport}, приоритет: {priority}, контекст: {context[:100]}")
-                candidates.append((passport, priority, match.start()))
-            else:
-                logger.debug(f"Кандидат паспорта {passport} исключён: длина {len(passport)} не 10")
+def passport_candidates(text: TextLike) -> BestCandidate:
+    """Лучший кандидат серии и номера паспорта; каждый токен оценивается независимо."""
+    prepared = prepare_text(text)
+    candidates = BestCandidate()
+    for token in prepared.hits('doc'):
+        starts = []
+        keyword = keyword_before(PASSPORT_KEYWORD_BEFORE, prepared, token.start())
+        if keyword:
+            starts.append(keyword.start())
+        if not LICENSE_KEYWORD_AFTER.match(prepared.cleaned, token.end()):
+            starts.append(token.start())
+        passport = normalize_passport(token.group('doc'))
+        for start in starts:
+            context = prepared.context(start - 50, token.end() + 50)
+            priority = 300 if 'паспорт' in context or 'серия' in context else 200
+            if 'ву' in context or 'водительское' in context or 'права' in context:
+                priority -= 100
+            logger.log(TRACE, "Кандидат паспорта: %s, приоритет: %s, контекст: %.100s", passport, priority, context)
+            candidates.add(passport, priority, start)
+    return candidates
+
+@metrics.timed('extract_passport_series_and_number')
+def extract_passport_series_and_number(text: TextLike) -> Optional[str]:
+    prepared = prepare_text(text)
+    logger.debug("Полный текст для паспорта: %.100s", prepared.cleaned)
+    candidates = passport_candidates(prepared)
+    if metrics.ENABLED:
+        metrics.count('extract_passport_series_and_number', len(prepared.hits('doc')), candidates.count)
     if not candidates:
         logger.debug("Паспорт не найден")
         return None
-    candidates.sort(key=lambda x: (x[1], x[2]), reverse=True)
-    return candidates[0][0]
+    return candidates.value
 
-def normalize_issuing_authority(text: str) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для места выдачи: {text_cleaned[:100]}")
-    patterns = [
-        re.compile(r'(?i)(?:выдан\s*[а-яё\s,:]*|кем\s*выдан\s*[а-яё\s,:]*)?(?:отдел|мро|уфмс|оуфмс|мвд|тп\s*уфмс|гу\s*мвд|овд|умвд|мп\s*уфмс|отделом\s*уфмс)[а-яё\s,.\-]{5,200}(?=\s*\d{2}\.\d{2}\.\d{2,}|$)', re.UNICODE),
-    ]
-    for pattern in patterns:
-        match = pattern.search(text_cleaned)
-        if match:
-            authority = match.group(0).strip()
-            authority = re.sub(r'otdeeling', 'отделения', authority, flags=re.IGNORECASE)
-            logger.debug(f"Извлечено место выдачи: {authority}")
-            return authority
+def _find_authority(prepared: TextLike) -> Tuple[Optional[Tuple[int, int]], int]:
+    """Границы места выдачи и число проверенных органов."""
+    text = prepared.cleaned
+    text_end = prepared.end
+    # Органы, после которых есть подходящий "хвост", в порядке позиций
+    starts, ends = [], []
+    examined = 0
+    for keyword_start, _ in prepared.anchors('authority'):
+        examined += 1
+        body = AUTHORITY_BODY.match(text, keyword_start, text_end)
+        if body:
+            starts.append(body.start())
+            ends.append(body.end())
+    if not starts:
+        return None, examined
+    # Самое левое начало: первый орган или "выдан", в области которого (символы
+    # [а-яё\s,:] до первого другого) есть подходящий орган; тогда берётся самый правый из них
+    prefix_end = 0
+    # Вхождения "выдан" без перекрытий, как у finditer; "кем выдан" поглощает своё "выдан"
+    issued_end = 0
+    for issued_start, end in prepared.anchors('issued'):
+        if end > starts[0]:
+            break
+        if issued_start < issued_end:
+            continue
+        issued_end = end
+        if end >= prefix_end:
+            blocker = AUTHORITY_PREFIX_END.search(text, end, text_end)
+            prefix_end = blocker.start() if blocker else text_end
+        last = bisect_left(starts, prefix_end) - 1
+        if last >= 0 and starts[last] >= end:
+            return (issued_start, ends[last]), examined
+    return (starts[0], ends[0]), examined
+
+@metrics.timed('normalize_issuing_authority')
+def normalize_issuing_authority(text: TextLike) -> Optional[str]:
+    prepared = prepare_text(text)
+    logger.debug("Полный текст для места выдачи: %.100s", prepared.cleaned)
+    span, examined = _find_authority(prepared)
+    if metrics.ENABLED:
+        metrics.count('normalize_issuing_authority', examined, int(span is not None))
+    if span:
+        authority = prepared.cleaned[span[0]:span[1]].strip()
+        authority = OTDEELING.sub('отделения', authority)
+        logger.debug("Извлечено место выдачи: %s", authority)
+        return authority
     logger.debug("Место выдачи не найдено")
     return None
 
-def extract_passport_date(text: str) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для даты выдачи: {text_cleaned[:100]}")
-    patterns = [
-        re.compile(r'(?i)(?:выдан|паспорт\s*выдан|кем\s*выдан)\s*[а-яё\s,:]*?\b(\d{2}\.\d{2}\.\d{2,4})\b', re.UNICODE),
-        re.compile(r'(?i)(?:уф|мвд|овд|оуфмс|тп\s*уфмс|гу\s*мвд|умвд|мп\s*уфмс)\s*[а-яё\s,.\-]+\s*(\d{2}\.\d{2}\.\d{2,4})\b', re.UNICODE),
-    ]
-    for pattern in patterns:
-        match = pattern.search(text_cleaned)
-        if match:
-            date_str = match.group(1)
-            parsed_date = date_parse(date_str, settings={'DATE_ORDER': 'DMY'})
-            if parsed_date:
-                formatted_date = parsed_date.strftime('%d.%m.%Y')
-                logger.debug(f"Извлечена дата выдачи: {formatted_date}")
+@metrics.timed('extract_passport_date')
+def extract_passport_date(text: TextLike) -> Optional[str]:
+    prepared = prepare_text(text)
+    logger.debug("Полный текст для даты выдачи: %.100s", prepared.cleaned)
+    dates = prepared.hits('date')
+    if metrics.ENABLED:
+        metrics.count('extract_passport_date', len(dates))
+    for pattern in PASSPORT_DATE_KEYWORD_BEFORE:
+        for match in dates:
+            if not keyword_before(pattern, prepared, match.start(), PASSPORT_DATE_WINDOW):
+                continue
+            date_str = match.group('date')
+            formatted_date = normalize_dotted_date(date_str)
+            if formatted_date:
+                logger.debug("Извлечена дата выдачи: %s", formatted_date)
                 return formatted_date
+            break
     logger.debug("Дата выдачи не найдена")
     return None
 
-def extract_passport_code(text: str) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для кода подразделения: {text_cleaned[:100]}")
-    pattern = re.compile(r'(?i)(?:код\s*подразделения|код)[:\-\s]*(\d{3}-\d{3})\b', re.UNICODE)
-    match = pattern.search(text_cleaned)
-    if match:
-        code = match.group(1)
-        logger.debug(f"Извлечён код подразделения: {code}")
-        return code
+@metrics.timed('extract_passport_code')
+def extract_passport_code(text: TextLike) -> Optional[str]:
+    prepared = prepare_text(text)
+    logger.debug("Полный текст для кода подразделения: %.100s", prepared.cleaned)
+    if metrics.ENABLED:
+        metrics.count('extract_passport_code', len(prepared.hits('code')))
+    for match in prepared.hits('code'):
+        if keyword_before(PASSPORT_CODE_KEYWORD_BEFORE, prepared, match.start()):
+            code = match.group('code')
+            logger.debug("Извлечён код подразделения: %s", code)
+            return code
     logger.debug("Код подразделения не найден")
     return None
 
-def extract_passport_data(text: str) -> dict:
-    result = {}
-    passport = extract_passport_series_and_number(text)
-    if passport:
-        result['Паспорт_серия_и_номер'] = passport
-    authority = normalize_issuing_authority(text)
-    if authority:
-        result['Паспорт_место_выдачи'] = authority
-    date = extract_passport_date(text)
-    if date:
-        result['Паспорт_дата_выдачи'] = date
-    code = extract_passport_code(text)
-    if code:
-        result['Паспорт_код_подразделения'] = code
-    logger.debug(f"Результат паспортных данных: {result}")
-    return result
+def fill_passport_data(text: TextLike, record: DriverRecord) -> DriverRecord:
+    text = prepare_text(text)
+    record.passport = extract_passport_series_and_number(text)
+    record.passport_authority = normalize_issuing_authority(text)
+    record.passport_date = extract_passport_date(text)
+    record.passport_code = extract_passport_code(text)
+    logger.debug("Паспортные данные: %s, %s, %s, %s", record.passport, record.passport_authority,
+                 record.passport_date, record.passport_code)
+    return record
+
+def extract_passport_data(text: TextLike) -> dict:
+    return fill_passport_data(text, DriverRecord()).to_dict()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# driver_parser/patterns.py
+import marshal
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Все регулярные выражения парсера компилируются один раз при импорте модулей
+# и хранятся здесь. Экстракторы не вызывают re.compile на горячем пути.
+_REGISTRY: Dict[str, re.Pattern] = {}
+_SOURCES: Dict[str, Tuple[str, int]] = {}
+
+# Снимок скомпилированного кода шаблонов (см. write_snapshot). Разбор и компиляция
+# выражений в модуле re написаны на Python и занимают основную часть времени импорта
+# пакета; из снимка объекты Pattern собираются сразу. Снимок годится только для той же
+# версии интерпретатора, иначе, как и при изменении выражения, шаблон компилируется заново.
+#
+# Снимок опирается на внутренние модули CPython (_sre.compile, _sre.MAGIC, re._parser
+# и re._compiler или sre_parse и sre_compile до 3.11). Он рассчитан на CPython 3.8–3.13
+# и проверен на 3.11. На других версиях и интерпретаторах, как и при любой ошибке чтения,
+# сборки или записи снимка, шаблоны компилируются обычным re.compile.
+#
+# Снимок лежит в каталоге кеша, а не в пакете: пакет может быть установлен только для чтения.
+# Каталог задаёт переменная окружения DRIVER_PARSER_CACHE_DIR, по умолчанию это
+# $XDG_CACHE_HOME/driver_parser (~/.cache/driver_parser).
+try:
+    import _sre
+except ImportError:
+    _sre = None
+CACHE_DIR_ENV = 'DRIVER_PARSER_CACHE_DIR'
+SNAPSHOT_NAME = 'patterns.snapshot'
+_snapshot: Optional[Dict[str, tuple]] = None
+
+
+def cache_dir() -> str:
+    """Каталог для снимка шаблонов и других файлов кеша пакета."""
+    path = os.environ.get(CACHE_DIR_ENV)
+    if path:
+        return path
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'driver_parser')
+
+
+def snapshot_path() -> str:
+    return os.path.join(cache_dir(), SNAPSHOT_NAME)
+
+
+def _snapshot_version() -> Tuple[Optional[int], int]:
+    return getattr(_sre, 'MAGIC', None), sys.hexversion
+
+
+def _load_snapshot() -> Dict[str, tuple]:
+    if getattr(_sre, 'compile', None) is None:
+        return {}
+    try:
+        with open(snapshot_path(), 'rb') as f:
+            version, entries = marshal.loads(f.read())
+        if version != _snapshot_version() or not isinstance(entries, dict):
+            return {}
+        return entries
+    except Exception:
+        return {}
+
+
+def _compile(name: str, pattern: str, flags: int) -> re.Pattern:
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = _load_snapshot()
+    entry = _snapshot.get(name)
+    if entry is not None and entry[0] == pattern and entry[1] == int(flags):
+        try:
+            return _sre.compile(pattern, *entry[2:])
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
+
+def register(name: str, pattern: str, flags: int = 0) -> re.Pattern:
+    """Компилирует шаблон и регистрирует его под уникальным именем."""
+    source = _SOURCES.get(name)
+    if source is not None:
+        if source == (pattern, flags):
+            return _REGISTRY[name]
+        raise ValueError(f"Шаблон {name} уже зарегистрирован с другим выражением")
+    compiled = _compile(name, pattern, flags)
+    _REGISTRY[name] = compiled
+    _SOURCES[name] = (pattern, flags)
+    return compiled
+
+
+def get_pattern(name: str) -> re.Pattern:
+    return _REGISTRY[name]
+
+
+def list_patterns(prefix: str = '') -> List[Tuple[str, str]]:
+    """Список (имя, выражение) зарегистрированных шаблонов, отсортированный по имени."""
+    return sorted((name, compiled.pattern) for name, compiled in _REGISTRY.items() if name.startswith(prefix))
+
+
+def pattern_count(prefix: str = '') -> int:
+    """Количество скомпилированных шаблонов; не должно меняться после импорта."""
+    return sum(1 for name in _REGISTRY if name.startswith(prefix))
+
+
+def fingerprint() -> str:
+    """Хеш всех зарегистрированных выражений; меняется при любом изменении набора шаблонов."""
+    import hashlib
+    digest = hashlib.blake2b(digest_size=8)
+    for name in sorted(_SOURCES):
+        pattern, flags = _SOURCES[name]
+        digest.update(f"{name}\0{pattern}\0{flags}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def write_snapshot(path: Optional[str] = None) -> int:
+    """Сохраняет скомпилированный код всех зарегистрированных шаблонов; возвращает их число.
+
+    По умолчанию снимок пишется в snapshot_path(), откуда его читает импорт пакета.
+    В снимок попадают только шаблоны, которые из него собираются в точности такими же,
+    как при re.compile. Файл подменяется атомарно. Если внутренние модули re недоступны
+    или устроены иначе либо файл не удалось записать, снимок не пишется и возвращается 0.
+    """
+    try:
+        if getattr(_sre, 'compile', None) is None:
+            return 0
+        try:
+            from re import _compiler, _parser
+        except ImportError:
+            import sre_compile as _compiler, sre_parse as _parser
+    except Exception:
+        return 0
+    entries = {}
+    for name, (pattern, flags) in _SOURCES.items():
+        flags = int(flags)
+        try:
+            tree = _parser.parse(pattern, flags)
+            code = [int(op) for op in _compiler._code(tree, flags)]
+            groupindex = {group: int(index) for group, index in tree.state.groupdict.items()}
+            indexgroup = [None] * tree.state.groups
+            for group, index in groupindex.items():
+                indexgroup[index] = group
+            entry = (pattern, flags, int(flags | tree.state.flags), code, tree.state.groups - 1,
+                     groupindex, tuple(indexgroup))
+            if _sre.compile(pattern, *entry[2:]) != re.compile(pattern, flags):
+                continue
+        except Exception:
+            # Такой шаблон просто компилируется при импорте, как без снимка
+            continue
+        entries[name] = entry
+    path = path or snapshot_path()
+    temporary = f"{path}.tmp{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(temporary, 'wb') as f:
+            marshal.dump((_snapshot_version(), entries), f)
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        return 0
+    return len(entries)
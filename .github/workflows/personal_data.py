@@ -1,166 +1,262 @@
 import re
 import logging
-from typing import Optional, List
-from dateparser import parse as date_parse
+from bisect import bisect_left
+from typing import Optional, List, Tuple
+from . import metrics
+from .dates import parse_dotted_date
+from .engine import (ANCHOR_GROUPS, KEYWORD_WINDOW, TextLike, TextSegment, _FULL_NAME, _SHORT_NAME, prepare_text,
+                     keyword_before)
+from .gazetteer import FIRST_NAME, SURNAME, name_score, word_features
+from .imports_and_settings import TRACE
+from .models import BestCandidate, DriverRecord
+from .patterns import register
+from .phone import phone_from_match, unique_phones
 
 logger = logging.getLogger(__name__)
 
-def find_name(text: str) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для ФИО: {text_cleaned[:100]}")
-    STOPWORDS = ['паспорт', 'серия', 'номер', 'адрес', 'телефон', 'автомобиль', 'прицеп', 'выдан', 'уфмс', 'мвд']
-    FIO_STOPWORDS = ['выдан', 'отдел', 'уфмс', 'мвд', 'по', 'рф', 'обл', 'области', 'республике']
-    initial_to_name = {
-        'и.': {'male': 'Иван', 'female': 'Ирина'},
-        'с.': {'male': 'Сергей', 'female': 'Светлана'},
-        'в.': {'male': 'Вячеслав', 'female': 'Вера'},
-        'г.': {'male': 'Геннадий', 'female': 'Галина'},
-        'а.': {'male': 'Александр', 'female': 'Александра'},
-        'л.': {'male': 'Леонид', 'female': 'Людмила'},
-        'ю.': {'male': 'Юрий', 'female': 'Юлия'},
-        'э.': {'male': 'Эльдар', 'female': 'Эльвира'},
-        'м.': {'male': 'Михаил', 'female': 'Мария'},
-        'т.': {'male': 'Тимур', 'female': 'Татьяна'},
-        'н.': {'male': 'Николай', 'female': 'Наталья'},
-        'д.': {'male': 'Дмитрий', 'female': 'Дарья'},
-        'п.': {'male': 'Павел', 'female': 'Полина'},
-    }
-
-    def is_valid_fio_candidate(fio: str) -> bool:
-        fio_lower = fio.lower()
-        valid = (not any(word in fio_lower for word in FIO_STOPWORDS) and
-                 len(fio.split()) >= 2 and fio != 'ФИО ВОДИТЕЛЯ')
-        logger.debug(f"Проверка кандидата ФИО: {fio}, валидно: {valid}")
-        return valid
-
-    def expand_shortened_fio(fio: str) -> Optional[str]:
-        parts = fio.strip().split()
-        if len(parts) >= 3 and all(part[0].isupper() for part in parts if part):
-            logger.debug(f"Полное ФИО найдено: {fio}")
-            return fio
-        if len(parts) >= 2 and '.' in parts[-1]:
-            surname = parts[0]
-            initials = [i.strip('.') for i in parts[-1].split('.')]
-            if len(initials) == 2 and all(i.lower() in initial_to_name for i in initials if i):
-                gender = 'male' if surname.endswith('ич') or surname.endswith('ий') else 'female'
-                expanded = f"{surname} {initial_to_name[initials[0].lower()][gender]} {initial_to_name[initials[1].lower()][gender]}"
-                logger.debug(f"Расширенное ФИО: {fio} -> {expanded}")
-                return expanded
-        cleaned_fio = re.sub(r'^(?:водитель|ф\.и\.о\.|данные\s*о\s*водителе)\s*[:\-]?\s*', '', fio, flags=re.IGNORECASE).strip()
-        parts = cleaned_fio.split()
-        if len(parts) >= 3 and all(part[0].isupper() for part in parts if part):
-            logger.debug(f"Очищенное полное ФИО: {cleaned_fio}")
-            return cleaned_fio
-        logger.debug(f"Не удалось расширить ФИО: {fio}")
+DOB_KEYWORD_BEFORE = register('personal_data.dob_keyword_before', r'(?i)(?:д\.р\.|дата\s*рождения)[\s:]*\Z', re.UNICODE)
+DOB_EXCLUDED_AFTER = register('personal_data.dob_excluded_after', r'(?i)\s*(?:выдан|код|тел|паспорт|серия|водительское)', re.UNICODE)
+LICENSE_KEYWORD_BEFORE = register('personal_data.license_keyword_before', r'(?i)(?:ву|водительское\s*удостоверение|права)[\s:]*\Z', re.UNICODE)
+FIO_KEYWORD_PREFIX = register('personal_data.fio_keyword_prefix', r'^(?:водитель|ф\.и\.о\.|данные\s*о\s*водителе)\s*[:\-]?\s*', re.IGNORECASE)
+NAME_AT = register('personal_data.name_at', rf'(?:(?P<full>{_FULL_NAME})\b|(?P<short>{_SHORT_NAME})(?!\w))', re.IGNORECASE)
+RECORD_MARKER_BEFORE = register('personal_data.record_marker_before', r'(?:^|\s)(\d{1,2}[.)]\s*)\Z', re.UNICODE)
+NAME_GROUPS = ('name_kw_full', 'name_kw_short', 'name_full', 'name_short')
+KEYWORD_NAME_GROUPS = ('name_kw_full', 'name_kw_short')
+# Токены единого прохода, которые относятся к данным водителя, а не к его ФИО
+DATA_GROUPS = ('date', 'phone', 'doc', 'code')
+FIO_STOPWORDS = ['выдан', 'отдел', 'уфмс', 'мвд', 'по', 'рф', 'обл', 'области', 'республике']
+# Кандидат ФИО без ключевого слова перед ним должен набрать столько признаков по справочнику
+# имён (gazetteer.name_score): имя или отчество. Краткой форме нужна фамилия с типичным окончанием
+MIN_NAME_SCORE = 2
+
+def is_valid_fio_candidate(fio: str) -> bool:
+    # Стоп-слова сверяются целыми словами, как в _record_starts (фамилия Попов допустима)
+    words = fio.lower().replace('.', ' ').split()
+    valid = (not any(word in FIO_STOPWORDS for word in words) and
+             len(fio.split()) >= 2 and fio != 'ФИО ВОДИТЕЛЯ')
+    logger.log(TRACE, "Проверка кандидата ФИО: %s, валидно: %s", fio, valid)
+    return valid
+
+def expand_shortened_fio(fio: str) -> Optional[str]:
+    parts = fio.strip().split()
+    if len(parts) >= 3 and all(part[0].isupper() for part in parts if part):
+        logger.debug("Полное ФИО найдено: %s", fio)
+        return fio
+    if len(parts) >= 2 and '.' in parts[-1]:
+        # Инициалы не раскрываются: имя по одной букве не восстановить, а отчество тем более
+        short = FIO_KEYWORD_PREFIX.sub('', fio).strip()
+        logger.debug("Краткое ФИО: %s", short)
+        return short
+    cleaned_fio = FIO_KEYWORD_PREFIX.sub('', fio).strip()
+    parts = cleaned_fio.split()
+    if len(parts) >= 3 and all(part[0].isupper() for part in parts if part):
+        logger.debug("Очищенное полное ФИО: %s", cleaned_fio)
+        return cleaned_fio
+    logger.debug("Не удалось расширить ФИО: %s", fio)
+    return None
+
+def _has_name_features(fio: str, short: bool, keyword: bool = False) -> bool:
+    """Похож ли кандидат на ФИО: слова с заглавной буквы (как их принимает
+    expand_shortened_fio) и, если перед ним нет ключевого слова, признаки по справочнику имён."""
+    words = fio.split()
+    if not all(word[0].isupper() for word in words):
+        return False
+    if keyword:
+        return True
+    if short:
+        return bool(word_features(words[0].lower()) & SURNAME)
+    return name_score(words[0].lower(), words[1].lower(), words[2].lower()) >= MIN_NAME_SCORE
+
+def _realigned_name(prepared: TextLike, match: re.Match, group: str) -> Optional[re.Match]:
+    """ФИО, начинающееся со второго или третьего слова отброшенного кандидата.
+
+    Единый проход не перекрывает совпадения: в "Тверь Петров Иван Иванович" он берёт первые
+    три слова, и ФИО целиком не становится токеном. Проверяются только слова, с которых может
+    начинаться ФИО (фамилия или имя); поиск ограничен KEYWORD_WINDOW от начала кандидата.
+    """
+    starts = [word[0].isupper() and word_features(word.lower()) & (FIRST_NAME | SURNAME)
+              for word in match.group(group).split()[1:]]
+    if not any(starts):
         return None
+    text = prepared.cleaned
+    end = min(match.start(group) + KEYWORD_WINDOW, prepared.end)
+    pos = match.start(group)
+    for start in starts:
+        pos = text.find(' ', pos, match.end(group)) + 1
+        if not pos:
+            break
+        if start:
+            name = NAME_AT.match(text, pos, end)
+            if name and _has_name_features(name.group(), name.lastgroup == 'short'):
+                return name
+    return None
+
+def name_candidates(text: TextLike) -> BestCandidate:
+    """Лучший кандидат ФИО до расширения инициалов; каждый токен оценивается независимо.
 
-    patterns = [
-        re.compile(r'(?i)(?:водитель|ф\.и\.о\.|данные\s*о\s*водителе)\s*[:\-]?\s*([А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)\b', re.UNICODE),
-        re.compile(r'(?i)(?:водитель|ф\.и\.о\.|данные\s*о\s*водителе)\s*[:\-]?\s*([А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.\s*[А-ЯЁ]\.)\b', re.UNICODE),
-        re.compile(r'(?i)\b([А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+\s+[А-ЯЁ][а-яё]+)\b', re.UNICODE),
-        re.compile(r'(?i)\b([А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.\s*[А-ЯЁ]\.)\b', re.UNICODE),
-    ]
-    candidates = []
-    for pattern in patterns:
-        logger.debug(f"Применён шаблон для ФИО: {pattern.pattern}")
-        for match in pattern.finditer(text_cleaned):
-            fio = match.group(1).strip()
+    Единый проход не учитывает регистр, поэтому кандидатом становятся любые три слова подряд;
+    кандидаты без ключевого слова сначала сверяются со справочником имён, и только оставшиеся
+    проверяются на стоп-слова и оцениваются по контексту.
+    """
+    prepared = prepare_text(text)
+    candidates = BestCandidate()
+    for group in NAME_GROUPS:
+        keyword = group in KEYWORD_NAME_GROUPS
+        for match in prepared.hits(group):
+            fio = match.group(group).strip()
+            # ФИО после ключевого слова учитывается и с позиции самого ФИО,
+            # как если бы его нашёл шаблон без ключевого слова
+            starts = {match.start(), match.start(group)}
+            if not _has_name_features(fio, group in ('name_short', 'name_kw_short'), keyword):
+                name = _realigned_name(prepared, match, group)
+                if name is None:
+                    logger.log(TRACE, "Кандидат ФИО %s исключён: нет признаков имени", fio)
+                    continue
+                logger.log(TRACE, "Кандидат ФИО %s уточнён: %s", fio, name.group())
+                fio, starts = name.group(), {name.start()}
             if is_valid_fio_candidate(fio):
-                context = text_cleaned[max(0, match.start() - 50):match.start()].lower()
-                priority = 300 if any(kw in context for kw in ['водитель', 'ф.и.о.', 'данные о водителе']) else 200
-                word_count = len(fio.split())
-                priority += word_count * 100
-                logger.debug(f"Кандидат ФИО: {fio}, приоритет: {priority}, контекст: {context}")
-                candidates.append((fio, priority, match.start()))
+                for start in sorted(starts):
+                    context = prepared.context(start - 50, start)
+                    priority = 300 if any(kw in context for kw in ['водитель', 'ф.и.о.', 'данные о водителе']) else 200
+                    word_count = len(fio.split())
+                    priority += word_count * 100
+                    logger.log(TRACE, "Кандидат ФИО: %s, приоритет: %s, контекст: %s", fio, priority, context)
+                    candidates.add(fio, priority, start)
             else:
-                logger.debug(f"Кандидат ФИО {fio} исключён: не валиден")
+                logger.log(TRACE, "Кандидат ФИО %s исключён: не валиден", fio)
+    return candidates
+
+@metrics.timed('find_name')
+def find_name(text: TextLike) -> Optional[str]:
+    prepared = prepare_text(text)
+    logger.debug("Полный текст для ФИО: %.100s", prepared.cleaned)
+    candidates = name_candidates(prepared)
+    if metrics.ENABLED:
+        metrics.count('find_name', sum(len(prepared.hits(group)) for group in NAME_GROUPS), candidates.count)
     if not candidates:
         logger.debug("ФИО не найдено")
         return None
-    candidates.sort(key=lambda x: (x[1], x[2]), reverse=True)
-    return expand_shortened_fio(candidates[0][0])
-
-def extract_date_of_birth(text: str) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для даты рождения: {text_cleaned[:100]}")
-    patterns = [
-        re.compile(r'(?i)(?:д\.р\.|дата\s*рождения)[\s:]*(\d{2}\.\d{2}\.\d{4})\b', re.UNICODE),
-        re.compile(r'(?i)\b(\d{2}\.\d{2}\.\d{4})\b(?!\s*(?:выдан|код|тел|паспорт|серия|водительское))', re.UNICODE),
-    ]
-    for pattern in patterns:
-        logger.debug(f"Применён шаблон для даты рождения: {pattern.pattern}")
-        match = pattern.search(text_cleaned)
-        if match:
-            date_str = match.group(1)
-            parsed_date = date_parse(date_str, settings={'DATE_ORDER': 'DMY'})
+    return expand_shortened_fio(candidates.value)
+
+@metrics.timed('extract_date_of_birth')
+def extract_date_of_birth(text: TextLike) -> Optional[str]:
+    prepared = prepare_text(text)
+    logger.debug("Полный текст для даты рождения: %.100s", prepared.cleaned)
+    dates = [match for match in prepared.hits('date') if len(match.group('date')) == 10]
+    keyword_dates = [match for match in dates if keyword_before(DOB_KEYWORD_BEFORE, prepared, match.start())]
+    free_dates = [match for match in dates if not DOB_EXCLUDED_AFTER.match(prepared.cleaned, match.end())]
+    if metrics.ENABLED:
+        metrics.count('extract_date_of_birth', len(prepared.hits('date')), len(keyword_dates) + len(free_dates))
+    for matches in (keyword_dates, free_dates):
+        if matches:
+            date_str = matches[0].group('date')
+            parsed_date = parse_dotted_date(date_str)
             if parsed_date and 1900 <= parsed_date.year <= 2007:
                 formatted_date = parsed_date.strftime('%d.%m.%Y')
-                logger.debug(f"Извлечена дата рождения: {formatted_date}")
+                logger.debug("Извлечена дата рождения: %s", formatted_date)
                 return formatted_date
-            logger.debug(f"Дата {date_str} исключена: вне диапазона 1900-2007")
+            logger.log(TRACE, "Дата %s исключена: вне диапазона 1900-2007", date_str)
     logger.debug("Дата рождения не найдена")
     return None
 
-def extract_phone(text: str) -> List[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для телефона: {text_cleaned[:100]}")
-    patterns = [
-        re.compile(r'(?:тел[\.:]?\s*)?(?:\+7|8)[\-\s]?\d{3}[\-\s]?\d{3}[\-\s]?\d{2}[\-\s]?\d{2}\b', re.UNICODE),
-        re.compile(r'(?:тел[\.:]?\s*)?(?:\+\d{1,3}|8)\d{10}\b', re.UNICODE),
-    ]
-    phones = []
-    for pattern in patterns:
-        logger.debug(f"Применён шаблон для телефона: {pattern.pattern}")
-        for match in pattern.finditer(text_cleaned):
-            phone = match.group(0)
-            phone = re.sub(r'[^0-9+]', '', phone)
-            if len(phone) >= 11:
-                formatted_phone = f"+7 ({phone[-10:-7]}) {phone[-7:-4]}-{phone[-4:-2]}-{phone[-2:]}"
-                if formatted_phone not in phones:
-                    logger.debug(f"Извлечён телефон: {formatted_phone}")
-                    phones.append(formatted_phone)
+@metrics.timed('extract_phone')
+def extract_phone(text: TextLike) -> List[str]:
+    prepared = prepare_text(text)
+    logger.debug("Полный текст для телефона: %.100s", prepared.cleaned)
+    # Токены единого прохода нормализуются так же, как в phone.extract_phones
+    phones = unique_phones(phone_from_match(match.group('phone')) for match in prepared.hits('phone'))
+    logger.debug("Извлечены телефоны: %s", phones)
+    if metrics.ENABLED:
+        metrics.count('extract_phone', len(prepared.hits('phone')), len(phones))
     return phones
 
-def extract_driver_license(text: str) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для ВУ: {text_cleaned[:100]}")
-    patterns = [
-        re.compile(r'(?i)(?:ву|водительское\s*удостоверение|права)[\s:]*(\d{2}\s*\d{2}\s*\d{6})\b', re.UNICODE),
-        re.compile(r'(?i)(?:ву|водительское\s*удостоверение|права)[\s:]*(\d{4}\s*\d{6})\b', re.UNICODE),
-        re.compile(r'(?i)(?:ву|водительское\s*удостоверение|права)[\s:]*(\d{10})\b', re.UNICODE),
-    ]
-    candidates = []
-    for pattern in patterns:
-        logger.debug(f"Применён шаблон для ВУ: {pattern.pattern}")
-        for match in pattern.finditer(text_cleaned):
-            license = match.group(1).replace(' ', '')
-            if len(license) == 10:
-                license = f"{license[:4]} {license[4:]}"
-                context = text_cleaned[max(0, match.start() - 50):match.end() + 50].lower()
-                priority = 200 if 'ву' in context or 'водительское' in context or 'права' in context else 100
-                if 'паспорт' in context or 'серия' in context:
-                    priority -= 100
-                logger.debug(f"Кандидат ВУ: {license}, приоритет: {priority}, контекст: {context[:100]}")
-                candidates.append((license, priority, match.start()))
+def license_candidates(text: TextLike) -> BestCandidate:
+    """Лучший кандидат ВУ; каждый токен оценивается независимо."""
+    prepared = prepare_text(text)
+    candidates = BestCandidate()
+    for token in prepared.hits('doc'):
+        keyword = keyword_before(LICENSE_KEYWORD_BEFORE, prepared, token.start())
+        if keyword:
+            license = token.group('doc').replace(' ', '')
+            license = f"{license[:4]} {license[4:]}"
+            context = prepared.context(keyword.start() - 50, token.end() + 50)
+            priority = 200 if 'ву' in context or 'водительское' in context or 'права' in context else 100
+            if 'паспорт' in context or 'серия' in context:
+                priority -= 100
+            logger.log(TRACE, "Кандидат ВУ: %s, приоритет: %s, контекст: %.100s", license, priority, context)
+            candidates.add(license, priority, keyword.start())
+    return candidates
+
+@metrics.timed('extract_driver_license')
+def extract_driver_license(text: TextLike) -> Optional[str]:
+    prepared = prepare_text(text)
+    logger.debug("Полный текст для ВУ: %.100s", prepared.cleaned)
+    candidates = license_candidates(prepared)
+    if metrics.ENABLED:
+        metrics.count('extract_driver_license', len(prepared.hits('doc')), candidates.count)
     if not candidates:
         logger.debug("ВУ не найдено")
         return None
-    candidates.sort(key=lambda x: (x[1], x[2]), reverse=True)
-    return candidates[0][0]
-
-def extract_personal_data(text: str) -> dict:
-    result = {}
-    name = find_name(text)
-    if name:
-        result['Водитель'] = name
-    date_of_birth = extract_date_of_birth(text)
-    if date_of_birth:
-        result['Дата_рождения'] = date_of_birth
-    phones = extract_phone(text)
-    if phones:
-        result['Телефон'] = phones
-    driver_license = extract_driver_license(text)
-    if driver_license:
-        result['ВУ_серия_и_номер'] = driver_license
-    logger.debug(f"Результат личных данных: {result}")
-    return result
+    return candidates.value
+
+def _record_starts(prepared: TextLike) -> List[int]:
+    """Позиции, с которых начинаются данные очередного водителя."""
+    # Кандидаты: ключевые слова ("водитель", "ф.и.о.") и ФИО. Единый проход не учитывает
+    # регистр, поэтому ФИО без ключевого слова должно быть с заглавных букв. Стоп-слова
+    # сверяются целыми словами (фамилия Попов допустима)
+    candidates: List[Tuple[int, Optional[str]]] = [(start, None) for start, _ in prepared.anchors('driver')]
+    for group in NAME_GROUPS:
+        for match in prepared.hits(group):
+            fio = match.group(group).strip()
+            words = fio.lower().replace('.', ' ').split()
+            if any(word in FIO_STOPWORDS for word in words) or not (group in KEYWORD_NAME_GROUPS or fio.istitle()):
+                continue
+            candidates.append((match.start(), fio.lower()))
+    candidates.sort(key=lambda candidate: candidate[0])
+    data = sorted([match.start() for group in DATA_GROUPS for match in prepared.hits(group)] +
+                  [start for group in ANCHOR_GROUPS if group != 'driver' for start, _ in prepared.anchors(group)])
+    starts = []
+    name = None
+    for start, fio in candidates:
+        if starts:
+            # Новый водитель начинается, только если у текущего уже есть данные;
+            # то же ФИО ещё раз (например, в подписи) нового водителя не начинает
+            if bisect_left(data, starts[-1]) == bisect_left(data, start):
+                name = name or fio
+                continue
+            if fio is not None and fio == name:
+                continue
+        # Номер пункта перед водителем ("2. Петров ...") относится к нему
+        marker = keyword_before(RECORD_MARKER_BEFORE, prepared, start, 6)
+        starts.append(marker.start(1) if marker else start)
+        name = fio
+    return starts
+
+def split_drivers(text: TextLike) -> List[TextSegment]:
+    """Делит сообщение на участки с данными разных водителей.
+
+    Участок начинается с ключевого слова ("водитель", "ф.и.о.") или ФИО, если у предыдущего
+    водителя уже есть данные (даты, номера, ключевые слова полей). Текст до первой границы
+    относится к первому участку. Участки используют единый проход и индекс ключевых слов
+    исходного текста.
+    """
+    prepared = prepare_text(text)
+    base = prepared.prepared if isinstance(prepared, TextSegment) else prepared
+    starts = _record_starts(prepared)
+    if len(starts) < 2:
+        return [TextSegment(base, prepared.start, prepared.end)]
+    bounds = [prepared.start] + starts[1:] + [prepared.end]
+    logger.debug("Водителей в сообщении: %s", len(starts))
+    return [TextSegment(base, start, end) for start, end in zip(bounds, bounds[1:])]
+
+def fill_personal_data(text: TextLike, record: DriverRecord) -> DriverRecord:
+    text = prepare_text(text)
+    record.driver = find_name(text)
+    record.birth_date = extract_date_of_birth(text)
+    record.phones = tuple(extract_phone(text))
+    record.driver_license = extract_driver_license(text)
+    logger.debug("Личные данные: %s, %s, %s, %s", record.driver, record.birth_date, record.phones, record.driver_license)
+    return record
+
+def extract_personal_data(text: TextLike) -> dict:
+    return fill_personal_data(text, DriverRecord()).to_dict()
@@ -1,17 +1,155 @@
 # -*- coding: utf-8 -*-
 # driver_parser/phone.py
-import re
 import logging
-from typing import Optional, List
-from .imports_and_settings import logging
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .patterns import register
 
 logger = logging.getLogger(__name__)
 
-PHONE_PATTERNS = [
-    re.compile(r'(?i)\b(?:тел\.?|телефон|моб\.?)\s*[:\-\s]*(\+?\d[\d\s\-\(\)]{9,})\b'),
-    re.compile(r'(?i)\b(\+?[78][\d\s\-\(\)]{9,})\b'),
-    re.compile(r'(?i)\b(\+?\d{1,2}[\s.-]?\d{3}[\s.-]?\d{3}[\s.-]?\d{2}[\s.-]?\d{2})\b'),
-]
+# Страна номеров, записанных без "+": с кодом (7...), с префиксом выхода на межгород (8...)
+# или, после ключевого слова, одними цифрами номера
+DEFAULT_COUNTRY = '7'
+TRUNK_PREFIX = '8'
+
+# Код страны -> формат номера; X — цифры номера без кода. Казахстан делит код 7 с Россией
+COUNTRY_FORMATS: Dict[str, str] = {
+    '7': '+7 (XXX) XXX-XX-XX',
+    '375': '+375 (XX) XXX-XX-XX',
+    '380': '+380 (XX) XXX-XX-XX',
+    '998': '+998 (XX) XXX-XX-XX',
+    '992': '+992 (XX) XXX-XX-XX',
+    '996': '+996 (XXX) XXX-XXX',
+    '994': '+994 (XX) XXX-XX-XX',
+    '995': '+995 (XXX) XXX-XXX',
+    '374': '+374 (XX) XXX-XXX',
+    '373': '+373 (XX) XXX-XXX',
+}
+# Как ещё группируют цифры российского номера без кода: 3-3-4 и 3-7 (3-3-2-2 — из формата)
+EXTRA_GROUPINGS: Dict[str, Tuple[Tuple[int, ...], ...]] = {'7': ((3, 3, 4), (3, 7))}
+# Разделитель групп цифр и ключевое слово перед номером
+_SEPARATOR = r'(?:\s?[\-.]\s?|\s)'
+_KEYWORD = r'\b(?:тел\.?|телефон|моб\.?)[:\-\s]*'
+
+
+def _groupings(code: str) -> Tuple[Tuple[int, ...], ...]:
+    template = COUNTRY_FORMATS[code]
+    return (tuple(len(group) for group in re.findall('X+', template)),) + EXTRA_GROUPINGS.get(code, ())
+
+
+def _shape(grouping: Tuple[int, ...]) -> str:
+    # Группы разделены все (скобки вокруг первой тоже разделяют), иначе цифры идут сплошь:
+    # группу, записанную в тексте целиком, шаблон не делит
+    first, rest = grouping[0], ''.join(rf'{_SEPARATOR}\d{{{size}}}' for size in grouping[1:])
+    return (rf'(?:\(\s?\d{{{first}}}\s?\){_SEPARATOR}?|\d{{{first}}}{_SEPARATOR})' + rest[len(_SEPARATOR):]
+            if len(grouping) > 1 else rf'\d{{{first}}}')
+
+
+def _body(code: str) -> str:
+    groupings = _groupings(code)
+    solid = rf'\d{{{sum(groupings[0])}}}'
+    return '(?:' + '|'.join([_shape(grouping) for grouping in groupings] + [solid]) + ')'
+
+
+# Телефон — номер одной из раскладок групп цифр его страны (формат в COUNTRY_FORMATS и
+# EXTRA_GROUPINGS) или те же цифры без разделителей; префикс или код страны может стоять
+# вплотную к номеру. Номер без "+" подходит, только если перед ним префикс 7 или 8 либо ключевое
+# слово ("тел", "моб"), поэтому соседние числа (коды подразделений, номера документов)
+# в телефон не склеиваются. PHONE_PATTERN входит в единый проход engine.TOKEN_SCANNER
+# (группа phone), где токены не перекрываются; PHONE_SCANNER — тот же шаблон для текста
+# вне парсера (extract_phones), в котором пробельные символы подряд считаются одним пробелом,
+# как в PreparedText.
+_INTERNATIONAL = '|'.join(rf'\+{code}{_SEPARATOR}?{_body(code)}' for code in COUNTRY_FORMATS if code != DEFAULT_COUNTRY)
+PHONE_PATTERN = (
+    rf'(?:{_KEYWORD}(?:\+7|[78])?|(?<![\w+])(?:\+7|[78])){_SEPARATOR}?{_body(DEFAULT_COUNTRY)}(?!\w)'
+    rf'|(?:{_KEYWORD})?(?<![\w+])(?:{_INTERNATIONAL})(?!\w)'
+)
+PHONE_SCANNER = register('phone.scanner', PHONE_PATTERN, re.IGNORECASE)
+WHITESPACE = register('phone.whitespace', r'\s+')
+NON_DIGIT = register('phone.non_digit', r'[^\d]')
+
+# Код страны -> (число цифр номера без кода, шаблон для str.format)
+_COUNTRIES: Dict[str, Tuple[int, str]] = {
+    code: (template.count('X'), template.replace('X', '{}')) for code, template in COUNTRY_FORMATS.items()
+}
+_CODE_LENGTHS = sorted({len(code) for code in COUNTRY_FORMATS}, reverse=True)
+
+
+def _format(code: str, national: str) -> Optional[str]:
+    country = _COUNTRIES.get(code)
+    if country is None or len(national) != country[0]:
+        return None
+    return country[1].format(*national)
+
+
+def normalize_digits(digits: str, plus: bool = False, keyword: bool = False) -> Optional[str]:
+    """Номер в международном виде или None.
+
+    plus — номер записан с "+" и начинается с кода страны; keyword — перед номером стоит
+    "тел"/"моб", тогда допускается номер страны DEFAULT_COUNTRY без кода и префикса.
+    """
+    if plus:
+        for size in _CODE_LENGTHS:
+            phone = _format(digits[:size], digits[size:])
+            if phone:
+                return phone
+    if digits.startswith(DEFAULT_COUNTRY) or digits.startswith(TRUNK_PREFIX):
+        phone = _format(DEFAULT_COUNTRY, digits[1:])
+        if phone:
+            return phone
+    if keyword:
+        return _format(DEFAULT_COUNTRY, digits)
+    return None
+
+
+def normalize_phone(phone: str, keyword: bool = False) -> Optional[str]:
+    """Номер, записанный с любыми разделителями, в международном виде или None."""
+    phone = phone.strip()
+    return normalize_digits(NON_DIGIT.sub('', phone), phone.startswith('+'), keyword)
+
+
+def phone_from_match(value: str) -> Optional[str]:
+    """Номер из совпадения PHONE_PATTERN (вместе с ключевым словом, если оно есть)."""
+    keyword = value[0].isalpha()
+    return normalize_digits(NON_DIGIT.sub('', value), '+' in value, keyword)
+
+
+def iter_phone_matches(text: str) -> Iterator[str]:
+    """Все номера текста в порядке следования, с повторами."""
+    for match in PHONE_SCANNER.finditer(WHITESPACE.sub(' ', text)):
+        phone = phone_from_match(match.group())
+        if phone:
+            yield phone
+
+
+def unique_phones(phones: Iterable[Optional[str]]) -> List[str]:
+    """Номера без повторов и пустых значений в порядке первого появления."""
+    seen = set()
+    result = []
+    for phone in phones:
+        if phone and phone not in seen:
+            seen.add(phone)
+            result.append(phone)
+    return result
+
+
+def extract_phones(text: Optional[str]) -> List[str]:
+    """Номера телефонов из текста в международном виде без повторов."""
+    if not text:
+        return []
+    return unique_phones(iter_phone_matches(text))
+
+
+def extract_phones_many(texts: Iterable[Optional[str]]) -> List[List[str]]:
+    """extract_phones для каждого текста, например колонки выгрузки; порядок сохраняется."""
+    return list(map(extract_phones, texts))
+
+
+def iter_phones(texts: Iterable[Optional[str]]) -> Iterator[List[str]]:
+    """Потоковый вариант extract_phones_many: тексты читаются по одному."""
+    for text in texts:
+        yield extract_phones(text)
+
 
 def extract_phone_number(text: str) -> Optional[List[str]]:
     """Extracts phone numbers from text and formats them.
@@ -22,27 +160,10 @@ def extract_phone_number(text: str) -> Optional[List[str]]:
     Returns:
         List of formatted phone numbers (e.g., ['+7 (XXX) XXX-XX-XX']) or None if not found.
     """
-    logger.debug(f"Извлечение телефона: {text[:200]}...")
-    phones = []
-    text_normalized = re.sub(r'\s+', ' ', text).strip()
-
-    for pattern in PHONE_PATTERNS:
-        for match in pattern.finditer(text_normalized):
-            phone = match.group(1).strip()
-            phone_clean = re.sub(r'[^\d]', '', phone)
-            if len(phone_clean) < 10 or len(phone_clean) > 12:
-                continue
-            if phone_clean.startswith('7') or phone_clean.startswith('8'):
-                phone_clean = '+7' + phone_clean[1:]
-            elif not phone_clean.startswith('+'):
-                phone_clean = '+7' + phone_clean
-            if len(phone_clean) == 12:
-                formatted_phone = f"{phone_clean[:2]} ({phone_clean[2:5]}) {phone_clean[5:8]}-{phone_clean[8:10]}-{phone_clean[10:12]}"
-                if formatted_phone not in phones:
-                    phones.append(formatted_phone)
-                    logger.debug(f"Выбран телефон: {formatted_phone}")
-
+    logger.debug("Извлечение телефона: %.200s...", text)
+    phones = extract_phones(text)
     if phones:
+        logger.debug("Выбраны телефоны: %s", phones)
         return phones
-    logger.warning(f"Не удалось извлечь телефон: {text[:100]}...")
+    logger.warning("Не удалось извлечь телефон: %.100s...", text)
     return None
\ No newline at end of file
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# driver_parser/plates.py
+from typing import Iterator, List, Optional, Tuple
+from .patterns import register
+
+# Канонический вид госномера: только буквы, разрешённые на российских номерах (кириллицей),
+# и цифры без разделителей. Латинские буквы того же начертания (A, B, E, K, M, H, O, P, C, T,
+# Y, X) заменяются кириллическими; ноль на месте буквы и "О" на месте цифры исправляются
+# по позиции в номере. Номер тягача — "А123ВС77" (буква, 3 цифры, 2 буквы, регион),
+# прицепа — "АВ123477" (2 буквы, 4 цифры, регион); регион — 2 или 3 цифры.
+PLATE_LETTERS = 'АВЕКМНОРСТУХ'
+HOMOGLYPHS = str.maketrans('ABEKMHOPCTYX', PLATE_LETTERS)
+# Ключ номера (см. Plate.key) кодируется в cp1251: один байт на символ
+KEY_ENCODING = 'cp1251'
+KEY_ALPHABET = (PLATE_LETTERS + '0123456789').encode(KEY_ENCODING)
+MIN_KEY_LENGTH = 8
+MAX_KEY_LENGTH = 9
+
+_LETTER = f'[{PLATE_LETTERS}0]'
+_DIGIT = '[0-9О]'
+PLATE_FORMATS = {
+    'car': register('plates.car', rf'({_LETTER})({_DIGIT}{{3}})({_LETTER}{{2}})({_DIGIT}{{2,3}})'),
+    'trailer': register('plates.trailer', rf'({_LETTER}{{2}})({_DIGIT}{{4}})({_DIGIT}{{2,3}})'),
+}
+# Разделители внутри номера и в тексте вокруг него
+PLATE_SEPARATORS = register('plates.separators', r'[\s\-/._|]+')
+# Подпись страны после региона, отдельно или вплотную к нему
+COUNTRY_SUFFIX = register('plates.country', r'(?<=\d)(?:RUS|РУС|RU)$|^(?:RUS|РУС|RU)$')
+
+_LETTER_FOLD = str.maketrans('0', 'О')
+_DIGIT_FOLD = str.maketrans('О', '0')
+
+
+class Plate:
+    """Госномер, разобранный на серию, номер и регион.
+
+    `kind` — 'car' или 'trailer', `series` — буквы номера (у тягача первая и две последние).
+    """
+
+    __slots__ = ('kind', 'series', 'number', 'region')
+
+    def __init__(self, kind: str, series: str, number: str, region: str):
+        self.kind = kind
+        self.series = series
+        self.number = number
+        self.region = region
+
+    @property
+    def key(self) -> str:
+        """Канонический вид номера: "А123ВС77" или "АВ123477"."""
+        if self.kind == 'car':
+            return f"{self.series[0]}{self.number}{self.series[1:]}{self.region}"
+        return f"{self.series}{self.number}{self.region}"
+
+    def __str__(self) -> str:
+        return self.key
+
+    def __repr__(self) -> str:
+        return f"Plate({self.kind!r}, {self.series!r}, {self.number!r}, {self.region!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Plate) and self.kind == other.kind and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash((self.kind, self.key))
+
+
+def fold(text: str) -> str:
+    """Текст в верхнем регистре с латинскими двойниками букв номера, заменёнными кириллическими."""
+    return text.upper().translate(HOMOGLYPHS)
+
+
+def parse_plate(compact: str, kind: Optional[str] = None) -> Optional[Plate]:
+    """Номер из свёрнутого (fold) текста без разделителей или None.
+
+    kind ограничивает формат ('car' или 'trailer'); по умолчанию подходит любой.
+    """
+    for name, pattern in PLATE_FORMATS.items():
+        if kind is not None and name != kind:
+            continue
+        match = pattern.fullmatch(compact)
+        if match is None:
+            continue
+        region = match.group(match.lastindex).translate(_DIGIT_FOLD)
+        if len(region) == 3 and region[0] == '0':
+            continue
+        number = match.group(2).translate(_DIGIT_FOLD)
+        if name == 'car':
+            series = (match.group(1) + match.group(3)).translate(_LETTER_FOLD)
+        else:
+            series = match.group(1).translate(_LETTER_FOLD)
+        return Plate(name, series, number, region)
+    return None
+
+
+def _tokens(value: str) -> List[str]:
+    tokens = (COUNTRY_SUFFIX.sub('', token) for token in PLATE_SEPARATORS.split(fold(value)))
+    return [token for token in tokens if token]
+
+
+def _spans(tokens: List[str], shortest: int, longest: int) -> Iterator[str]:
+    # Склеенные подряд идущие токены нужной длины: сначала более длинные, слева направо
+    ends = [0]
+    for token in tokens:
+        ends.append(ends[-1] + len(token))
+    for count in range(len(tokens), 0, -1):
+        for first in range(len(tokens) - count + 1):
+            if shortest <= ends[first + count] - ends[first] <= longest:
+                yield ''.join(tokens[first:first + count])
+
+
+def canonical_plate(value: Optional[str], kind: Optional[str] = None) -> Optional[Plate]:
+    """Госномер из извлечённого значения ("ВОЛЬВО А 123 ВС 77", "AB 1234 / 77") или None.
+
+    Номер ищется среди подряд идущих слов значения, поэтому марка перед ним или "RUS"
+    после него не мешают.
+    """
+    if not value:
+        return None
+    # Обычно значение — сам номер, например строка реестра
+    compact = PLATE_SEPARATORS.sub('', fold(value))
+    if MIN_KEY_LENGTH <= len(compact) <= MAX_KEY_LENGTH:
+        plate = parse_plate(compact, kind)
+        if plate is not None:
+            return plate
+    for compact in _spans(_tokens(value), MIN_KEY_LENGTH, MAX_KEY_LENGTH):
+        plate = parse_plate(compact, kind)
+        if plate is not None:
+            return plate
+    return None
+
+
+def plate_key(value: Optional[str], kind: Optional[str] = None) -> Optional[str]:
+    """Канонический вид номера из значения или None."""
+    plate = canonical_plate(value, kind)
+    return plate.key if plate is not None else None
+
+
+def loose_keys(value: Optional[str], slack: int = 1) -> Tuple[str, ...]:
+    """Свёрнутые склейки слов значения, похожие на номер с опечаткой.
+
+    Для нечёткого поиска: длина отличается от длины номера не больше чем на `slack`,
+    есть и буквы, и цифры, других символов нет.
+    """
+    if not value:
+        return ()
+    keys = []
+    for compact in _spans(_tokens(value), MIN_KEY_LENGTH - slack, MAX_KEY_LENGTH + slack):
+        if compact in keys or compact.isdigit() or not any(char.isdigit() for char in compact):
+            continue
+        if all(char.isdigit() or char in PLATE_LETTERS for char in compact):
+            keys.append(compact)
+    return tuple(keys)
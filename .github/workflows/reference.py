@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+# driver_parser/reference.py
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+# Справочники нормализации (normalization.normalize_data) хранятся в одном файле SQLite.
+# Таблицы читаются при первом обращении, реестр кодов подразделений ФМС (десятки тысяч
+# строк) — точечными запросами по первичному ключу. Изменение файла подхватывается без
+# перезапуска: версия файла входит в отпечаток кэша результатов.
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference.sqlite')
+TABLES = ('composite_cities', 'city_nominative', 'protected_street_names', 'small_words',
+          'car_brands', 'trailer_brands')
+# Сколько найденных кодов подразделений держать в памяти
+SUBDIVISION_MEMO_SIZE = 4096
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS entries (name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, '
+    'PRIMARY KEY (name, key)) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS subdivisions (code TEXT PRIMARY KEY, subdivision TEXT NOT NULL, '
+    'region TEXT NOT NULL DEFAULT \'\') WITHOUT ROWID',
+)
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Выражение, совпадающее с любым из слов.
+
+    Общие префиксы вынесены, поэтому проверка позиции стоит O(длина слова), а не O(число слов),
+    как у перечисления k1|k2|...; из вариантов с общим началом выбирается самый длинный.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return _trie_regex(trie)
+
+
+def _trie_regex(node: Dict[str, dict]) -> str:
+    alternatives = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char]
+    if not alternatives:
+        return ''
+    body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    if '' in node:
+        return body + '?' if len(alternatives) == 1 and len(alternatives[0]) == 1 else f'(?:{body})?'
+    return body
+
+
+class Replacer:
+    """Замена всех ключей таблицы за один проход по тексту.
+
+    Ключи сравниваются без учёта регистра; `prefix` и `suffix` — выражения вокруг ключа,
+    совпавший с ними текст сохраняется.
+    """
+
+    def __init__(self, table: Dict[str, str], prefix: str = r'\b', suffix: str = r'\b'):
+        self._values = {key.lower(): value for key, value in table.items() if key}
+        self.pattern = None
+        if self._values:
+            self.pattern = re.compile(f'(?P<head>{prefix})(?P<key>{trie_pattern(self._values)})(?P<tail>{suffix})',
+                                      re.IGNORECASE)
+
+    def _replace(self, match: re.Match) -> str:
+        key = match.group('key')
+        return match.group('head') + self._values.get(key.lower(), key) + match.group('tail')
+
+    def sub(self, text: str) -> str:
+        if self.pattern is None or not text:
+            return text
+        return self.pattern.sub(self._replace, text)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+# Как применяется каждая таблица замен
+REPLACER_CONTEXT = {
+    'composite_cities': (r'\b', r'\b'),
+    'city_nominative': (r'\b', r'\b'),
+    'protected_street_names': (r'ул\.?\s*', ''),
+}
+
+
+class ReferenceData:
+    """Справочники из файла SQLite с ленивой загрузкой и горячей перезагрузкой.
+
+    Не чаще раза в `check_interval` секунд проверяется, не изменился ли файл; при
+    изменении загруженные таблицы отбрасываются, а кэш результатов сбрасывается.
+    Отсутствующий файл равносилен пустым справочникам.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._checked = 0.0
+        self._stamp = self._file_stamp()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._tables: Dict[str, Dict[str, str]] = {}
+        self._replacers: Dict[str, Replacer] = {}
+        self._subdivisions: Dict[str, Optional[Dict[str, str]]] = {}
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def version(self) -> str:
+        return 'none' if self._stamp is None else f"{self._stamp[0]}:{self._stamp[1]}"
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self._stamp is not None:
+            uri = f"file:{self.path}?mode=ro"
+            self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return self._db
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[tuple]:
+        db = self._connection()
+        if db is None:
+            return []
+        try:
+            return db.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.error("REFERENCE: Ошибка чтения справочников %s: %s", self.path, e)
+            return []
+
+    def refresh(self, force: bool = False) -> bool:
+        """Перечитывает справочники, если файл изменился; возвращает True при перезагрузке."""
+        with self._lock:
+            self._checked = time.monotonic()
+            stamp = self._file_stamp()
+            if stamp == self._stamp and not force:
+                return False
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._stamp = stamp
+            self._reset()
+        logger.info("REFERENCE: Справочники %s перезагружены, версия %s", self.path, self.version)
+        cache.invalidate_cache()
+        return True
+
+    def _maybe_refresh(self) -> None:
+        if self.check_interval is not None and time.monotonic() - self._checked >= self.check_interval:
+            self.refresh()
+
+    def table(self, name: str) -> Dict[str, str]:
+        """Таблица ключ -> значение; загружается целиком при первом обращении."""
+        if name not in TABLES:
+            raise KeyError(f"Неизвестный справочник: {name}")
+        self._maybe_refresh()
+        table = self._tables.get(name)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(name)
+                if table is None:
+                    table = dict(self._query('SELECT key, value FROM entries WHERE name = ?', (name,)))
+                    self._tables[name] = table
+                    logger.debug("REFERENCE: Загружен справочник %s: %s записей", name, len(table))
+        return table
+
+    def replacer(self, name: str) -> Replacer:
+        """Единое выражение замены для таблицы из REPLACER_CONTEXT."""
+        table = self.table(name)
+        replacer = self._replacers.get(name)
+        if replacer is None:
+            with self._lock:
+                replacer = self._replacers.get(name)
+                if replacer is None:
+                    replacer = Replacer(table, *REPLACER_CONTEXT[name])
+                    self._replacers[name] = replacer
+        return replacer
+
+    def subdivision(self, code: str) -> Optional[Dict[str, str]]:
+        """Подразделение по коду вида 123-456: {'subdivision': ..., 'region': ...} или None."""
+        self._maybe_refresh()
+        if code in self._subdivisions:
+            return self._subdivisions[code]
+        with self._lock:
+            rows = self._query('SELECT subdivision, region FROM subdivisions WHERE code = ?', (code,))
+            found = {'subdivision': rows[0][0], 'region': rows[0][1]} if rows else None
+            if len(self._subdivisions) >= SUBDIVISION_MEMO_SIZE:
+                self._subdivisions.clear()
+            self._subdivisions[code] = found
+        return found
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def build_reference(path: str, tables: Dict[str, Dict[str, str]],
+                    subdivisions: Optional[Dict[str, Dict[str, str]]] = None) -> None:
+    """Записывает справочники в файл SQLite.
+
+    Файл собирается рядом и подменяется атомарно, поэтому читающие процессы видят
+    либо старую, либо новую версию целиком. Таблица small_words — набор слов: значения не важны.
+    """
+    unknown = set(tables) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Неизвестные справочники: {', '.join(sorted(unknown))}")
+    temporary = f"{path}.tmp{os.getpid()}"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    db = sqlite3.connect(temporary)
+    try:
+        for statement in SCHEMA:
+            db.execute(statement)
+        with db:
+            for name, table in tables.items():
+                db.executemany('INSERT OR REPLACE INTO entries (name, key, value) VALUES (?, ?, ?)',
+                               ((name, key, value or '') for key, value in table.items()))
+            db.executemany('INSERT OR REPLACE INTO subdivisions (code, subdivision, region) VALUES (?, ?, ?)',
+                           ((code, item['subdivision'], item.get('region') or '')
+                            for code, item in (subdivisions or {}).items()))
+        db.execute('VACUUM')
+    finally:
+        db.close()
+    os.replace(temporary, path)
+
+
+_default: Optional[ReferenceData] = None
+_default_lock = threading.Lock()
+
+
+def configure_reference(path: str = DEFAULT_PATH, check_interval: float = 5.0) -> ReferenceData:
+    """Задаёт файл справочников, которым пользуется normalize_data."""
+    global _default
+    with _default_lock:
+        if _default is not None:
+            _default.close()
+        _default = ReferenceData(path, check_interval)
+    cache.invalidate_cache()
+    return _default
+
+
+def reference_data() -> ReferenceData:
+    if _default is None:
+        configure_reference()
+    return _default
+
+
+cache.register_version_source(lambda: reference_data().version)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m driver_parser.reference',
+                                     description='Сборка файла справочников из JSON.')
+    parser.add_argument('source', help="JSON: {\"subdivisions\": {код: {subdivision, region}}, справочник: {ключ: значение}}")
+    parser.add_argument('output', nargs='?', default=DEFAULT_PATH, help='файл SQLite')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    with open(args.source, encoding='utf-8') as f:
+        data = json.load(f)
+    subdivisions = data.pop('subdivisions', {})
+    tables = {name: dict.fromkeys(table, '') if isinstance(table, list) else table for name, table in data.items()}
+    build_reference(args.output, tables, subdivisions)
+    print(f"{args.output}: {len(subdivisions)} подразделений, "
+          + ', '.join(f"{name} {len(table)}" for name, table in tables.items()), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
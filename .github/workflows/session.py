@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+# driver_parser/session.py
+import copy
+import logging
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from . import metrics
+from .address import extract_address
+from .engine import KEYWORD_WINDOW, MAX_TEXT_LENGTH, RESCAN_MARGIN, WHITESPACE_RE, IncrementalText, TextEdit
+from .models import BestCandidate, Candidate, DriverRecord
+from .passport import (PASSPORT_DATE_WINDOW, extract_passport_code, extract_passport_date,
+                       extract_passport_series_and_number, normalize_issuing_authority, passport_candidates)
+from .personal_data import (NAME_GROUPS, expand_shortened_fio, extract_date_of_birth, extract_driver_license,
+                            extract_phone, find_name, license_candidates, name_candidates)
+from .vehicle import (CAR_BEFORE_BRAND_LEAD, CAR_BEFORE_BRAND_SPAN, TRAILER_PLATE, TRAILER_PLATE_LEAD,
+                      TRAILER_PLATE_SPAN, normalize_vehicle_number)
+
+logger = logging.getLogger(__name__)
+
+# Контекст, который экстракторы берут вокруг значения, и запас на само значение вместе
+# с ключевым словом после него
+CONTEXT_WINDOW = 50
+VALUE_SPAN = 40
+# Токены, которые правка может изменить или заставить оценить иначе, начинаются не дальше
+# этого от неё: пересканированный участок и самое широкое окно чтения (дата выдачи паспорта)
+MERGE_WINDOW = RESCAN_MARGIN + PASSPORT_DATE_WINDOW
+
+
+class FieldSource:
+    """Экстрактор поля и то, от чего зависит его результат.
+
+    `groups` — группы токенов единого прохода, группы ключевых слов и шаблоны, которые
+    экстрактор проходит целиком (IncrementalText.finditer). Экстрактор читает текст
+    от `before` символов до их начала до `after` после; to_end=True — вперёд до конца
+    текста (шаблоны с `$` и ленивым захватом до стоп-слова).
+
+    У полей, где токены оцениваются независимо и побеждает лучший кандидат, `candidates`
+    возвращает BestCandidate, а `finish` — значение поля из победителя: после правки
+    заново оцениваются только токены около неё.
+    """
+
+    __slots__ = ('attribute', 'extract', 'groups', 'before', 'after', 'to_end', 'candidates', 'finish')
+
+    def __init__(self, attribute: str, extract: Callable, groups: Tuple, before: int = 0, after: int = 0,
+                 to_end: bool = False, candidates: Optional[Callable[..., BestCandidate]] = None,
+                 finish: Optional[Callable] = None):
+        self.attribute = attribute
+        self.extract = extract
+        self.groups = groups
+        self.before = before
+        self.after = after
+        self.to_end = to_end
+        self.candidates = candidates
+        self.finish = finish
+
+    def affected(self, text: IncrementalText, edit: TextEdit) -> bool:
+        """Может ли правка изменить результат экстрактора."""
+        low = 0 if self.to_end else edit.start - self.after
+        high = edit.new_end + self.before
+        for group in self.groups:
+            if group in edit.tokens or group in edit.anchors or group in edit.patterns:
+                return True
+            if text.has_items(group, low, high):
+                return True
+        return False
+
+
+def _phones(text) -> Tuple[str, ...]:
+    return tuple(extract_phone(text))
+
+
+def _same(value):
+    return value
+
+
+# Поля в порядке fill_*_data
+FIELD_SOURCES = (
+    # ФИО без признаков имени ищется заново в пределах KEYWORD_WINDOW от начала токена
+    FieldSource('driver', find_name, NAME_GROUPS, CONTEXT_WINDOW, KEYWORD_WINDOW,
+                candidates=name_candidates, finish=expand_shortened_fio),
+    FieldSource('birth_date', extract_date_of_birth, ('date',), KEYWORD_WINDOW, VALUE_SPAN),
+    FieldSource('phones', _phones, ('phone',)),
+    FieldSource('driver_license', extract_driver_license, ('doc',), KEYWORD_WINDOW + CONTEXT_WINDOW,
+                VALUE_SPAN + CONTEXT_WINDOW, candidates=license_candidates, finish=_same),
+    FieldSource('passport', extract_passport_series_and_number, ('doc',), KEYWORD_WINDOW + CONTEXT_WINDOW,
+                VALUE_SPAN + CONTEXT_WINDOW, candidates=passport_candidates, finish=_same),
+    FieldSource('passport_authority', normalize_issuing_authority, ('authority', 'issued'), to_end=True),
+    FieldSource('passport_date', extract_passport_date, ('date',), PASSPORT_DATE_WINDOW),
+    FieldSource('passport_code', extract_passport_code, ('code',), KEYWORD_WINDOW),
+    FieldSource('vehicle', normalize_vehicle_number, ('car', 'brand'), CAR_BEFORE_BRAND_LEAD + CONTEXT_WINDOW,
+                CAR_BEFORE_BRAND_SPAN + VALUE_SPAN),
+    FieldSource('trailer', partial(normalize_vehicle_number, is_trailer=True), ('trailer', TRAILER_PLATE),
+                CONTEXT_WINDOW, TRAILER_PLATE_LEAD + TRAILER_PLATE_SPAN),
+    FieldSource('address', extract_address, ('address', 'city'), to_end=True),
+)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    low, high = 0, min(len(a), len(b)) - limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class ParseSession:
+    """Разбор карточки водителя, которую дописывают и правят по частям.
+
+    Карточка — последовательность частей (сообщений чата); результат всегда тот же, что
+    у parse_record('\\n'.join(parts)). Нормализованный текст, единый проход и индекс
+    ключевых слов обновляются только около изменённой части (IncrementalText), а заново
+    запускаются лишь экстракторы, чьи токены или ключевые слова изменились или стоят рядом
+    с правкой; значения остальных полей остаются прежними. ФИО, ВУ и паспорт выбираются
+    из прежнего победителя и кандидатов около правки; прочие затронутые экстракторы
+    проходят свои токены и ключевые слова заново, но без повторного сканирования текста.
+    Текст длиннее MAX_TEXT_LENGTH разбирается целиком, как в parse_by_keywords.
+
+    Не потокобезопасен: один объект — одна карточка.
+    """
+
+    def __init__(self, parts: Iterable[str] = ()):
+        self._parts: List[str] = []
+        self._cleaned: List[str] = []
+        self._text = IncrementalText()
+        self._length = 0
+        self._record = DriverRecord()
+        self._best: Dict[str, Optional[Candidate]] = {}
+        self._extract(FIELD_SOURCES)
+        for part in parts:
+            self.append(part)
+
+    @property
+    def parts(self) -> Tuple[str, ...]:
+        return tuple(self._parts)
+
+    @property
+    def text(self) -> str:
+        """Вся карточка: части через перевод строки."""
+        return '\n'.join(self._parts)
+
+    @property
+    def record(self) -> Optional[DriverRecord]:
+        """Текущий результат (копия); None, если ничего не найдено."""
+        return copy.copy(self._record) if self._record else None
+
+    def result(self) -> Tuple[bool, Dict]:
+        """Текущий результат в формате parse_by_keywords."""
+        return (True, self._record.to_dict()) if self._record else (False, {})
+
+    def append(self, text: str) -> Optional[DriverRecord]:
+        """Добавляет часть в конец карточки."""
+        self._parts.append('')
+        self._cleaned.append('')
+        return self.replace(len(self._parts) - 1, text)
+
+    def insert(self, index: int, text: str) -> Optional[DriverRecord]:
+        """Вставляет часть перед частью `index`."""
+        index = self._index(index, len(self._parts) + 1)
+        self._parts.insert(index, '')
+        self._cleaned.insert(index, '')
+        return self.replace(index, text)
+
+    def replace(self, index: int, text: str) -> Optional[DriverRecord]:
+        """Заменяет часть `index` целиком."""
+        index = self._index(index, len(self._parts))
+        self._update(index, text or '')
+        return self.record
+
+    def edit(self, index: int, start: int, end: int, text: str) -> Optional[DriverRecord]:
+        """Заменяет символы [start, end) части `index` на `text`."""
+        index = self._index(index, len(self._parts))
+        part = self._parts[index]
+        return self.replace(index, part[:start] + text + part[end:])
+
+    def remove(self, index: int) -> Optional[DriverRecord]:
+        """Удаляет часть `index`."""
+        index = self._index(index, len(self._parts))
+        self._update(index, '')
+        del self._parts[index]
+        del self._cleaned[index]
+        return self.record
+
+    def _index(self, index: int, size: int) -> int:
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(f"Нет части {index}")
+        return index
+
+    def _update(self, index: int, text: str) -> None:
+        cleaned = WHITESPACE_RE.sub(' ', text.strip())
+        old = self._cleaned[index]
+        self._parts[index] = text
+        if cleaned == old:
+            return
+        self._cleaned[index] = cleaned
+        # Нормализованная карточка — непустые части через пробел; часть вместе с
+        # разделителями занимает участок [before, before + len(middle))
+        before = sum(len(part) + 1 for part in self._cleaned[:index] if part)
+        has_before = before > 0
+        has_after = any(self._cleaned[index + 1:])
+        if has_before:
+            before -= 1
+        old_middle = self._middle(old, has_before, has_after)
+        new_middle = self._middle(cleaned, has_before, has_after)
+        length = self._length + len(new_middle) - len(old_middle)
+        if length > MAX_TEXT_LENGTH or self._length > MAX_TEXT_LENGTH:
+            self._length = length
+            self._rebuild()
+            return
+        self._length = length
+        prefix = _common_prefix(old_middle, new_middle)
+        suffix = _common_suffix(old_middle, new_middle, prefix)
+        edit = self._text.replace(before + prefix, before + len(old_middle) - suffix,
+                                  new_middle[prefix:len(new_middle) - suffix])
+        self._extract([source for source in FIELD_SOURCES if source.affected(self._text, edit)], edit)
+
+    @staticmethod
+    def _middle(cleaned: str, has_before: bool, has_after: bool) -> str:
+        head = ' ' if has_before and (cleaned or has_after) else ''
+        tail = ' ' if cleaned and has_after else ''
+        return head + cleaned + tail
+
+    def _rebuild(self) -> None:
+        """Полный разбор: текст вышел за MAX_TEXT_LENGTH или вернулся в предел."""
+        cleaned = ' '.join(part for part in self._cleaned if part)
+        if len(cleaned) > MAX_TEXT_LENGTH:
+            logger.warning("SESSION: Текст длиной %s обрезан до %s символов", len(cleaned), MAX_TEXT_LENGTH)
+            cleaned = cleaned[:MAX_TEXT_LENGTH]
+        self._text = IncrementalText(cleaned)
+        self._extract(FIELD_SOURCES)
+
+    def _extract(self, sources: Iterable[FieldSource], edit: Optional[TextEdit] = None) -> None:
+        names = []
+        for source in sources:
+            if source.candidates is None:
+                value = source.extract(self._text)
+            else:
+                candidates = self._merge(source, edit) if edit is not None else None
+                if candidates is None:
+                    candidates = source.candidates(self._text)
+                self._best[source.attribute] = best = candidates.best
+                value = source.finish(best.value) if best is not None else None
+            setattr(self._record, source.attribute, value)
+            names.append(source.attribute)
+        if metrics.ENABLED:
+            metrics.count('session_update', len(FIELD_SOURCES), len(names))
+        logger.debug("SESSION: Пересчитаны поля: %s", names)
+
+    def _merge(self, source: FieldSource, edit: TextEdit) -> Optional[BestCandidate]:
+        """Кандидаты после правки: прежний победитель и токены около правки. None, если
+        победитель сам стоит около правки и токены нужно оценить заново все."""
+        best = self._best.get(source.attribute)
+        low, high = edit.start - MERGE_WINDOW, edit.new_end + MERGE_WINDOW
+        candidates = BestCandidate()
+        if best is not None:
+            if edit.start <= best.start < edit.old_end:
+                return None
+            start = best.start + edit.shift if best.start >= edit.old_end else best.start
+            # Кандидат стоит не дальше KEYWORD_WINDOW от своего токена
+            if low - KEYWORD_WINDOW <= start <= high + KEYWORD_WINDOW:
+                return None
+            candidates.add(best.value, best.priority, start)
+        candidates.merge(source.candidates(self._text.window(low, high)))
+        return candidates
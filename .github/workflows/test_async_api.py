@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_async_api.py
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from .async_api import AsyncParser
+from .batch import ERROR_KEY
+from .main import parse_by_keywords
+
+MESSAGE = "Водитель Иванов Иван Иванович тел 89123456789"
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_parse_matches_parse_by_keywords():
+    async def main():
+        async with AsyncParser(use_processes=False, workers=2) as parser:
+            return await parser.parse(MESSAGE)
+    assert _run(main()) == parse_by_keywords(MESSAGE, True)
+
+
+def test_timeout():
+    # Единственный поток пула занят, поэтому разбор не начнётся до истечения таймаута
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(release.wait, 5)
+
+    async def main():
+        parser = AsyncParser(executor=executor, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await parser.parse(MESSAGE)
+        return [result async for result in parser.parse_many([MESSAGE] * 3, chunksize=2)]
+
+    try:
+        results = _run(main())
+    finally:
+        release.set()
+        executor.shutdown()
+    assert results == [(False, {ERROR_KEY: 'TimeoutError'})] * 3
+
+
+def test_parse_many_keeps_order():
+    texts = [MESSAGE, "привет", "Водитель Петров Петр Петрович"] * 3
+
+    async def main():
+        async with AsyncParser(use_processes=False, workers=2, max_concurrency=2) as parser:
+            return [result async for result in parser.parse_many(texts, chunksize=2)]
+    assert _run(main()) == [parse_by_keywords(text, True) for text in texts]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_batch.py
+import time
+from .batch import ERROR_KEY, parse_many
+from .main import parse_by_keywords
+
+MESSAGE = "Водитель Иванов Иван Иванович тел 89123456789"
+
+
+def test_sequential_matches_parse_by_keywords():
+    texts = [MESSAGE, "привет", MESSAGE]
+    assert list(parse_many(texts, workers=1, chunksize=2)) == [parse_by_keywords(text, True) for text in texts]
+
+
+def test_failed_message_does_not_stop_chunk():
+    results = list(parse_many([MESSAGE, None, MESSAGE], workers=1))
+    assert results[0] == results[2] == parse_by_keywords(MESSAGE, True)
+    assert results[1][0] is False and ERROR_KEY in results[1][1]
+
+
+def test_early_stop_cancels_pending_chunks():
+    # 500 пачек по 10 сообщений: без отмены close() ждёт разбора их всех
+    results = parse_many((MESSAGE for _ in range(5000)), workers=2, chunksize=10, max_pending=500)
+    assert next(results) == parse_by_keywords(MESSAGE, True)
+    started = time.perf_counter()
+    results.close()
+    assert time.perf_counter() - started < 2
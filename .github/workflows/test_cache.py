@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_cache.py
+import sqlite3
+import pytest
+from . import cache
+from .main import parse_by_keywords
+
+MESSAGE = "Водитель Иванов Иван Иванович тел 89123456789"
+
+
+@pytest.fixture
+def version(monkeypatch):
+    # Версия справочника, от которой зависит отпечаток кэша
+    current = ['1']
+    monkeypatch.setattr(cache, '_version_sources', [])
+    cache.register_version_source(lambda: current[0])
+    yield current
+    cache.disable_cache()
+
+
+def test_repeated_parse_hits_cache(version):
+    cache.enable_cache()
+    first = parse_by_keywords(MESSAGE, True)
+    first[1]['Водитель'] = 'испорчено'
+    assert parse_by_keywords(MESSAGE, True)[1]['Водитель'] == 'Иванов Иван Иванович'
+    stats = cache.cache_stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+
+
+def test_disk_entries_survive_restart(version, tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    cache.enable_cache(path=path)
+    expected = parse_by_keywords(MESSAGE, True)
+    cache.enable_cache(path=path)
+    assert parse_by_keywords(MESSAGE, True) == expected
+    assert cache.cache_stats()['disk_hits'] == 1
+
+
+def test_invalidate_drops_stale_entries(version, tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    cache.enable_cache(path=path)
+    parse_by_keywords(MESSAGE, True)
+    version[0] = '2'
+    cache.invalidate_cache()
+    assert len(cache.active_cache()) == 0
+    with sqlite3.connect(path) as db:
+        assert db.execute('SELECT COUNT(*) FROM results').fetchone() == (0,)
+    parse_by_keywords(MESSAGE, True)
+    assert cache.cache_stats()['misses'] == 2
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_cli.py
+import json
+from .cli import build_arg_parser, run
+from .main import parse_by_keywords
+
+TEXTS = ["Водитель Иванов Иван Иванович тел 89123456789", "привет", "Водитель Петров Петр Петрович паспорт 4510 123456"]
+
+
+def _run(*argv: str) -> int:
+    return run(build_arg_parser().parse_args(list(argv)))
+
+
+def test_jsonl_output(tmp_path):
+    source, output = tmp_path / 'in.jsonl', tmp_path / 'out.jsonl'
+    source.write_text(''.join(json.dumps({'id': i, 'text': text}, ensure_ascii=False) + '\n'
+                              for i, text in enumerate(TEXTS)) + '[1, 2]\n', encoding='utf-8')
+    assert _run(str(source), '-o', str(output)) == 0
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert [record['id'] for record in records] == [0, 1, 2]
+    assert [record['parsed'] for record in records] == [parse_by_keywords(text, True)[1] for text in TEXTS]
+
+
+def test_resume_offset_appends_remaining_records(tmp_path):
+    source, full, resumed = tmp_path / 'in.csv', tmp_path / 'full.csv', tmp_path / 'resumed.csv'
+    source.write_text('id,text\n' + ''.join(f'{i},"{text}"\n' for i, text in enumerate(TEXTS)), encoding='utf-8')
+    assert _run(str(source), '-o', str(full)) == 0
+    # Сбой после первой записи: вывод содержит заголовок и её строку, вход читается с начала второй
+    lines = full.read_text(encoding='utf-8').splitlines(keepends=True)
+    resumed.write_text(''.join(lines[:2]), encoding='utf-8')
+    offset = sum(len(line) for line in source.read_bytes().splitlines(keepends=True)[:2])
+    assert _run(str(source), '-o', str(resumed), '--resume-offset', str(offset)) == 0
+    assert resumed.read_text(encoding='utf-8') == full.read_text(encoding='utf-8')
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_entities.py
+from .entities import EntityStore
+from .main import parse_record
+
+BY_PHONE = "Водитель Иванов Иван Иванович тел 89123456789"
+BY_PASSPORT = "Иванов Иван Иванович паспорт 4510 123456"
+BOTH = "тел 8 912 345 67 89 паспорт 4510 123456"
+
+
+def test_records_with_common_keys_are_merged():
+    store = EntityStore()
+    first = store.add(parse_record(BY_PHONE))
+    second = store.add(parse_record(BY_PASSPORT))
+    assert first != second
+    merged = store.add(parse_record(BOTH))
+    assert store.find(parse_record(BY_PHONE)) == store.find(parse_record(BY_PASSPORT)) == merged
+    assert len(store) == 1
+    profile = store.profile(first)
+    assert profile['Водитель'] == 'Иванов Иван Иванович'
+    assert profile['Телефон'] == ['+7 (912) 345-67-89']
+    assert profile['Паспорт_серия_и_номер'] == '4510 123456'
+    assert store.entity(merged).messages == 3
+
+
+def test_record_without_keys_is_skipped():
+    store = EntityStore()
+    assert store.add(parse_record("Водитель Петров Петр Петрович")) is None
+    assert store.add(None) is None
+    assert len(store) == 0
+
+
+def test_store_persists_between_opens(tmp_path):
+    path = str(tmp_path / 'entities.sqlite')
+    store = EntityStore(path)
+    store.add_many([parse_record(BY_PHONE), parse_record(BOTH)])
+    store.close()
+    store = EntityStore(path)
+    try:
+        entity_id = store.find(parse_record(BY_PASSPORT))
+        assert entity_id is not None
+        assert store.profile(entity_id)['Водитель'] == 'Иванов Иван Иванович'
+        assert store.entity(entity_id).messages == 2
+        assert store.add(parse_record(BY_PASSPORT)) == entity_id
+    finally:
+        store.close()
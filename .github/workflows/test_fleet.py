@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_fleet.py
+import pytest
+from .fleet import FleetIndex
+
+
+@pytest.fixture
+def fleet():
+    index = FleetIndex(['owner'])
+    index.update([('А 123 ВС 77', ['ООО Ромашка']), ('АН 6577 33', ['ИП Иванов']), ('не номер', [])])
+    return index
+
+
+def test_exact_lookup_in_any_spelling(fleet):
+    assert len(fleet) == 2
+    assert fleet.rejected == 1
+    match = fleet.get('a123bc77')
+    assert (match.key, match.distance, match.entry) == ('А123ВС77', 0, {'owner': 'ООО Ромашка'})
+    assert 'А123ВС77' in fleet
+
+
+def test_fuzzy_lookup(fleet):
+    match = fleet.lookup('А 128 ВС 77')
+    assert (match.key, match.distance) == ('А123ВС77', 1)
+    assert fleet.lookup('А 128 ВС 77', max_distance=0) is None
+    with pytest.raises(ValueError):
+        fleet.candidates('А 128 ВС 77', max_distance=3)
+
+
+def test_ambiguous_lookup(fleet):
+    fleet.add('А 124 ВС 77', ['ООО Лютик'])
+    assert fleet.lookup('А 128 ВС 77') is None
+    assert [match.key for match in fleet.candidates('А 128 ВС 77')] == ['А123ВС77', 'А124ВС77']
+
+
+def test_match_result(tmp_path):
+    path = tmp_path / 'fleet.csv'
+    path.write_text('owner;plate\nООО Ромашка;А 123 ВС 77\n', encoding='utf-8')
+    index = FleetIndex.from_csv(str(path))
+    matches = index.match_result({'Автомобиль': 'А123ВС77', 'Прицеп': 'АН 6577 33'})
+    assert matches['Автомобиль'].entry == {'owner': 'ООО Ромашка'}
+    assert matches['Прицеп'] is None
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_imports_and_settings.py
+import logging
+from .imports_and_settings import TRACE, logger, set_trace
+
+
+def test_set_trace_restores_host_level():
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        set_trace(True)
+        assert logger.level == TRACE
+        set_trace(False)
+        assert logger.level == logging.WARNING
+    finally:
+        logger.setLevel(level)
+
+
+def test_set_trace_removes_its_handler():
+    handler = logging.NullHandler()
+    set_trace(True, handler)
+    assert handler in logger.handlers
+    set_trace(False)
+    assert handler not in logger.handlers
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_main.py
+import json
+import os
+import pytest
+from .columns import parse_columns
+from .main import parse_by_keywords, parse_record, parse_records
+from .phone import normalize_phone
+
+GORSHKOV = """водитель: Горшков Александр Александрович
+Паспорт Серия 17 16 номер 524327 выдан МРО УФМС России по Владимирской области в г. Владимире 28.12.2016 код подразделения 330-040
+Телефон: 8 915 793 29 49
+прицеп АН 6577 / 33"""
+ATAKISHIEV = """Ф.И.О.: Атакишиев Руслан Эльдарович
+Телефон: 8-918-145-12-22
+Паспорт: 4713 № 431628 выдан Отделением УФМС России по Краснодарскому краю в Приморском районе г. Новороссийска 28.06.2014
+Прицеп АМ 3145 23"""
+YUZAKOV = """водитель: Юзаков Александр Сергеевич
+Телефон: 8 911 410 53 73
+Паспорт: 8309 981436 выдан Отделом УФМС России по Республике Карелия в г. Петрозаводске 22.12.2009 код 070-007"""
+MESSAGES = [GORSHKOV, ATAKISHIEV, YUZAKOV, "Водитель Иванов И.И. тел 89123456789", "привет, как дела?", ""]
+
+
+def _driver_data():
+    with open(os.path.join(os.path.dirname(__file__), 'driver_data.json'), encoding='utf-8') as f:
+        drivers = json.load(f)['drivers']
+    return [(driver['id'], variant['input'].replace('\\n', '\n'), variant['expected'])
+            for driver in drivers for variant in driver['variants']]
+
+
+# Ожидаемые значения в driver_data.json записаны в другой схеме полей; с выводом парсера
+# совпадает формат телефона, поэтому сверяются образцы, где он уже приведён к нему
+@pytest.mark.parametrize('text, phones', [
+    pytest.param(text, expected['Телефон'], id=driver_id) for driver_id, text, expected in _driver_data()
+    if expected.get('Телефон') and all(normalize_phone(phone) == phone for phone in expected['Телефон'])
+])
+def test_driver_data_phones(text, phones):
+    ok, result = parse_by_keywords(text, True)
+    assert ok
+    assert result['Телефон'] == phones
+
+
+def test_driver_data_russian_sample():
+    samples = {text: expected for driver_id, text, expected in _driver_data() if driver_id == 'driver_chernyshev'}
+    text = next(text for text in samples if 'телефон' in text)
+    ok, result = parse_by_keywords(text, True)
+    assert ok
+    assert result['Водитель'] == samples[text]['Driver']
+    assert result['Паспорт_серия_и_номер'] == samples[text]['ПК_серия_и_номер']
+    assert result['Прицеп'] == samples[text]['Прицеп']
+    assert result['Телефон'] == [normalize_phone(phone) for phone in samples[text]['Телефон']]
+
+
+def test_message_fields():
+    ok, result = parse_by_keywords(GORSHKOV, True)
+    assert ok
+    assert result['Водитель'] == 'Горшков Александр Александрович'
+    assert result['Телефон'] == ['+7 (915) 793-29-49']
+    assert result['Паспорт_дата_выдачи'] == '28.12.2016'
+    assert result['Паспорт_код_подразделения'] == '330-040'
+    assert result['Паспорт_место_выдачи'] == 'выдан МРО УФМС России по Владимирской области в г. Владимире'
+    assert result['Прицеп'] == 'АН 6577 / 33'
+
+
+@pytest.mark.parametrize('text', ["привет, как дела?", "", None])
+def test_nothing_found(text):
+    assert parse_by_keywords(text, True) == (False, {})
+    assert parse_record(text) is None
+
+
+def test_selected_fields():
+    assert parse_by_keywords(YUZAKOV, True, fields=['Телефон', 'Водитель']) == (
+        True, {'Водитель': 'Юзаков Александр Сергеевич', 'Телефон': ['+7 (911) 410-53-73']})
+
+
+def test_parse_records_two_drivers():
+    records = parse_records(GORSHKOV + "\n\n" + ATAKISHIEV)
+    assert [record['Водитель'] for record in records] == ['Горшков Александр Александрович',
+                                                         'Атакишиев Руслан Эльдарович']
+    assert [record['Телефон'] for record in records] == [['+7 (915) 793-29-49'], ['+7 (918) 145-12-22']]
+    assert records[1]['Паспорт_дата_выдачи'] == '28.06.2014'
+    assert 'Паспорт_код_подразделения' not in records[1]
+
+
+@pytest.mark.parametrize('text', MESSAGES)
+def test_record_and_lazy_match_dict(text):
+    ok, result = parse_by_keywords(text, True)
+    record = parse_record(text)
+    assert (record.to_dict() if record else {}) == result
+    lazy_ok, lazy = parse_by_keywords(text, True, lazy=True)
+    assert lazy_ok == ok
+    assert dict(lazy) == result
+
+
+def test_columns_match_parse_record():
+    batch = parse_columns(MESSAGES + [None], batch_size=2)
+    assert len(batch) == len(MESSAGES) + 1
+    for index, text in enumerate(MESSAGES):
+        record = parse_record(text)
+        expected = record.to_dict() if record else {}
+        expected.pop('Прописка', None)
+        assert batch.row(index) == expected
+    assert batch.row(len(MESSAGES)) == {}
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_metrics.py
+import pytest
+from . import metrics
+from .main import parse_by_keywords
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_empty_parse_is_counted_as_miss(enabled_metrics):
+    assert parse_by_keywords("привет, как дела?", True) == (False, {})
+    parse_by_keywords("Водитель Иванов Иван Иванович тел 89123456789", True)
+    extractors = metrics.snapshot()['extractors']
+    assert extractors['parse_by_keywords']['calls'] == 2
+    assert extractors['parse_by_keywords']['hits'] == 1
+
+
+def test_scan_without_tokens_is_counted_as_miss(enabled_metrics):
+    parse_by_keywords("привет, как дела?", True)
+    extractors = metrics.snapshot()['extractors']
+    assert extractors['scan_tokens']['misses'] == 1
+    assert extractors['scan_anchors']['misses'] == 1
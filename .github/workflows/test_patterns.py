@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_patterns.py
+import os
+from . import patterns
+
+
+def test_snapshot_goes_to_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(patterns.CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    written = patterns.write_snapshot()
+    if written:
+        assert os.path.exists(tmp_path / 'cache' / patterns.SNAPSHOT_NAME)
+        assert set(patterns._load_snapshot()) <= set(name for name, _ in patterns.list_patterns())
+
+
+def test_unwritable_snapshot_returns_zero(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    assert patterns.write_snapshot(str(blocker / 'patterns.snapshot')) == 0
+    assert os.listdir(tmp_path) == ['file']
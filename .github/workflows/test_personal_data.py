@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_personal_data.py
+import pytest
+from .main import parse_by_keywords
+from .personal_data import expand_shortened_fio
+
+
+@pytest.mark.parametrize('text, name', [
+    ("Водитель Иванов И.И. тел 89123456789", 'Иванов И.И.'),
+    ("Водитель Пархоменко А.А. паспорт 4510 123456", 'Пархоменко А.А.'),
+    ("Смирнов И. С. тел 89001234567", 'Смирнов И. С.'),
+])
+def test_short_name_is_kept_as_written(text, name):
+    ok, result = parse_by_keywords(text, True)
+    assert ok
+    assert result['Водитель'] == name
+
+
+@pytest.mark.parametrize('fio', ['Иванов И.И.', 'Пархоменко А.А.', 'Петрова Е.В.'])
+def test_initials_are_not_expanded(fio):
+    assert expand_shortened_fio(fio) == fio
+
+
+def test_full_name_is_returned_unchanged():
+    assert expand_shortened_fio('Иванов Иван Иванович') == 'Иванов Иван Иванович'
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_phone.py
+import pytest
+from .main import parse_by_keywords
+from .phone import extract_phones
+
+
+@pytest.mark.parametrize('text', [
+    "код 770-001 10 770-001",
+    "Паспорт 4510 123456 код 912 770-001 123 77",
+    "Паспорт 916 123 45 67",
+])
+def test_unrelated_digit_groups_are_not_joined(text):
+    assert extract_phones(text) == []
+    assert 'Телефон' not in parse_by_keywords(text, True)[1]
+
+
+def test_division_code_is_not_taken_into_phone():
+    ok, result = parse_by_keywords("код 770-001 10 770-001", True)
+    assert ok
+    assert result['Паспорт_код_подразделения'] == '770-001'
+
+
+@pytest.mark.parametrize('text, phone', [
+    ("Телефон: 8 915 793 29 49", '+7 (915) 793-29-49'),
+    ("тел 916 123 45 67", '+7 (916) 123-45-67'),
+    ("8(916)123-45-67", '+7 (916) 123-45-67'),
+    ("+7(916)1234567", '+7 (916) 123-45-67'),
+    ("8916 123 45 67", '+7 (916) 123-45-67'),
+    ("8-800-555-3535", '+7 (800) 555-35-35'),
+    ("моб. 9161234567", '+7 (916) 123-45-67'),
+    ("тел +375 29 123-45-67", '+375 (29) 123-45-67'),
+])
+def test_phone_shapes(text, phone):
+    assert extract_phones(text) == [phone]
+    assert parse_by_keywords(text, True)[1]['Телефон'] == [phone]
+
+
+def test_phone_next_to_passport():
+    ok, result = parse_by_keywords("Водитель Иванов Иван Иванович 89161234567 4510 123456", True)
+    assert ok
+    assert result['Телефон'] == ['+7 (916) 123-45-67']
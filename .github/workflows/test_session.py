@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# driver_parser/test_session.py
+from .main import parse_record
+from .session import ParseSession
+
+PARTS = ["водитель: Юзаков Александр Сергеевич", "Телефон: 8 911 410 53 73",
+         "Паспорт: 8309 981436 выдан Отделом УФМС России по Республике Карелия 22.12.2009 код 070-007"]
+
+
+def _check(session: ParseSession) -> None:
+    expected = parse_record(session.text)
+    assert session.record == expected
+    assert session.result() == ((True, expected.to_dict()) if expected else (False, {}))
+
+
+def test_append_matches_parse_record():
+    session = ParseSession()
+    assert session.result() == (False, {})
+    for part in PARTS:
+        session.append(part)
+        _check(session)
+    assert session.record.phones == ('+7 (911) 410-53-73',)
+
+
+def test_edits_match_parse_record():
+    session = ParseSession(PARTS)
+    part = session.parts[1]
+    start = part.index('8 911')
+    session.edit(1, start, start + len('8 911 410 53 73'), '8 921 000 11 22')
+    _check(session)
+    assert session.record.phones == ('+7 (921) 000-11-22',)
+    session.insert(0, "Прицеп АМ 3145 23")
+    _check(session)
+    session.replace(-1, "паспорт 4510 123456")
+    _check(session)
+    session.remove(1)
+    _check(session)
+    assert session.parts[0] == "Прицеп АМ 3145 23"
+    while session.parts:
+        session.remove(0)
+        _check(session)
+    assert session.record is None
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# driver_parser/textnorm.py
+from typing import Iterable, Iterator, List, Optional
+from .imports_and_settings import CYRILLIC_TO_LATIN
+from .patterns import register
+
+# Нормализация текста для нечёткого сравнения: нижний регистр, транслитерация, схлопывание
+# пробелов и удаление символов вне [\w\s.,-]. Результат тот же, что у прежней посимвольной
+# реализации utils.normalize_text, но вся работа выполняется несколькими проходами на C.
+#
+# Текст, представимый в cp1251 (вся кириллица, латиница и типографские знаки вроде «№»),
+# обрабатывается как байты: транслитерация, пробелы и пунктуация — это bytes.translate
+# по таблицам ниже. Прочий текст идёт медленным путём через str.translate и регулярное выражение.
+NON_TEXT = register('textnorm.non_text', r'[^\w\s.,-]')
+
+ENCODING = 'cp1251'
+# Буквы, транслитерируемые несколькими латинскими: заменяются до перевода в байты
+MULTI_LETTERS = tuple((letter, latin) for letter, latin in CYRILLIC_TO_LATIN.items()
+                      if len(latin) > 1 and letter.islower())
+TRANSLIT_TABLE = str.maketrans(CYRILLIC_TO_LATIN)
+
+
+def _byte_tables():
+    translit = bytearray(range(256))
+    deleted = bytearray()
+    non_text = bytearray()
+    for code in range(256):
+        try:
+            char = bytes([code]).decode(ENCODING)
+        except UnicodeDecodeError:
+            continue
+        if char.isspace():
+            # Пробельные символы вне ASCII (неразрывный пробел) bytes.split() не делит
+            translit[code] = ord(' ')
+        elif not (char.isalnum() or char == '_' or char in '.,-'):
+            non_text.append(code)
+    for letter, latin in CYRILLIC_TO_LATIN.items():
+        code = letter.encode(ENCODING)[0]
+        if not latin:
+            deleted.append(code)
+        elif len(latin) == 1:
+            translit[code] = ord(latin)
+    return bytes(translit), bytes(deleted), bytes(non_text)
+
+
+BYTE_TRANSLIT, BYTE_DELETED, BYTE_NON_TEXT = _byte_tables()
+
+
+def normalize(text: Optional[str]) -> str:
+    """Нормализованный текст; пустая строка для пустого входа."""
+    if not text:
+        return ""
+    text = text.lower()
+    for letter, latin in MULTI_LETTERS:
+        if letter in text:
+            text = text.replace(letter, latin)
+    try:
+        data = text.encode(ENCODING)
+    except UnicodeEncodeError:
+        text = ' '.join(text.translate(TRANSLIT_TABLE).split())
+        return NON_TEXT.sub('', text).strip()
+    data = b' '.join(data.translate(BYTE_TRANSLIT, BYTE_DELETED).split())
+    return data.translate(None, BYTE_NON_TEXT).decode(ENCODING).strip()
+
+
+def normalize_many(texts: Iterable[Optional[str]]) -> List[str]:
+    """Нормализует все тексты; порядок сохраняется."""
+    return list(map(normalize, texts))
+
+
+def iter_normalized(texts: Iterable[Optional[str]]) -> Iterator[str]:
+    """Потоковый вариант normalize_many: тексты читаются по одному, например строки файла архива."""
+    for text in texts:
+        yield normalize(text)
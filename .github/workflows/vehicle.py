@@ -1,54 +1,116 @@
 import re
 import logging
 from typing import Optional
+from . import metrics
+from .engine import TextLike, VEHICLE_BRANDS, anchored_finditer, matches_at, prepare_text
+from .imports_and_settings import TRACE
+from .models import BestCandidate, DriverRecord
+from .patterns import register
 
 logger = logging.getLogger(__name__)
 
-def normalize_vehicle_number(text: str, is_trailer: bool = False) -> Optional[str]:
-    text_cleaned = re.sub(r'\s+', ' ', text.strip())
-    logger.debug(f"Полный текст для {'прицепа' if is_trailer else 'автомобиля'}: {text_cleaned[:100]}")
-    VEHICLE_PATTERNS = [
-        re.compile(r'(?i)(?:автомобиль|машина|а\/м|тягач)\s*[:\-\s]*(?:№\s*)?([А-ЯЁA-Z0-9\s\/-]{6,30})\b', re.UNICODE),
-        re.compile(r'(?i)\b(ман|вольво|скания|мерседес|даф|jac|volvo|scania|mersedes-benz)\s*([А-ЯЁ]{1,2}\s*\d{3}\s*[А-ЯЁ]{2}\s*\d{2,3})\b', re.UNICODE),
-        re.compile(r'(?i)\b([А-ЯЁA-Z0-9\s\/-]{6,30})\b(?=\s*(?:ман|вольво|скания|мерседес|даф|jac|volvo|scania|mersedes))\b', re.UNICODE),
-    ]
-    TRAILER_PATTERNS = [
-        re.compile(r'(?i)(?:прицеп|п\/п|п\/прицеп)\s*[:\-\s]*(?:№\s*)?([А-ЯЁA-Z0-9\s\/]{6,20})\b', re.UNICODE),
-        re.compile(r'(?i)(?:прицеп|п\/п|п\/прицеп)\s*[:\-\s]*(?:№\s*)?(шмиц|кроне)\s*([а-яёa-z0-9\s\/]{6,20})\b', re.UNICODE),
-        re.compile(r'(?i)\b([А-ЯЁ]{1,2}\s*\d{4}\s*\/?\s*\d{2,3})\b', re.UNICODE),
-    ]
+CAR_BEFORE_BRAND = register('vehicle.car_before_brand', rf'(?i)\b([А-ЯЁA-Z0-9\s\/-]{{6,30}})\b(?=\s*(?:{"|".join(VEHICLE_BRANDS)}))\b', re.UNICODE)
+# Полный проход CAR_BEFORE_BRAND пробует до 30 длин номера в каждой позиции текста.
+# Номер всегда стоит перед маркой, поэтому ищем его только в окнах перед найденными марками
+# (текст нормализован, между номером и маркой не больше одного пробела)
+CAR_BEFORE_BRAND_LEAD = 30 + 1
+CAR_BEFORE_BRAND_SPAN = 30 + 1 + max(map(len, VEHICLE_BRANDS)) + 1
+
+VEHICLE_PATTERNS = [
+    register('vehicle.car_keyword', r'(?i)(?:автомобиль|машина|а\/м|тягач)\s*[:\-\s]*(?:№\s*)?([А-ЯЁA-Z0-9\s\/-]{6,30})\b', re.UNICODE),
+    register('vehicle.car_brand', r'(?i)\b(ман|вольво|скания|мерседес|даф|jac|volvo|scania|mersedes-benz)\s*([А-ЯЁ]{1,2}\s*\d{3}\s*[А-ЯЁ]{2}\s*\d{2,3})\b', re.UNICODE),
+    CAR_BEFORE_BRAND,
+]
+TRAILER_PATTERNS = [
+    register('vehicle.trailer_keyword', r'(?i)(?:прицеп|п\/п|п\/прицеп)\s*[:\-\s]*(?:№\s*)?([А-ЯЁA-Z0-9\s\/]{6,20})\b', re.UNICODE),
+    register('vehicle.trailer_brand', r'(?i)(?:прицеп|п\/п|п\/прицеп)\s*[:\-\s]*(?:№\s*)?(шмиц|кроне)\s*([а-яёa-z0-9\s\/]{6,20})\b', re.UNICODE),
+    register('vehicle.trailer_plate', r'(?i)\b([А-ЯЁ]{1,2}\s*\d{4}\s*\/?\s*\d{2,3})\b', re.UNICODE),
+]
+TRAILER_PLATE = TRAILER_PATTERNS[2]
+# Номер прицепа без ключевого слова получает приоритет 200, а в пределах окна контекста (50 символов)
+# после "прицеп"/"п/п" — 250. Такие номера ищутся только в окнах после ключевых слов; полный проход
+# нужен, лишь если ни одного кандидата с приоритетом 250 нет. Длина номера в нормализованном
+# тексте не больше 13 символов, плюс символ для проверки границы слова
+TRAILER_PLATE_LEAD = 50
+TRAILER_PLATE_SPAN = 16
+# Шаблоны, которые начинаются с ключевого слова, проверяются только в его позициях
+KEYWORD_ANCHORS = {
+    VEHICLE_PATTERNS[0]: 'car',
+    VEHICLE_PATTERNS[1]: 'brand',
+    TRAILER_PATTERNS[0]: 'trailer',
+    TRAILER_PATTERNS[1]: 'trailer',
+}
+VEHICLE_FORMAT = register('vehicle.format', r'[А-ЯЁA-Z0-9\s\/-]{6,30}$', re.UNICODE)
+
+def _finditer(pattern: re.Pattern, prepared: TextLike):
+    text = prepared.cleaned
+    if pattern is CAR_BEFORE_BRAND:
+        brands = [start for start, _ in prepared.anchors('brand')]
+        return anchored_finditer(pattern, text, brands, CAR_BEFORE_BRAND_LEAD, CAR_BEFORE_BRAND_SPAN,
+                                 prepared.start, prepared.end)
+    if pattern is TRAILER_PLATE:
+        windows = [start + TRAILER_PLATE_LEAD for start, _ in prepared.anchors('trailer')]
+        return anchored_finditer(pattern, text, windows, TRAILER_PLATE_LEAD, TRAILER_PLATE_SPAN,
+                                 prepared.start, prepared.end)
+    return matches_at(pattern, text, [start for start, _ in prepared.anchors(KEYWORD_ANCHORS[pattern])], prepared.end)
+
+def _vehicle_variant(text: TextLike, is_trailer: bool = False) -> str:
+    return 'trailer' if is_trailer else 'car'
+
+@metrics.timed('normalize_vehicle_number', variant=_vehicle_variant)
+def normalize_vehicle_number(text: TextLike, is_trailer: bool = False) -> Optional[str]:
+    prepared = prepare_text(text)
+    text_cleaned = prepared.cleaned
+    kind = 'прицепа' if is_trailer else 'автомобиля'
+    logger.debug("Полный текст для %s: %.100s", kind, text_cleaned)
     patterns = TRAILER_PATTERNS if is_trailer else VEHICLE_PATTERNS
-    candidates = []
-    for pattern in patterns:
-        logger.debug(f"Применён шаблон для {'прицепа' if is_trailer else 'автомобиля'}: {pattern.pattern}")
-        for match in pattern.finditer(text_cleaned):
+    examined = 0
+
+    def collect(matches, found: BestCandidate) -> BestCandidate:
+        nonlocal examined
+        for match in matches:
+            examined += 1
             vehicle = match.group(1).strip()
             if is_trailer and len(match.groups()) > 1:
                 vehicle = f"{match.group(1)} {match.group(2)}".strip()
-            context = text_cleaned[max(0, match.start() - 50):match.start()].lower()
+            context = prepared.context(match.start() - 50, match.start())
             priority = 300 if ('автомобиль' in context or 'машина' in context or 'а/м' in context or 'тягач' in context) and not is_trailer else 200
             if is_trailer and ('прицеп' in context or 'п/п' in context or 'п/прицеп' in context or 'шмиц' in vehicle.lower() or 'кро' in vehicle.lower()):
                 priority += 50
             if 'мерседес' in context or 'mersedes' in vehicle.lower():
                 vehicle = vehicle.replace('MERSEDES', 'MERSEDES-BENZ').replace('Мерседес', 'MERSEDES-BENZ')
-            if re.match(r'[А-ЯЁA-Z0-9\s\/-]{6,30}$', vehicle, re.UNICODE):
-                logger.debug(f"Кандидат {'прицепа' if is_trailer else 'автомобиля'}: {vehicle}, приоритет: {priority}, контекст: {context}")
-                candidates.append((vehicle, priority, match.start()))
+            if VEHICLE_FORMAT.match(vehicle):
+                logger.log(TRACE, "Кандидат %s: %s, приоритет: %s, контекст: %s", kind, vehicle, priority, context)
+                found.add(vehicle, priority, match.start())
             else:
-                logger.debug(f"Кандидат {'прицепа' if is_trailer else 'автомобиля'} {vehicle} исключён: не соответствует формату")
+                logger.log(TRACE, "Кандидат %s %s исключён: не соответствует формату", kind, vehicle)
+        return found
+
+    candidates = BestCandidate()
+    for pattern in patterns:
+        logger.log(TRACE, "Применён шаблон для %s: %s", kind, pattern.pattern)
+        if pattern is not TRAILER_PLATE:
+            collect(_finditer(pattern, prepared), candidates)
+            continue
+        near = collect(_finditer(pattern, prepared), BestCandidate())
+        if max(candidates.priority or 0, near.priority or 0) >= 250:
+            candidates.merge(near)
+        else:
+            logger.log(TRACE, "Рядом с ключевыми словами номера прицепа нет, поиск по всему тексту")
+            collect(prepared.finditer(pattern), candidates)
+    if metrics.ENABLED:
+        metrics.count(f"normalize_vehicle_number:{_vehicle_variant(text, is_trailer)}", examined, candidates.count)
     if not candidates:
-        logger.debug(f"{'Прицеп' if is_trailer else 'Автомобиль'} не найден")
+        logger.debug("%s не найден", 'Прицеп' if is_trailer else 'Автомобиль')
         return None
-    candidates.sort(key=lambda x: (x[1], x[2]), reverse=True)
-    return candidates[0][0]
-
-def extract_vehicle_data(text: str) -> dict:
-    result = {}
-    vehicle = normalize_vehicle_number(text)
-    if vehicle:
-        result['Автомобиль'] = vehicle
-    trailer = normalize_vehicle_number(text, is_trailer=True)
-    if trailer:
-        result['Прицеп'] = trailer
-    logger.debug(f"Результат данных транспортных средств: {result}")
-    return result
+    return candidates.value
+
+def fill_vehicle_data(text: TextLike, record: DriverRecord) -> DriverRecord:
+    text = prepare_text(text)
+    record.vehicle = normalize_vehicle_number(text)
+    record.trailer = normalize_vehicle_number(text, is_trailer=True)
+    logger.debug("Транспортные средства: %s, %s", record.vehicle, record.trailer)
+    return record
+
+def extract_vehicle_data(text: TextLike) -> dict:
+    return fill_vehicle_data(text, DriverRecord()).to_dict()
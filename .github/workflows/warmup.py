@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# driver_parser/warmup.py
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+from . import dates, patterns
+from .main import parse_by_keywords
+
+# Сообщение, на котором отрабатывают все экстракторы
+SAMPLE_MESSAGE = ('Водитель: Иванов Иван Иванович, 01.02.1980, тел. 8 900 123 45 67, ВУ 12 34 567890, '
+                  'паспорт 4510 123456 выдан ОВД района Тверской г. Москвы 01.01.2010 код подразделения 770-001, '
+                  'а/м Вольво А 123 ВС 77, прицеп АВ 1234 77, прописка г. Тверь, ул. Советская, д. 12')
+
+
+def warmup(snapshot: bool = False, reference: bool = True, date_parser: bool = False) -> Dict[str, float]:
+    """Заранее выполняет работу, которую иначе сделал бы первый разбор.
+
+    Вызывается в процессе до начала обработки (например, до fork воркеров). snapshot=True
+    дополнительно сохраняет снимок шаблонов (patterns.write_snapshot), который ускоряет
+    импорт пакета в следующих процессах; его стоит строить при сборке образа, как .pyc.
+
+    Returns:
+        Время этапов в секундах.
+    """
+    timings = {}
+    started = time.perf_counter()
+    parse_by_keywords(SAMPLE_MESSAGE, True)
+    timings['parse'] = time.perf_counter() - started
+    if reference:
+        started = time.perf_counter()
+        from .reference import REPLACER_CONTEXT, TABLES, reference_data
+        data = reference_data()
+        for name in TABLES:
+            data.table(name)
+        for name in REPLACER_CONTEXT:
+            data.replacer(name)
+        timings['reference'] = time.perf_counter() - started
+    if date_parser:
+        started = time.perf_counter()
+        dates.load_date_parser()
+        timings['date_parser'] = time.perf_counter() - started
+    if snapshot:
+        started = time.perf_counter()
+        patterns.write_snapshot()
+        timings['snapshot'] = time.perf_counter() - started
+    return timings
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m driver_parser.warmup',
+                                     description='Прогрев процесса и сборка снимка шаблонов.')
+    parser.add_argument('--snapshot', action='store_true', help='сохранить снимок скомпилированных шаблонов')
+    parser.add_argument('--no-reference', action='store_true', help='не загружать справочники')
+    parser.add_argument('--dateparser', action='store_true', help='загрузить dateparser')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    timings = warmup(args.snapshot, not args.no_reference, args.dateparser)
+    print(json.dumps({name: round(seconds * 1000, 2) for name, seconds in timings.items()}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())